@@ -1,3 +1,26 @@
 from .ai_text_structor import AITextStructor
+from .call_policy import CallPolicy
+from .cassette import CassetteModel
+from .engine_definition import EngineDefinition, get_engine_definition
+from .incremental import IncrementalSession
+from .preprocessing import Preprocessor
+from .rate_limiter import RateLimiter
+from .response_cache import ResponseCache
+from .semantic_cache import SemanticCache
+from .tracing import Tracer
+from .worker_pool import WorkerPool
 
-__all__ = ["AITextStructor"]
+__all__ = [
+    "AITextStructor",
+    "CallPolicy",
+    "CassetteModel",
+    "EngineDefinition",
+    "IncrementalSession",
+    "Preprocessor",
+    "RateLimiter",
+    "ResponseCache",
+    "SemanticCache",
+    "Tracer",
+    "WorkerPool",
+    "get_engine_definition",
+]
@@ -1,7 +1,50 @@
 from .data_executor import DataExecutor
-from .workflow_executor import WorkflowExecutor
+from .rate_limiter import PRIORITY_CLASSIFY, PRIORITY_DATA, PRIORITY_SPECULATIVE
+from .call_policy import CallPolicy
+from .execution_graph import DATA_NODE
+from .engine_definition import EngineDefinition, get_engine_definition
+from .incremental import (
+    IncrementalUpdate,
+    build_update_content,
+    get_incremental_update,
+    incremental_update,
+)
+from .preprocessing import prepare_document
+from .process_chunks import merge_lists
+from .scheduling import get_token_budget, limit_tokens
+from .streaming import (
+    BRANCH_EVENT,
+    CLASSIFIED_EVENT,
+    COMPLETED_EVENT,
+    ERROR_EVENT,
+    FIELD_EVENT,
+    PARTIAL_EVENT,
+    SKIPPED_EVENT,
+    emit_event,
+    emit_events,
+    listen_partial,
+    wants_partial,
+)
+from .tracing import (
+    BATCH_SPAN,
+    CALL_SPAN,
+    CLASSIFY_SPAN,
+    DOCUMENT_SPAN,
+    FIELD_SPAN,
+    WORKFLOW_SPAN,
+    collect_metrics,
+    record_call,
+    trace_span,
+)
 import asyncio
-from typing import List, Union
+import contextlib
+import contextvars
+import copy
+import functools
+import hashlib
+import json
+import time
+from typing import Any, Dict, Iterable, List, Optional, Union
 
 
 class AITextStructor:
@@ -9,39 +52,194 @@ class AITextStructor:
     Manages the execution of AI processing workflows and data operations
     """
 
-    def __init__(self, engine_config, model, parallel: bool = True):
+    def __init__(
+        self,
+        engine_config,
+        model,
+        parallel: bool = True,
+        use_async: bool = True,
+        batch: bool = False,
+        batch_token_budget: int = 2000,
+        rate_limiter=None,
+        call_policy=None,
+        partial_results: bool = False,
+        speculative: bool = False,
+        speculation_threshold: float = 1.0,
+        response_cache=None,
+        tracer=None,
+        worker_pool=None,
+        structured_output: bool = False,
+        cache_control: bool = False,
+        preprocessor=None,
+        semantic_cache=None,
+        token_budget: Optional[int] = None,
+        models: Optional[Dict[str, Any]] = None,
+    ):
         """
         Initialize AITextStructor with configuration
 
         Args:
-            engine_config (dict): Configuration containing data and workflow definitions
+            engine_config (Union[dict, EngineDefinition]): Configuration containing
+                data and workflow definitions, or its compiled definition.
+                Configurations are compiled once per process through
+                get_engine_definition. Engines share the compiled fields and
+                workflows of their definition and only bind them to the model
             model: The LangChain AI model to use for processing
+            parallel (bool): Run data fields and workflows concurrently
+            use_async (bool): Call the model natively with ainvoke. When disabled, or
+                when the model has no async support, calls run in the default thread pool
+            batch (bool): Extract groups of data fields with a single completion.
+                Fields that fail to parse are retried with their own completion
+            batch_token_budget (int): Maximum estimated tokens of field prompts and
+                format instructions merged into one batch completion
+            rate_limiter (RateLimiter, optional): Scheduler every model call waits on
+                before it is sent, e.g. to respect provider RPM/TPM limits
+            call_policy (CallPolicy, optional): Timeout, retry and hedging policy
+                applied to every model call. Defaults to a single attempt without timeout
+            partial_results (bool): Return failed data fields and classifications as
+                structured errors instead of failing the whole result
+            speculative (bool): In parallel mode, start explain workflow data before
+                the classifier has chosen the explain workflow
+            speculation_threshold (float): Estimated probability that an explain data
+                field is needed from which it is started speculatively (1.0 starts
+                fields shared by all explain workflows). Unneeded executions are
+                cancelled
+            response_cache (ResponseCache, optional): Persistent cache of model
+                responses shared across instances and processes
+            tracer (Tracer, optional): Receives a span for every document,
+                workflow, data field, classifier, batch and model call
+            worker_pool (WorkerPool, optional): Process pool rendering prompts and
+                parsing model outputs of data fields, built from the same
+                engine_config
+            structured_output (bool): Extract object and list fields and batches
+                through the native structured output (tool calling) of each model
+                instead of format instructions in the prompt. Models without
+                support use the prompt and parser
+            cache_control (bool): Mark the preamble and content every prompt of a
+                document starts with as a cache breakpoint, for providers that
+                only cache marked prompt prefixes
+            preprocessor (Callable, optional): Transformation applied once to the
+                content of every document before any field or classifier runs,
+                e.g. a Preprocessor normalizing whitespace and speaker turns
+            semantic_cache (SemanticCache, optional): Cache reusing the results of
+                fields configured with "semantic_cache" for near-duplicate content
+            token_budget (int, optional): Estimated prompt tokens each document may
+                spend. Data fields run in priority order, cheapest first, and
+                fields that no longer fit the remaining budget are skipped and
+                marked as such
+            models (Dict[str, Any], optional): LangChain models by alias, for
+                data fields and prompt workflows configured with "model". A
+                field or classifier configured with a list of aliases tries them
+                in order and escalates answers that fail to parse or validate.
+                Unconfigured fields and classifiers call model, registered as
+                "default"
 
         Raises:
             ValueError: If data is missing or empty in engine_config
             ValueError: If model is not provided
+            ValueError: If token_budget is not positive
+            ValueError: If a workflow references an unknown data field
+            ValueError: If a data field or workflow refers to an unregistered
+                model alias
+            ValueError: If worker_pool was built from a different configuration,
+                structured output or cache control setting
         """
-        if (
-            not engine_config
-            or "data" not in engine_config
-            or not engine_config["data"]
-        ):
-            raise ValueError("engine_config must contain non-empty data configuration")
+        definition = engine_config
+        if not isinstance(definition, EngineDefinition):
+            definition = get_engine_definition(engine_config)
 
         if not model:
             raise ValueError("A LangChain model must be provided")
+        if token_budget is not None and token_budget <= 0:
+            raise ValueError("token_budget must be positive")
+        registered = [model, *(models or {}).values()]
+        if worker_pool and worker_pool.data_dict != definition.data_dict:
+            raise ValueError("worker_pool must be built from the same engine_config")
+        if worker_pool and (
+            worker_pool.structured_output != structured_output
+            or worker_pool.cache_control != cache_control
+        ):
+            raise ValueError(
+                f"worker_pool must be built with structured_output={structured_output}"
+                f" and cache_control={cache_control}"
+            )
 
+        self.definition = definition
         self.model = model
-        self.data_executor = DataExecutor(engine_config["data"], model)
+        self.structured_output = structured_output
+        self.data_executor = DataExecutor(
+            definition.data_dict,
+            model,
+            response_cache=response_cache,
+            worker_pool=worker_pool,
+            structured_output=structured_output,
+            cache_control=cache_control,
+            fields=definition.fields,
+            models=models,
+        )
         self.workflow_executor = None
         self.data_cache = {}
         self.parallel = parallel
-        self._cache_lock = asyncio.Lock()
+        self.use_async = use_async and all(
+            hasattr(registered_model, "ainvoke") for registered_model in registered
+        )
+        self.batch = batch
+        self.batch_token_budget = batch_token_budget
+        self.rate_limiter = rate_limiter
+        self.call_policy = call_policy or CallPolicy()
+        self.partial_results = partial_results
+        self.speculative = speculative
+        self.speculation_threshold = speculation_threshold
+        self.tracer = tracer
+        self.preprocessor = preprocessor
+        self.semantic_cache = semantic_cache
+        self.token_budget = token_budget
+        self._classification_counts = {}  # Observed classifier answers per workflow
+        self._inflight = {}  # Cache keys with a data execution currently running
+        self._waiters = {}  # Number of callers awaiting each in-flight cache key
+        self._call_limiter = None  # Semaphore shared by documents of execute_many
 
-        if "workflow" in engine_config and engine_config["workflow"]:
-            self.workflow_executor = WorkflowExecutor(engine_config["workflow"], model)
+        if definition.workflow_executor is not None:
+            self.workflow_executor = definition.workflow_executor.bind(
+                model,
+                response_cache=response_cache,
+                cache_control=cache_control,
+                models=models,
+            )
 
-    async def execute_data(self, content: str, data_ids: Union[str, List[str]] = None):
+    async def execute_data(
+        self,
+        content: str,
+        data_ids: Union[str, List[str]] = None,
+        metrics: bool = False,
+    ):
+        """
+        Execute specific data IDs or all available data executors
+
+        Args:
+            content (str): Content to process
+            data_ids (Union[str, List[str]], optional): Specific data ID(s) to execute
+            metrics (bool): Add the timings, tokens, cache hits and retries of the
+                document under a "metrics" key of the result
+
+        Returns:
+            dict: Results of processing
+        """
+        with collect_metrics(metrics) as collector, limit_tokens(
+            self.token_budget
+        ) as budget:
+            with trace_span(self.tracer, DOCUMENT_SPAN, "document") as span:
+                with prepare_document(content, self.preprocessor) as document:
+                    result = await self._execute_data(document.content, data_ids)
+                self._report_preprocessing(span, document)
+        if collector:
+            result["metrics"] = collector.get_metrics()
+            result["metrics"]["preprocessing"] = document.get_report()
+            if budget is not None:
+                result["metrics"]["budget"] = budget.get_report()
+        return result
+
+    async def _execute_data(self, content: str, data_ids=None):
         """
         Execute specific data IDs or all available data executors
 
@@ -64,23 +262,166 @@ class AITextStructor:
         )
 
         if self.parallel:
-            tasks = [self._get_or_execute_data(key, content) for key in execute_ids]
-            results_list = await asyncio.gather(*tasks)
-            results = dict(zip(execute_ids, results_list))
-            titles = {key: self.data_executor.get_data_name(key) for key in execute_ids}
-            return {"results": results, "titles": titles}
+            batch_tasks = (
+                self._schedule_batches(execute_ids, content) if self.batch else []
+            )
+            ordered_ids = self._order_data_keys(execute_ids, content)
+            tasks = [self._get_data_result(key, content) for key in ordered_ids]
+            try:
+                results = dict(zip(ordered_ids, await asyncio.gather(*tasks)))
+            finally:
+                for task in batch_tasks:
+                    task.cancel()
+            return {
+                "results": {key: results[key] for key in execute_ids},
+                "titles": {
+                    key: self.data_executor.get_data_name(key) for key in execute_ids
+                },
+            }
         else:
+            if self.batch:
+                await self._execute_batches(execute_ids, content)
             results = {}
-            titles = {}
-            for key in execute_ids:
-                print(execute_ids)
-                results[key] = await self._get_or_execute_data(key, content)
-                titles[key] = self.data_executor.get_data_name(key)
-            return {"results": results, "titles": titles}
+            for key in self._order_data_keys(execute_ids, content):
+                results[key] = await self._get_data_result(key, content)
+            return {
+                "results": {key: results[key] for key in execute_ids},
+                "titles": {
+                    key: self.data_executor.get_data_name(key) for key in execute_ids
+                },
+            }
+
+    async def execute(self, content, metrics: bool = False):
+        """
+        Execute AI processing based on configuration.
+
+        Workflows run through the compiled execution graph: each data field and
+        classifier is executed at most once per document, as soon as its
+        dependencies resolve, and its result is shared by every workflow that
+        references it. With parallel disabled, every classifier runs first so the
+        chosen explain workflows are known, then the data fields run one at a
+        time by priority and estimated tokens.
+
+        Args:
+            content (str): Content to process
+            metrics (bool): Add the timings, tokens, cache hits and retries of the
+                document under a "metrics" key of the result
+
+        Returns:
+            dict: Results of processing
+        """
+        with collect_metrics(metrics) as collector, limit_tokens(
+            self.token_budget
+        ) as budget:
+            with trace_span(self.tracer, DOCUMENT_SPAN, "document") as span:
+                with prepare_document(content, self.preprocessor) as document:
+                    result = await self._execute(document.content)
+                self._report_preprocessing(span, document)
+        if collector:
+            result["metrics"] = collector.get_metrics()
+            result["metrics"]["preprocessing"] = document.get_report()
+            if budget is not None:
+                result["metrics"]["budget"] = budget.get_report()
+        return result
+
+    async def execute_update(
+        self, previous: dict, content: str, appended: str, metrics: bool = False
+    ):
+        """
+        Update the results of a document after content was appended to it, e.g.
+        a live meeting transcript, at a cost that scales with the appended
+        content instead of the whole document.
+
+        List fields are extracted from the appended content and merged with
+        their previous items. Other fields are asked to update their previous
+        answer with the appended content, so string fields keep a rolling
+        summary. Classifiers keep their previous choice. Fields and classifiers
+        without a previous result, e.g. of a newly chosen explain workflow or
+        after an error, run over the whole content. The whole content is
+        preprocessed once and the appended part is taken from its end; if
+        preprocessing changed the end of the previous content, e.g. by merging
+        a speaker turn across the boundary in a way that rewrites it, every
+        field runs over the whole content. See IncrementalSession for periodic
+        full refreshes.
+
+        Args:
+            previous (dict): Result of execute or execute_update for content
+            content (str): Content the previous result was produced from
+            appended (str): Content appended to the document
+            metrics (bool): Add the timings, tokens, cache hits and retries of the
+                update under a "metrics" key of the result
+
+        Returns:
+            dict: Results of the whole content
+        """
+        workflow_ids = (
+            self.workflow_executor.workflow_dict if self.workflow_executor else ()
+        )
+        with collect_metrics(metrics) as collector, limit_tokens(
+            self.token_budget
+        ) as budget:
+            with trace_span(self.tracer, DOCUMENT_SPAN, "document") as span:
+                with prepare_document(
+                    content + appended, self.preprocessor
+                ) as document:
+                    update = None
+                    prepared_appended = self._split_appended(content, document)
+                    if prepared_appended is not None:
+                        update = IncrementalUpdate.from_result(
+                            previous, prepared_appended, workflow_ids
+                        )
+                    with incremental_update(update):
+                        result = await self._execute(document.content)
+                self._report_preprocessing(span, document)
+        if collector:
+            result["metrics"] = collector.get_metrics()
+            result["metrics"]["preprocessing"] = document.get_report()
+            if budget is not None:
+                result["metrics"]["budget"] = budget.get_report()
+        return result
+
+    def _split_appended(self, content: str, document) -> Optional[str]:
+        """
+        Take the appended content of an update from the end of the prepared
+        document, so incremental prompts and cache keys see the same text as
+        the whole preprocessed content
 
-    async def execute(self, content):
+        Args:
+            content (str): Content the previous result was produced from
+            document (PreparedDocument): The prepared document of the whole content
+
+        Returns:
+            str: The prepared appended content, or None if the prepared document
+                does not start with the prepared previous content
+        """
+        prepared = self.preprocessor(content) if self.preprocessor else content
+        if not document.content.startswith(prepared):
+            return None
+        return document.content[len(prepared) :]
+
+    @staticmethod
+    def _report_preprocessing(span, document):
+        """
+        Add the tokens saved by preprocessing and relevance filtering to the
+        document span
+
+        Args:
+            span (Span, optional): The document span
+            document (PreparedDocument): The prepared document
+        """
+        if span is None:
+            return
+        report = document.get_report()
+        span.attributes.update(
+            original_tokens=report["original_tokens"],
+            tokens=report["tokens"],
+            tokens_saved=report["tokens_saved"],
+            relevance_tokens_saved=sum(report["fields"].values()),
+        )
+
+    async def _execute(self, content):
         """
-        Execute AI processing based on configuration, running workflows in parallel
+        Execute the workflows of a document through the execution graph
 
         Args:
             content (str): Content to process
@@ -89,34 +430,119 @@ class AITextStructor:
             dict: Results of processing
         """
         if not self.workflow_executor:
-            return await self.execute_data(content)
+            return await self._execute_data(content)
+
+        graph = self.workflow_executor.get_execution_graph()
+        node_tasks = {}
+        batch_tasks = []  # Batch completions started in parallel mode
+
+        def start_nodes(node_ids):
+            node_ids = [node_id for node_id in node_ids if node_id not in node_tasks]
+            if self.batch and self.parallel:
+                batch_tasks.extend(
+                    self._schedule_batches(
+                        [
+                            graph.nodes[node_id].key
+                            for node_id in node_ids
+                            if graph.nodes[node_id].kind == DATA_NODE
+                        ],
+                        content,
+                    )
+                )
+            for node_id in node_ids:
+                node_tasks[node_id] = asyncio.ensure_future(
+                    run_node(graph.nodes[node_id])
+                )
+
+        async def run_node(node):
+            if node.kind == DATA_NODE:
+                return await self._get_data_result(node.key, content)
+
+            try:
+                explain_workflow_id = await self._classify_workflow(node.key, content)
+            except Exception as error:
+                emit_event(
+                    ERROR_EVENT,
+                    workflow=node.key,
+                    error=self._build_error(error)["error"],
+                )
+                if not self.partial_results:
+                    raise
+                return None, self._build_error(error)["error"]
+            if explain_workflow_id:
+                emit_event(
+                    CLASSIFIED_EVENT, workflow=node.key, explain=explain_workflow_id
+                )
+                self._record_classification(node.key, explain_workflow_id)
+                if self.parallel:
+                    # The explain data only depended on this classification
+                    start_nodes(graph.get_branch(node.key, explain_workflow_id))
+            return explain_workflow_id, None
+
+        async def collect_data(node_ids):
+            if self.parallel:
+                start_nodes(node_ids)
+                values = await asyncio.gather(
+                    *(node_tasks[node_id] for node_id in node_ids)
+                )
+            else:
+                if self.batch:
+                    await self._execute_batches(
+                        [graph.nodes[node_id].key for node_id in node_ids], content
+                    )
+                values = []
+                for node_id in node_ids:
+                    start_nodes([node_id])
+                    values.append(await node_tasks[node_id])
+
+            data_keys = [graph.nodes[node_id].key for node_id in node_ids]
+            return {
+                "results": dict(zip(data_keys, values)),
+                "titles": {
+                    data_key: self.data_executor.get_data_name(data_key)
+                    for data_key in data_keys
+                },
+            }
 
         async def process_workflow(workflow_id):
-            workflow_results = {}
-            workflow_titles = {}
+            with trace_span(self.tracer, WORKFLOW_SPAN, workflow_id):
+                return await run_workflow(workflow_id)
 
-            # Process data requirements
-            data_requirements = self.workflow_executor.get_data_requirements(
-                workflow_id
+        async def run_workflow(workflow_id):
+            data_execution = await collect_data(
+                [
+                    graph.data_node_id(data_key)
+                    for data_key in self.workflow_executor.get_data_requirements(
+                        workflow_id
+                    )
+                ]
             )
-            data_execution = await self.execute_data(content, data_requirements)
-            workflow_results[workflow_id] = data_execution["results"]
-            workflow_titles[workflow_id] = {
-                "workflow": self.workflow_executor.get_workflow_name(workflow_id),
-                "data": data_execution["titles"],
+            workflow_results = {workflow_id: data_execution["results"]}
+            workflow_titles = {
+                workflow_id: {
+                    "workflow": self.workflow_executor.get_workflow_name(workflow_id),
+                    "data": data_execution["titles"],
+                }
             }
 
-            workflow_executor = self.workflow_executor.get_workflow_executor_by_id(
-                workflow_id
-            )
-            explain_workflow_id = workflow_executor(content)
-            if explain_workflow_id:
-                explain_data_requirements = (
-                    self.workflow_executor.get_data_requirements(explain_workflow_id)
+            classify_id = graph.classify_node_id(workflow_id)
+            if classify_id not in graph.nodes:
+                return {"results": workflow_results, "titles": workflow_titles}
+
+            start_nodes([classify_id])
+            explain_workflow_id, classification_error = await node_tasks[classify_id]
+            if classification_error:
+                workflow_results[workflow_id]["classification_error"] = (
+                    classification_error
                 )
-                explain_execution = await self.execute_data(
-                    content, explain_data_requirements
+            if explain_workflow_id:
+                emit_event(
+                    BRANCH_EVENT, workflow=workflow_id, explain=explain_workflow_id
                 )
+                with trace_span(self.tracer, WORKFLOW_SPAN, explain_workflow_id):
+                    explain_execution = await collect_data(
+                        graph.get_branch(workflow_id, explain_workflow_id)
+                    )
                 workflow_results[workflow_id][explain_workflow_id] = explain_execution[
                     "results"
                 ]
@@ -128,32 +554,341 @@ class AITextStructor:
                 }
             return {"results": workflow_results, "titles": workflow_titles}
 
-        if self.parallel:
-            workflow_tasks = [
-                process_workflow(workflow_id)
-                for workflow_id in self.workflow_executor.get_root_workflows()
+        def order_nodes(node_ids):
+            # Classifiers gate the explain data, so they go first
+            classify_ids = [
+                node_id
+                for node_id in node_ids
+                if graph.nodes[node_id].kind != DATA_NODE
             ]
-            workflow_results_list = await asyncio.gather(*workflow_tasks)
+            data_keys = self._order_data_keys(
+                [
+                    graph.nodes[node_id].key
+                    for node_id in node_ids
+                    if graph.nodes[node_id].kind == DATA_NODE
+                ],
+                content,
+            )
+            return classify_ids + [graph.data_node_id(key) for key in data_keys]
 
-            # Merge all workflow results into a single dictionary
-            results = {}
-            titles = {}
-            for workflow_result in workflow_results_list:
-                results.update(workflow_result["results"])
-                titles.update(workflow_result["titles"])
-            return {"results": results, "titles": titles}
-        else:
-            results = {}
-            titles = {}
-            for workflow_id in self.workflow_executor.get_root_workflows():
-                workflow_result = await process_workflow(workflow_id)
-                results.update(workflow_result["results"])
-                titles.update(workflow_result["titles"])
-            return {"results": results, "titles": titles}
+        async def run_scheduled():
+            # Sequentially, every classifier runs before any data so the chosen
+            # explain data is known, then all data runs in priority and cost order
+            node_ids = list(graph.initial_nodes)
+            for node_id in order_nodes(graph.initial_nodes):
+                if graph.nodes[node_id].kind == DATA_NODE:
+                    continue
+                start_nodes([node_id])
+                explain_workflow_id, _ = await node_tasks[node_id]
+                if explain_workflow_id:
+                    node_ids.extend(
+                        graph.get_branch(graph.nodes[node_id].key, explain_workflow_id)
+                    )
+            data_ids = [
+                node_id
+                for node_id in order_nodes(dict.fromkeys(node_ids))
+                if graph.nodes[node_id].kind == DATA_NODE
+            ]
+            if self.batch:
+                await self._execute_batches(
+                    [graph.nodes[node_id].key for node_id in data_ids], content
+                )
+            for node_id in data_ids:
+                start_nodes([node_id])
+                await node_tasks[node_id]
+
+        results = {}
+        titles = {}
+        speculated = {}
+        try:
+            if self.parallel:
+                start_nodes(order_nodes(graph.initial_nodes))
+                if self.speculative:
+                    for workflow_id in graph.root_workflows:
+                        speculated.update(
+                            self._speculate_explain_data(
+                                workflow_id, content, batch_tasks
+                            )
+                        )
+                workflow_results_list = await asyncio.gather(
+                    *(
+                        process_workflow(workflow_id)
+                        for workflow_id in graph.root_workflows
+                    )
+                )
+            else:
+                await run_scheduled()
+                workflow_results_list = []
+                for workflow_id in graph.root_workflows:
+                    workflow_results_list.append(await process_workflow(workflow_id))
+        finally:
+            for task in [*node_tasks.values(), *batch_tasks]:
+                task.cancel()
+            self._discard_speculation(speculated)
+
+        # Merge all workflow results into a single dictionary
+        for workflow_result in workflow_results_list:
+            results.update(workflow_result["results"])
+            titles.update(workflow_result["titles"])
+        return {"results": results, "titles": titles}
+
+    async def execute_many(
+        self,
+        contents: Iterable[Union[str, tuple]],
+        max_concurrency: int = 8,
+        metrics: bool = False,
+    ):
+        """
+        Execute AI processing for many documents under one concurrency limit.
+        A document that fails does not stop the others; its result is the
+        structured error {"error": {"type": ..., "message": ...}}.
+
+        Args:
+            contents (Iterable[Union[str, tuple]]): Documents to process, either
+                content strings or (document_id, content) tuples
+            max_concurrency (int): Maximum number of model calls in flight across
+                all documents
+            metrics (bool): Add the metrics of each document to its result
+
+        Returns:
+            list: Results of processing, in input order
+        """
+        results = []
+        async for index, _, result in self._iter_documents(
+            contents, max_concurrency, metrics
+        ):
+            results.append((index, result))
+        return [result for _, result in sorted(results, key=lambda item: item[0])]
+
+    async def iter_many(
+        self,
+        contents: Iterable[Union[str, tuple]],
+        max_concurrency: int = 8,
+        metrics: bool = False,
+    ):
+        """
+        Execute AI processing for many documents and yield results as they complete.
+
+        Documents are read lazily from contents and at most max_concurrency of them
+        are in flight at once, so memory stays flat regardless of input size.
+        A document that fails does not stop the others; its result is the
+        structured error {"error": {"type": ..., "message": ...}}.
+
+        Args:
+            contents (Iterable[Union[str, tuple]]): Documents to process, either
+                content strings or (document_id, content) tuples
+            max_concurrency (int): Maximum number of model calls in flight across
+                all documents
+            metrics (bool): Add the metrics of each document to its result
+
+        Yields:
+            tuple: Document ID (the input index for plain strings) and its results
+        """
+        async for _, document_id, result in self._iter_documents(
+            contents, max_concurrency, metrics
+        ):
+            yield document_id, result
+
+    async def stream(self, content: str, partial: bool = False):
+        """
+        Execute AI processing and yield events as soon as they happen.
+
+        Events are dictionaries with a "type" of:
+            field: a data field completed, with its data key, title and result
+            partial: the answer of an object or list field parsed so far, with
+                its data key and result (only if partial is enabled)
+            classified: a classifier chose an explain workflow
+            branch: the data of a chosen explain workflow started
+            error: a data field or classifier failed, with the structured error
+            skipped: a data field was skipped for the token budget
+            completed: the final result, identical to the result of execute
+
+        Args:
+            content (str): Content to process
+            partial (bool): Stream model responses of object and list fields and
+                emit each new partially parsed value
+
+        Yields:
+            dict: Events in the order they happened
+
+        Raises:
+            Exception: The error that failed the document, after its error event
+        """
+        queue = asyncio.Queue()
+        done = object()
+
+        async def run():
+            with emit_events(queue.put_nowait, partial):
+                try:
+                    return await self.execute(content)
+                finally:
+                    queue.put_nowait(done)
+
+        task = asyncio.ensure_future(run())
+        try:
+            while True:
+                event = await queue.get()
+                if event is done:
+                    break
+                yield event
+            yield {"type": COMPLETED_EVENT, "result": task.result()}
+        finally:
+            task.cancel()
+
+    async def _iter_documents(
+        self, contents, max_concurrency: int, metrics: bool = False
+    ):
+        """
+        Schedule documents with a bounded number in flight and yield them as they
+        complete. Failed documents are yielded as their structured error.
+
+        Args:
+            contents (Iterable[Union[str, tuple]]): Documents to process
+            max_concurrency (int): Maximum number of model calls and documents in flight
+            metrics (bool): Add the metrics of each document to its result
+
+        Yields:
+            tuple: Input index, document ID and results of processing
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+
+        call_limiter = asyncio.Semaphore(max_concurrency)
+        documents = enumerate(contents)
+        pending = {}
+
+        def start_next():
+            for index, item in documents:
+                if isinstance(item, tuple):
+                    document_id, content = item
+                else:
+                    document_id, content = index, item
+                document = self._spawn_document(call_limiter)
+                task = asyncio.ensure_future(document.execute(content, metrics))
+                pending[task] = (index, document_id)
+                return True
+            return False
+
+        try:
+            while len(pending) < max_concurrency and start_next():
+                pass
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    index, document_id = pending.pop(task)
+                    start_next()
+                    try:
+                        result = task.result()
+                    except Exception as error:
+                        result = self._build_error(error)
+                    yield index, document_id, result
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _spawn_document(self, call_limiter):
+        """
+        Create a per-document copy that shares the compiled executors but has its
+        own cache, so results of finished documents can be released
+
+        Args:
+            call_limiter (asyncio.Semaphore): Concurrency limit shared by all documents
+
+        Returns:
+            AITextStructor: Copy of the engine for a single document
+        """
+        document = copy.copy(self)
+        document.data_cache = {}
+        document._inflight = {}
+        document._waiters = {}
+        document._call_limiter = call_limiter
+        return document
+
+    def _order_data_keys(self, data_keys, content: str):
+        """
+        Order data keys by their configured priority, then by estimated tokens,
+        so cheap and important fields run first under a token budget
+
+        Args:
+            data_keys (list): Keys of the data executors
+            content (str): Content to process
+
+        Returns:
+            list: The keys in scheduling order
+        """
+        return sorted(
+            dict.fromkeys(data_keys),
+            key=lambda data_key: (
+                self.data_executor.get_plan(data_key).priority,
+                self.data_executor.estimate_field_tokens(data_key, content),
+            ),
+        )
+
+    async def _get_data_result(self, data_key: str, content: str):
+        """
+        Get the result of a data key, as a structured error in partial results mode.
+        Under a token budget, a data key that is not cached or running reserves its
+        estimated tokens first and is skipped if they do not fit.
+
+        Args:
+            data_key (str): Key for the data executor
+            content (str): Content to process
+
+        Returns:
+            The result of the data execution, an error object if it failed and
+            partial results are enabled, or a skipped marker
+        """
+        budget = get_token_budget()
+        cache_key = self._get_cache_key(data_key, content)
+        if (
+            budget is not None
+            and cache_key not in self.data_cache
+            and cache_key not in self._inflight
+        ):
+            tokens = self.data_executor.estimate_field_tokens(data_key, content)
+            if not budget.reserve(tokens):
+                skipped = budget.skip(data_key, tokens)
+                emit_event(SKIPPED_EVENT, data=data_key, **skipped)
+                return skipped
+        try:
+            result = await self._get_or_execute_data(data_key, content)
+        except Exception as error:
+            emit_event(
+                ERROR_EVENT, data=data_key, error=self._build_error(error)["error"]
+            )
+            if not self.partial_results:
+                raise
+            return self._build_error(error)
+        emit_event(
+            FIELD_EVENT,
+            data=data_key,
+            title=self.data_executor.get_data_name(data_key),
+            result=result,
+        )
+        return result
+
+    @staticmethod
+    def _build_error(error: Exception) -> dict:
+        """
+        Build the structured error returned for a failed call in partial results mode
+
+        Args:
+            error (Exception): The error of the failed call
+
+        Returns:
+            dict: Error type and message
+        """
+        return {"error": {"type": type(error).__name__, "message": str(error)}}
 
     async def _get_or_execute_data(self, data_key: str, content: str):
         """
-        Get data from cache or execute data executor if not cached
+        Get data from cache or execute data executor if not cached.
+
+        Results are cached per (data key, content) pair. Concurrent requests for
+        the same pair share a single in-flight execution, while different pairs
+        run concurrently.
 
         Args:
             data_key (str): Key for the data executor
@@ -162,12 +897,526 @@ class AITextStructor:
         Returns:
             The result of the data execution or cached value
         """
-        cache_key = f"{data_key}"
-        async with self._cache_lock:
-            if cache_key not in self.data_cache:
-                executor = self.data_executor.get_executor(data_key)
-                loop = asyncio.get_running_loop()
-                self.data_cache[cache_key] = await loop.run_in_executor(
-                    None, executor, content
-                )
+        cache_key = self._get_cache_key(data_key, content)
+        if cache_key in self.data_cache:
             return self.data_cache[cache_key]
+
+        task = self._start_data_task(data_key, content)
+
+        # Shield the shared execution so one cancelled caller does not cancel it
+        # for every other caller awaiting the same key
+        self._waiters[cache_key] = self._waiters.get(cache_key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[cache_key] -= 1
+            if not self._waiters[cache_key]:
+                del self._waiters[cache_key]
+
+    def _start_data_task(
+        self, data_key: str, content: str, priority: int = PRIORITY_DATA
+    ):
+        """
+        Get the in-flight execution for a data key, starting it if needed
+
+        Args:
+            data_key (str): Key for the data executor
+            content (str): Content to process
+            priority (int): Rate limiter priority if the execution is started
+
+        Returns:
+            asyncio.Future: The shared execution of the data key
+        """
+        cache_key = self._get_cache_key(data_key, content)
+        task = self._inflight.get(cache_key)
+        if task is None:
+            task = asyncio.ensure_future(
+                self._run_data_executor(data_key, content, priority)
+            )
+            self._inflight[cache_key] = task
+            task.add_done_callback(
+                lambda done, key=cache_key: self._finish_inflight(key, done)
+            )
+        return task
+
+    def _speculate_explain_data(
+        self, workflow_id: str, content: str, batch_tasks: list
+    ):
+        """
+        Start data of explain workflows that are likely to be chosen before the
+        classifier has answered.
+
+        A data field is started when the estimated probability that the chosen
+        explain workflow needs it reaches speculation_threshold. Probabilities
+        come from the classifications observed so far by this engine.
+
+        Args:
+            workflow_id (str): ID of the prompt workflow being classified
+            content (str): Content to process
+            batch_tasks (list): Receives the batch completions started for the
+                speculated data, so the document can cancel them
+
+        Returns:
+            dict: Speculatively started executions by cache key
+        """
+        if get_token_budget() is not None:
+            return {}  # Speculative work would spend budget on data not needed
+        likelihoods = self.workflow_executor.get_explain_data_likelihoods(
+            workflow_id, self._classification_counts.get(workflow_id)
+        )
+        data_keys = [
+            data_key
+            for data_key, likelihood in likelihoods.items()
+            if likelihood >= self.speculation_threshold
+            and self._get_cache_key(data_key, content) not in self.data_cache
+            and self._get_cache_key(data_key, content) not in self._inflight
+        ]
+        if self.batch:
+            batch_tasks.extend(self._schedule_batches(data_keys, content))
+        return {
+            self._get_cache_key(data_key, content): self._start_data_task(
+                data_key, content, PRIORITY_SPECULATIVE
+            )
+            for data_key in data_keys
+        }
+
+    def _discard_speculation(self, speculated: dict):
+        """
+        Cancel speculative executions that nobody is waiting for
+
+        Args:
+            speculated (dict): Speculatively started executions by cache key
+        """
+        for cache_key, task in speculated.items():
+            if not task.done() and not self._waiters.get(cache_key):
+                task.cancel()
+
+    def _record_classification(self, workflow_id: str, explain_workflow_id: str):
+        """
+        Count a classifier answer to estimate explain workflow likelihoods
+
+        Args:
+            workflow_id (str): ID of the prompt workflow
+            explain_workflow_id (str): ID of the chosen explain workflow
+        """
+        counts = self._classification_counts.setdefault(workflow_id, {})
+        counts[explain_workflow_id] = counts.get(explain_workflow_id, 0) + 1
+
+    async def _run_data_executor(
+        self, data_key: str, content: str, priority: int = PRIORITY_DATA
+    ):
+        """
+        Run the data executor for a key, natively async when supported and in
+        the default thread pool otherwise.
+
+        Fields configured with relevance filtering only receive the passages of
+        the content that match them. Fields configured with a semantic cache
+        reuse the result of similar content sent to them before, if a semantic
+        cache is given. Fields configured with chunking are
+        extracted from each chunk of long content and the chunk results are
+        reduced into one result. String fields are reduced by summarizing the
+        chunk results with the same field prompt.
+
+        Args:
+            data_key (str): Key for the data executor
+            content (str): Content to process
+            priority (int): Rate limiter priority of the call
+
+        Returns:
+            The result of the data execution
+        """
+        with trace_span(self.tracer, FIELD_SPAN, data_key) as span:
+            update = get_incremental_update()
+            if update is not None and data_key in update.values:
+                if span is not None:
+                    span.attributes["incremental"] = True
+                return await self._update_data(data_key, update, priority)
+
+            content = self.data_executor.select_relevant(data_key, content)
+            config = self.data_executor.get_plan(data_key).semantic_cache
+            if config is None or self.semantic_cache is None:
+                return await self._run_chunks(data_key, content, priority)
+
+            match = self.semantic_cache.lookup(config.scope, content, config.threshold)
+            if span is not None:
+                span.attributes["semantic_hit"] = match is not None
+            if match is not None:
+                if span is not None:
+                    span.attributes["semantic_similarity"] = match.similarity
+                return match.result
+            result = await self._run_chunks(data_key, content, priority)
+            self.semantic_cache.add(config.scope, content, result)
+            return result
+
+    async def _update_data(
+        self, data_key: str, update: IncrementalUpdate, priority: int
+    ):
+        """
+        Update the previous result of a data field with appended content
+
+        Args:
+            data_key (str): Key for the data executor
+            update (IncrementalUpdate): Previous results and appended content
+            priority (int): Rate limiter priority of the calls
+
+        Returns:
+            The updated result
+        """
+        previous = update.values[data_key]
+        if self.data_executor.get_plan(data_key).data_type == "list":
+            appended = await self._run_chunks(data_key, update.appended, priority)
+            return merge_lists([previous, appended])
+        return await self._run_chunks(
+            data_key, build_update_content(previous, update.appended), priority
+        )
+
+    async def _run_chunks(self, data_key: str, content: str, priority: int):
+        """
+        Run the completions of a data executor over the chunks of the content
+        and reduce their results
+
+        Args:
+            data_key (str): Key for the data executor
+            content (str): Content to process
+            priority (int): Rate limiter priority of the calls
+
+        Returns:
+            The result of the data execution
+        """
+        chunks = self.data_executor.split_content(data_key, content)
+        if len(chunks) == 1:
+            with listen_partial(self._get_partial_listener(data_key)):
+                return await self._run_chunk(data_key, content, priority)
+
+        if self.parallel:
+            results = await asyncio.gather(
+                *(self._run_chunk(data_key, chunk, priority) for chunk in chunks)
+            )
+        else:
+            results = [
+                await self._run_chunk(data_key, chunk, priority) for chunk in chunks
+            ]
+
+        if self.data_executor.get_plan(data_key).data_type == "string":
+            return await self._run_chunk(
+                data_key, self.data_executor.build_reduce_content(results), priority
+            )
+        return self.data_executor.reduce_chunk_results(data_key, results)
+
+    def _get_partial_listener(self, data_key: str):
+        """
+        Build the listener emitting partial values of a data field while its
+        response streams, if the current stream requested partial values
+
+        Args:
+            data_key (str): Key for the data executor
+
+        Returns:
+            callable: The listener, or None if partial values are not emitted
+        """
+        data_type = self.data_executor.get_plan(data_key).data_type
+        if not (self.use_async and wants_partial() and data_type in ("object", "list")):
+            return None
+
+        def listener(value):
+            if data_type == "list" and isinstance(value, dict):
+                value = value.get("items", [])
+            emit_event(PARTIAL_EVENT, data=data_key, result=value)
+
+        return listener
+
+    async def _run_chunk(self, data_key: str, content: str, priority: int):
+        """
+        Run a single completion of a data executor
+
+        Args:
+            data_key (str): Key for the data executor
+            content (str): Content or chunk to process
+            priority (int): Rate limiter priority of the call
+
+        Returns:
+            The result of the completion
+        """
+        return await self._call_model(
+            self.data_executor.get_async_executor(data_key),
+            self.data_executor.get_executor(data_key),
+            content,
+            tokens=self.data_executor.estimate_tokens(data_key, content),
+            priority=priority,
+        )
+
+    def _schedule_batches(self, data_keys, content: str) -> list:
+        """
+        Start batch completions for data keys that are neither cached nor
+        running, concurrently. The caller owns the returned tasks and cancels
+        them when the document finishes or fails.
+
+        Args:
+            data_keys (list): Keys of the data executors to execute
+            content (str): Content to process
+
+        Returns:
+            list: The started batch tasks
+        """
+        tasks = []
+        for group in self._group_batches(data_keys, content):
+            futures = self._register_batch(group, content)
+            tasks.append(
+                asyncio.ensure_future(self._run_batch(group, futures, content))
+            )
+        return tasks
+
+    async def _execute_batches(self, data_keys, content: str):
+        """
+        Run batch completions for data keys that are neither cached nor
+        running, one at a time, for sequential execution
+
+        Args:
+            data_keys (list): Keys of the data executors to execute
+            content (str): Content to process
+        """
+        for group in self._group_batches(data_keys, content):
+            futures = self._register_batch(group, content)
+            await self._run_batch(group, futures, content)
+
+    def _group_batches(self, data_keys, content: str):
+        """
+        Group data keys that are neither cached nor running into batches.
+
+        Fields updated from a previous result are not batched. Under a token
+        budget, a batch is only kept if its estimated tokens fit the budget.
+
+        Args:
+            data_keys (list): Keys of the data executors to execute
+            content (str): Content to process
+
+        Returns:
+            list: Groups of at least two data keys
+        """
+        update = get_incremental_update()
+        budget = get_token_budget()
+        pending = []
+        for data_key in dict.fromkeys(data_keys):
+            if update is not None and data_key in update.values:
+                continue  # Updated from its previous result, not the content
+            cache_key = self._get_cache_key(data_key, content)
+            if cache_key not in self.data_cache and cache_key not in self._inflight:
+                pending.append(data_key)
+
+        groups = []
+        for group in self.data_executor.group_batches(
+            pending, self.batch_token_budget
+        ):
+            if len(group) < 2:
+                continue
+            if budget is not None and not budget.reserve(
+                self.data_executor.estimate_batch_tokens(group, content)
+            ):
+                continue  # The fields reserve their own tokens or are skipped
+            groups.append(group)
+        return groups
+
+    def _register_batch(self, group, content: str) -> dict:
+        """
+        Register every key of a batch as in flight before the completion
+        starts, so _get_or_execute_data awaits the batch instead of issuing its
+        own completion
+
+        Args:
+            group (list): Keys of the data executors in the batch
+            content (str): Content to process
+
+        Returns:
+            dict: Future awaiting each key's result
+        """
+        loop = asyncio.get_running_loop()
+        futures = {}
+        for data_key in group:
+            cache_key = self._get_cache_key(data_key, content)
+            future = loop.create_future()
+            future.add_done_callback(
+                lambda done, key=cache_key: self._finish_inflight(key, done)
+            )
+            self._inflight[cache_key] = future
+            futures[data_key] = future
+        return futures
+
+    async def _run_batch(self, data_keys, futures, content: str):
+        """
+        Run a batch completion and resolve the futures of its data keys.
+        Keys that are missing or invalid in the batch answer fall back to a
+        completion of their own.
+
+        Args:
+            data_keys (list): Keys of the data executors in the batch
+            futures (dict): Futures awaiting each key's result
+            content (str): Content to process
+        """
+        try:
+            try:
+                with trace_span(self.tracer, BATCH_SPAN, ",".join(data_keys)):
+                    results, failed = await self._call_model(
+                        self.data_executor.aexecute_batch,
+                        self.data_executor.execute_batch,
+                        data_keys,
+                        content,
+                        tokens=self.data_executor.estimate_batch_tokens(
+                            data_keys, content
+                        ),
+                    )
+            except Exception:
+                results, failed = {}, list(data_keys)
+
+            for data_key, result in results.items():
+                if not futures[data_key].done():
+                    futures[data_key].set_result(result)
+
+            if self.parallel:
+                await asyncio.gather(
+                    *(self._resolve_single(futures[key], key, content) for key in failed)
+                )
+            else:
+                for key in failed:
+                    await self._resolve_single(futures[key], key, content)
+        finally:
+            # Never leave callers waiting on a batch that was cancelled
+            for future in futures.values():
+                if not future.done():
+                    future.cancel()
+
+    async def _resolve_single(self, future, data_key: str, content: str):
+        """
+        Run the data executor for a single key and resolve its future
+
+        Args:
+            future (asyncio.Future): Future awaiting the key's result
+            data_key (str): Key for the data executor
+            content (str): Content to process
+        """
+        try:
+            result = await self._run_data_executor(data_key, content)
+        except Exception as error:
+            if not future.done():
+                future.set_exception(error)
+        else:
+            if not future.done():
+                future.set_result(result)
+
+    async def _classify_workflow(self, workflow_id: str, content: str):
+        """
+        Select the explain workflow for a prompt workflow without blocking the event loop
+
+        Args:
+            workflow_id (str): ID of the prompt workflow
+            content (str): Content to process
+
+        Returns:
+            str: Selected explain workflow ID, or None if the workflow has no explain paths
+        """
+        if not self.workflow_executor.get_explain_dependencies(workflow_id):
+            return None
+        update = get_incremental_update()
+        if update is not None and workflow_id in update.classifications:
+            return update.classifications[workflow_id]
+        budget = get_token_budget()
+        if budget is not None:
+            budget.charge(self.workflow_executor.estimate_tokens(workflow_id, content))
+
+        with trace_span(self.tracer, CLASSIFY_SPAN, workflow_id):
+            return await self._call_model(
+                self.workflow_executor.get_async_workflow_executor_by_id(workflow_id),
+                self.workflow_executor.get_workflow_executor_by_id(workflow_id),
+                content,
+                tokens=self.workflow_executor.estimate_tokens(workflow_id, content),
+                priority=PRIORITY_CLASSIFY,
+            )
+
+    async def _call_model(
+        self, async_call, sync_call, *args, tokens=0, priority=PRIORITY_DATA
+    ):
+        """
+        Run a model-backed call under the call policy, shared concurrency limit and
+        rate limiter, natively async when supported and in the default thread pool
+        otherwise. Every retry or hedged attempt waits on the rate limiter again.
+
+        The call is traced as a span with its queue, render, model and parse
+        times, tokens, cache hits and retries.
+
+        Args:
+            async_call (callable): Coroutine function performing the call
+            sync_call (callable): Synchronous function performing the same call
+            *args: Arguments of the call
+            tokens (int): Estimated prompt tokens of the call
+            priority (int): Rate limiter priority of the call
+
+        Returns:
+            The result of the call
+        """
+
+        async def send():
+            record.attempts += 1
+            queued_at = time.perf_counter()
+            if self.rate_limiter:
+                await self.rate_limiter.acquire(tokens, priority, queue=id(self))
+
+            async with self._call_limiter or contextlib.nullcontext():
+                record.queue_time += time.perf_counter() - queued_at
+                if self.use_async:
+                    request = async_call(*args)
+                else:
+                    # Worker threads see the call record through a copied context
+                    loop = asyncio.get_running_loop()
+                    request = loop.run_in_executor(
+                        None,
+                        functools.partial(
+                            contextvars.copy_context().run, sync_call, *args
+                        ),
+                    )
+                return await self.call_policy.timed(request)
+
+        with trace_span(self.tracer, CALL_SPAN, "model") as span:
+            with record_call() as record:
+                try:
+                    return await self.call_policy.run(send)
+                finally:
+                    if span is not None:
+                        span.attributes.update(record.as_attributes())
+
+    def _finish_inflight(self, cache_key, task):
+        """
+        Move a finished execution from the in-flight map into the data cache
+
+        Failed or cancelled executions are not cached so they can be retried.
+
+        Args:
+            cache_key (tuple): Cache key of the execution
+            task (asyncio.Future): The finished execution
+        """
+        self._inflight.pop(cache_key, None)
+        if not task.cancelled() and task.exception() is None:
+            self.data_cache[cache_key] = task.result()
+
+    @staticmethod
+    def _get_cache_key(data_key: str, content: str):
+        """
+        Build the cache key for a data key and content pair. Results updated
+        from a previous result only approximate a full extraction, so they are
+        keyed apart by the appended content and the previous result.
+
+        Args:
+            data_key (str): Key for the data executor
+            content (str): Content to process
+
+        Returns:
+            tuple: Data key and a digest of the content, and of the update if
+                the data key is updated from its previous result
+        """
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        update = get_incremental_update()
+        if update is None or data_key not in update.values:
+            return (data_key, digest)
+        previous = json.dumps(update.values[data_key], sort_keys=True, default=str)
+        update_digest = hashlib.sha256(
+            (previous + "\0" + update.appended).encode("utf-8")
+        ).hexdigest()
+        return (data_key, digest, update_digest)
@@ -0,0 +1,351 @@
+"""Module for offline benchmarks of the execution engine against a fake model."""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, List, Optional
+
+from .ai_text_structor import AITextStructor
+from .cassette import CassetteModel
+from .fake_model import FakeChatModel
+from .model_routing import collect_model_aliases
+
+
+MODES = {
+    "sequential": {"engine": {"parallel": False}, "max_concurrency": 1},
+    "parallel": {"engine": {"parallel": True}, "max_concurrency": 8},
+}
+
+SAMPLE_DOCUMENT = """Emma (Product Manager): Good morning, everyone. Let's start.
+Ryan (Developer): I finished the API integration and start on unit tests today.
+Sophia (Developer): I am refactoring the search query handling, I need usage data.
+Noah (Data Engineer): I will pull the latest data from the logs after the meeting.
+Emma: Thanks all, the demo is on Friday. The meeting took 15 minutes."""
+
+REPORT_COLUMNS = (
+    ("mode", "{}"),
+    ("documents", "{}"),
+    ("wall_time", "{:.3f}s"),
+    ("calls_per_document", "{:.1f}"),
+    ("peak_concurrency", "{}"),
+    ("mean_concurrency", "{:.2f}"),
+    ("per_call_overhead_ms", "{:.3f}"),
+)
+
+
+async def benchmark_mode(
+    engine_config: dict,
+    documents: List[str],
+    mode: str,
+    mode_config: dict,
+    model_options: dict,
+) -> dict:
+    """
+    Benchmark one execution mode over a list of documents.
+
+    The documents are processed once against a fake model with the configured
+    latency, measuring wall time and achieved concurrency, and once without
+    latency, where all remaining time is engine overhead.
+
+    Args:
+        engine_config (dict): Engine configuration with data and workflow
+        documents (List[str]): Documents to process
+        mode (str): Name of the mode
+        mode_config (dict): Engine arguments and max_concurrency of the mode
+        model_options (dict): FakeChatModel fields such as latency settings
+
+    Returns:
+        dict: Report of the mode
+    """
+    wall_time, model = await _run_documents(
+        engine_config, documents, mode_config, model_options
+    )
+    overhead_options = {
+        **model_options,
+        "latency": 0.0,
+        "latency_distribution": None,
+        "failure_rate": 0.0,
+    }
+    overhead_time, overhead_model = await _run_documents(
+        engine_config, documents, mode_config, overhead_options
+    )
+
+    calls = len(model.calls)
+    overhead_calls = max(1, len(overhead_model.calls))
+    return {
+        "mode": mode,
+        "documents": len(documents),
+        "wall_time": wall_time,
+        "calls": calls,
+        "calls_per_document": calls / len(documents),
+        "peak_concurrency": model.max_active,
+        "mean_concurrency": model.simulated_latency / wall_time,
+        "per_call_overhead_ms": 1000 * overhead_time / overhead_calls,
+    }
+
+
+async def _run_documents(engine_config, documents, mode_config, model_options):
+    """
+    Process documents with a fresh fake model and engine
+
+    Returns:
+        tuple: Wall time in seconds and the fake model
+    """
+    model = FakeChatModel.from_engine_config(engine_config, **model_options)
+    engine = AITextStructor(
+        engine_config,
+        model,
+        partial_results=True,
+        models=_single_model_registry(engine_config, model),
+        **mode_config.get("engine", {}),
+    )
+    started_at = time.perf_counter()
+    await engine.execute_many(
+        documents, max_concurrency=mode_config.get("max_concurrency", 8)
+    )
+    return time.perf_counter() - started_at, model
+
+
+def _single_model_registry(engine_config: dict, model) -> dict:
+    """
+    Register one model under every model alias of an engine configuration
+    """
+    return {alias: model for alias in collect_model_aliases(engine_config)}
+
+
+def run_benchmark(
+    engine_config: dict,
+    documents: Optional[List[str]] = None,
+    document_count: int = 10,
+    modes: Optional[Dict[str, dict]] = None,
+    **model_options,
+) -> List[dict]:
+    """
+    Benchmark the engine in several execution modes against a fake model
+
+    Args:
+        engine_config (dict): Engine configuration with data and workflow
+        documents (List[str], optional): Documents to process, document_count
+            copies of a sample meeting transcript by default
+        document_count (int): Number of sample documents if none are given
+        modes (Dict[str, dict], optional): Engine arguments and max_concurrency by
+            mode name, sequential and parallel by default
+        **model_options: FakeChatModel fields, e.g. latency, latency_distribution,
+            failure_rate and seed
+
+    Returns:
+        List[dict]: Report of every mode
+    """
+    if documents is None:
+        documents = [SAMPLE_DOCUMENT] * document_count
+    if not documents:
+        raise ValueError("At least one document must be benchmarked")
+    model_options.setdefault("seed", 0)
+
+    return [
+        asyncio.run(
+            benchmark_mode(engine_config, documents, mode, mode_config, model_options)
+        )
+        for mode, mode_config in (modes or MODES).items()
+    ]
+
+
+def replay_benchmark(
+    engine_config: dict,
+    cassette_path: str,
+    documents: List[str],
+    max_concurrency: int = 8,
+    latency_scale: float = 1.0,
+    **engine_options,
+) -> dict:
+    """
+    Benchmark engine throughput against calls recorded from a real model. The
+    documents are processed with every call replayed from the cassette after
+    its recorded latency times latency_scale.
+
+    Args:
+        engine_config (dict): Engine configuration with data and workflow
+        cassette_path (str): Path of a cassette recorded with CassetteModel
+        documents (List[str]): Documents to process, as recorded
+        max_concurrency (int): Maximum number of model calls in flight
+        latency_scale (float): Fraction of the recorded latency replayed
+        **engine_options: Further AITextStructor arguments
+
+    Returns:
+        dict: Documents, wall time, replayed calls, the fingerprint and prompt
+            of every call missing from the cassette, and documents per second
+    """
+    if not documents:
+        raise ValueError("At least one document must be benchmarked")
+    model = CassetteModel(path=cassette_path, latency_scale=latency_scale)
+    engine_options.setdefault("models", _single_model_registry(engine_config, model))
+    engine = AITextStructor(
+        engine_config, model, partial_results=True, **engine_options
+    )
+    started_at = time.perf_counter()
+    asyncio.run(engine.execute_many(documents, max_concurrency=max_concurrency))
+    wall_time = time.perf_counter() - started_at
+    return {
+        "documents": len(documents),
+        "wall_time": wall_time,
+        "calls": model.hits,
+        "misses": model.misses,
+        "documents_per_second": len(documents) / wall_time,
+    }
+
+
+def measure_prefix_sharing(
+    engine_config: dict, content: str = SAMPLE_DOCUMENT, **engine_options
+) -> dict:
+    """
+    Measure how much of the prompts of one document providers can serve from
+    their prompt cache. Every call is compared with the calls sent before it, and
+    the longest identical prefix of the serialized messages counts as shared.
+
+    Args:
+        engine_config (dict): Engine configuration with data and workflow
+        content (str): Document to process, a sample meeting transcript by default
+        **engine_options: Further AITextStructor arguments
+
+    Returns:
+        dict: Number of calls, prompt bytes, shared prefix bytes and their ratio
+    """
+    model = FakeChatModel.from_engine_config(engine_config)
+    engine_options.setdefault("models", _single_model_registry(engine_config, model))
+    engine = AITextStructor(engine_config, model, partial_results=True, **engine_options)
+    asyncio.run(engine.execute(content))
+
+    prompts = [_serialize_prompt(messages) for messages in model.prompts]
+    prompt_bytes = sum(len(prompt) for prompt in prompts)
+    shared_bytes = sum(
+        max((_common_prefix_length(prompt, other) for other in prompts[:index]), default=0)
+        for index, prompt in enumerate(prompts)
+    )
+    return {
+        "calls": len(prompts),
+        "prompt_bytes": prompt_bytes,
+        "shared_prefix_bytes": shared_bytes,
+        "shared_prefix_ratio": shared_bytes / prompt_bytes if prompt_bytes else 0.0,
+    }
+
+
+def _serialize_prompt(messages) -> bytes:
+    """
+    Serialize prompt messages with their roles, as a provider sees them
+    """
+    parts = []
+    for message in messages:
+        content = message.content
+        if isinstance(content, list):
+            content = "".join(
+                block.get("text", "") if isinstance(block, dict) else str(block)
+                for block in content
+            )
+        parts.append(f"<{message.type}>{content}")
+    return "".join(parts).encode("utf-8")
+
+
+def _common_prefix_length(first: bytes, second: bytes) -> int:
+    length = min(len(first), len(second))
+    for index in range(length):
+        if first[index] != second[index]:
+            return index
+    return length
+
+
+def format_report(reports: List[dict]) -> str:
+    """
+    Format benchmark reports as a text table
+
+    Args:
+        reports (List[dict]): Reports returned by run_benchmark
+
+    Returns:
+        str: One row per mode
+    """
+    rows = [[name for name, _ in REPORT_COLUMNS]]
+    for report in reports:
+        rows.append([fmt.format(report[name]) for name, fmt in REPORT_COLUMNS])
+    widths = [max(len(row[index]) for row in rows) for index in range(len(rows[0]))]
+    return "\n".join(
+        "  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip()
+        for row in rows
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the execution engine against an offline fake model"
+    )
+    parser.add_argument("engine", help="Path of the engine configuration JSON")
+    parser.add_argument("--documents", type=int, default=10)
+    parser.add_argument("--content", help="Path of a document to process")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument(
+        "--distribution",
+        nargs=3,
+        metavar=("KIND", "FIRST", "SECOND"),
+        help="uniform MIN MAX or lognormal MEDIAN SIGMA latency distribution",
+    )
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--prefix",
+        action="store_true",
+        help="Report the prompt prefix bytes shared across the calls of a document",
+    )
+    parser.add_argument(
+        "--cassette",
+        help="Replay the calls recorded in a cassette instead of a fake model",
+    )
+    parser.add_argument(
+        "--latency-scale",
+        type=float,
+        default=1.0,
+        help="Fraction of the recorded latency replayed from the cassette",
+    )
+    args = parser.parse_args(argv)
+
+    with open(args.engine, encoding="utf-8") as engine_file:
+        engine_config = json.load(engine_file)
+    documents = None
+    if args.content:
+        with open(args.content, encoding="utf-8") as content_file:
+            documents = [content_file.read()] * args.documents
+
+    if args.prefix:
+        content = documents[0] if documents else SAMPLE_DOCUMENT
+        report = measure_prefix_sharing(engine_config, content)
+        print(json.dumps(report, indent=2))
+        return
+
+    if args.cassette:
+        report = replay_benchmark(
+            engine_config,
+            args.cassette,
+            documents or [SAMPLE_DOCUMENT] * args.documents,
+            latency_scale=args.latency_scale,
+        )
+        print(json.dumps(report, indent=2))
+        return
+
+    distribution = None
+    if args.distribution:
+        kind, first, second = args.distribution
+        distribution = (kind, float(first), float(second))
+
+    reports = run_benchmark(
+        engine_config,
+        documents,
+        document_count=args.documents,
+        latency=args.latency,
+        latency_distribution=distribution,
+        failure_rate=args.failure_rate,
+        seed=args.seed,
+    )
+    print(format_report(reports))
+
+
+if __name__ == "__main__":
+    main()
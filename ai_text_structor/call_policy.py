@@ -0,0 +1,170 @@
+"""Module for retry, timeout and hedging policies of model calls."""
+
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Callable, Optional, Tuple, Type
+
+
+class CallPolicy:
+    """
+    Per-call policy applying timeouts, retries with exponential backoff and jitter,
+    and optional hedged duplicate requests to model calls
+    """
+
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        max_attempts: int = 1,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        jitter: float = 0.5,
+        hedge_percentile: Optional[float] = None,
+        hedge_min_samples: int = 20,
+        hedge_after: Optional[float] = None,
+        retry_on: Tuple[Type[BaseException], ...] = (Exception,),
+        clock: Callable = time.monotonic,
+        sleep: Callable = asyncio.sleep,
+        random_source: Callable = random.random,
+    ):
+        """
+        Initialize CallPolicy
+
+        Args:
+            timeout (float, optional): Seconds a single model call may take
+            max_attempts (int): Maximum attempts per call, including the first one
+            backoff_base (float): Backoff before the second attempt, doubled per attempt
+            backoff_max (float): Upper bound of the backoff in seconds
+            jitter (float): Fraction of the backoff that is randomized, between 0 and 1
+            hedge_percentile (float, optional): Latency percentile (e.g. 0.95) of
+                recent calls after which a duplicate request is sent
+            hedge_min_samples (int): Calls observed before percentile hedging starts
+            hedge_after (float, optional): Fixed seconds after which a duplicate request
+                is sent, used until enough samples exist for percentile hedging
+            retry_on (tuple): Exception types that are retried
+            clock (Callable): Function returning the current time in seconds
+            sleep (Callable): Coroutine function sleeping for a number of seconds
+            random_source (Callable): Function returning a float in [0, 1)
+
+        Raises:
+            ValueError: If max_attempts is below 1 or jitter is outside [0, 1]
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        if not 0 <= jitter <= 1:
+            raise ValueError("jitter must be between 0 and 1")
+
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_after = hedge_after
+        self.retry_on = retry_on
+        self.clock = clock
+        self.sleep = sleep
+        self.random_source = random_source
+        self.latencies = deque(maxlen=500)  # Latencies of recent successful calls
+
+    async def run(self, call: Callable):
+        """
+        Run a call under the policy
+
+        Args:
+            call (Callable): Coroutine function performing one attempt of the call
+
+        Returns:
+            The result of the first successful attempt
+
+        Raises:
+            Exception: The error of the last attempt if every attempt failed
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                return await self._attempt(call)
+            except self.retry_on:
+                if attempt == self.max_attempts:
+                    raise
+                await self.sleep(self.get_backoff(attempt))
+
+    async def timed(self, awaitable):
+        """
+        Await a single model call under the policy timeout
+
+        Args:
+            awaitable: The model call to await
+
+        Returns:
+            The result of the call
+
+        Raises:
+            asyncio.TimeoutError: If the call exceeds the timeout
+        """
+        if self.timeout is None:
+            return await awaitable
+        return await asyncio.wait_for(awaitable, self.timeout)
+
+    def get_backoff(self, attempt: int) -> float:
+        """
+        Returns the seconds to wait after a failed attempt
+
+        Args:
+            attempt (int): Number of the failed attempt, starting at 1
+
+        Returns:
+            float: Backoff with jitter applied
+        """
+        backoff = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        return backoff * (1 - self.jitter * self.random_source())
+
+    def get_hedge_delay(self) -> Optional[float]:
+        """
+        Returns the seconds after which a duplicate request is sent
+
+        Returns:
+            float: Hedge delay, or None if hedging is disabled
+        """
+        if self.hedge_percentile is not None and (
+            len(self.latencies) >= self.hedge_min_samples
+        ):
+            ordered = sorted(self.latencies)
+            index = min(len(ordered) - 1, int(self.hedge_percentile * len(ordered)))
+            return ordered[index]
+        return self.hedge_after
+
+    async def _attempt(self, call: Callable):
+        """
+        Run one attempt, sending a hedged duplicate if it exceeds the hedge delay
+
+        Args:
+            call (Callable): Coroutine function performing the call
+
+        Returns:
+            The result of whichever request succeeds first
+        """
+        started_at = self.clock()
+        hedge_delay = self.get_hedge_delay()
+        tasks = {asyncio.ensure_future(call())}
+        try:
+            if hedge_delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+                if not done:
+                    tasks.add(asyncio.ensure_future(call()))
+
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(
+                    tasks, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        self.latencies.append(self.clock() - started_at)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,209 @@
+"""Module for recording model calls to a file and replaying them offline."""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from .response_cache import get_model_identity
+
+
+CASSETTE_MODES = ("record", "replay", "auto")
+
+
+class CassetteModel(BaseChatModel):
+    """
+    Chat model recording the calls of a wrapped model to a cassette file and
+    replaying them without the model.
+
+    Calls are identified by a fingerprint of their messages and call options
+    such as bound tools. In record mode every call goes to the model and its
+    response and latency are appended to the cassette, one JSON line per call.
+    In replay mode calls are answered from the cassette, waiting the recorded
+    latency times latency_scale; calls missing from the cassette are reported
+    in misses and raise RuntimeError. Auto mode replays recorded calls and
+    records the others.
+    """
+
+    path: str
+    mode: str = "replay"
+    model: Optional[Any] = None  # Wrapped model, required to record
+    latency_scale: float = 0.0  # Fraction of the recorded latency replayed
+    entries: Dict[str, dict] = {}
+    hits: int = 0
+    misses: List[dict] = []  # Fingerprint and prompt of every missed call
+    lock: Any = None
+
+    def __init__(self, **kwargs: Any):
+        """
+        Initialize CassetteModel, loading the calls already in the cassette
+
+        Args:
+            path (str): Path of the cassette file
+            mode (str): record, replay or auto
+            model: LangChain model instance whose calls are recorded
+            latency_scale (float): Fraction of the recorded latency waited when
+                a call is replayed, 0 to replay instantly and 1 for realistic
+                latency
+
+        Raises:
+            ValueError: If mode is invalid, or no model is given to record
+        """
+        super().__init__(**kwargs)
+        if self.mode not in CASSETTE_MODES:
+            raise ValueError(
+                f"Invalid cassette mode '{self.mode}', "
+                f"expected one of {', '.join(CASSETTE_MODES)}"
+            )
+        if self.mode != "replay" and self.model is None:
+            raise ValueError(f"A model must be provided to {self.mode} a cassette")
+        self.entries = load_cassette(self.path)
+        self.misses = []
+        self.lock = threading.Lock()
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        model = get_model_identity(self.model) if self.model is not None else None
+        return {"cassette": os.path.abspath(self.path), "model": model}
+
+    def bind_tools(self, tools, tool_choice=None, **kwargs: Any):
+        if self.model is None:
+            formatted = [convert_to_openai_tool(tool) for tool in tools]
+            return self.bind(tools=formatted, tool_choice=tool_choice, **kwargs)
+        # Tools are formatted by the wrapped model, so recordings match its calls
+        bound = self.model.bind_tools(tools, tool_choice=tool_choice, **kwargs)
+        return self.bind(**bound.kwargs)
+
+    @staticmethod
+    def fingerprint(messages, **options: Any) -> str:
+        """
+        Build the fingerprint identifying a call
+
+        Args:
+            messages (list): Prompt messages of the call
+            **options: Call options such as stop and bound tools
+
+        Returns:
+            str: Hex digest of the messages and options
+        """
+        payload = json.dumps(
+            [
+                [(message.type, message.content) for message in messages],
+                {key: value for key, value in options.items() if value is not None},
+            ],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _lookup(self, messages, options: dict):
+        """
+        Returns the fingerprint of a call and its recorded entry, or None if the
+        call must go to the model. Misses in replay mode are reported and raise.
+        """
+        key = self.fingerprint(messages, **options)
+        if self.mode == "record":
+            return key, None
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                return key, entry
+            if self.mode == "replay":
+                text = "\n".join(str(message.content) for message in messages)
+                self.misses.append({"fingerprint": key, "prompt": text[:500]})
+        if self.mode == "replay":
+            raise RuntimeError(f"Call {key[:12]} is not recorded in {self.path}")
+        return key, None
+
+    def _record(self, key: str, message, latency: float):
+        entry = {
+            "fingerprint": key,
+            "latency": round(latency, 6),
+            "message": message_to_dict(message),
+        }
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self.lock:
+            self.entries[key] = entry
+            with open(self.path, "a", encoding="utf-8") as cassette_file:
+                cassette_file.write(line)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        key, entry = self._lookup(messages, {"stop": stop, **kwargs})
+        if entry is not None:
+            time.sleep(entry["latency"] * self.latency_scale)
+            return _build_result(entry)
+        started_at = time.perf_counter()
+        message = self.model.invoke(messages, stop=stop, **kwargs)
+        self._record(key, message, time.perf_counter() - started_at)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        key, entry = self._lookup(messages, {"stop": stop, **kwargs})
+        if entry is not None:
+            await asyncio.sleep(entry["latency"] * self.latency_scale)
+            return _build_result(entry)
+        started_at = time.perf_counter()
+        message = await self.model.ainvoke(messages, stop=stop, **kwargs)
+        self._record(key, message, time.perf_counter() - started_at)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def get_stats(self) -> dict:
+        """
+        Returns replay counters of the cassette
+
+        Returns:
+            dict: Recorded calls, replayed calls, missed calls and the total
+                recorded latency
+        """
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": len(self.misses),
+                "recorded_latency": sum(
+                    entry["latency"] for entry in self.entries.values()
+                ),
+            }
+
+
+def _build_result(entry: dict) -> ChatResult:
+    message = messages_from_dict([entry["message"]])[0]
+    return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def load_cassette(path: str) -> Dict[str, dict]:
+    """
+    Load the calls recorded in a cassette file. The last recording of a call
+    wins, and a truncated last line, e.g. from an interrupted run, is ignored.
+
+    Args:
+        path (str): Path of the cassette file
+
+    Returns:
+        Dict[str, dict]: Recorded entries by fingerprint, empty if the file
+            does not exist
+    """
+    entries = {}
+    if not os.path.exists(path):
+        return entries
+    with open(path, encoding="utf-8") as cassette_file:
+        for line in cassette_file:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            entries[entry["fingerprint"]] = entry
+    return entries
@@ -1,7 +1,104 @@
-from .process_object import run_completion_for_object
-from .process_string import run_completion_for_string
-from .process_numeric import run_completion_for_numeric
-from .process_list import run_completion_for_list
+import dataclasses
+from types import MappingProxyType
+
+from langchain_core.runnables.base import coerce_to_runnable
+
+from .field_plan import FieldDefinition, FieldPlan
+from .process_batch import build_batch_components, split_batch_result
+from .process_chunks import (
+    ChunkingConfig,
+    aggregate_numbers,
+    build_partial_answers,
+    merge_lists,
+    merge_objects,
+    split_content,
+)
+from .process_object import build_object_components
+from .process_string import build_string_components
+from .process_numeric import build_numeric_components
+from .process_list import build_list_components
+from .output_parsing import build_repair_prompts
+from .model_routing import ModelRegistry, arun_cascade, parse_model_aliases, run_cascade
+from .preprocessing import RelevanceConfig, build_relevance_query, get_prepared_document
+from .prompt_layout import mark_cache_control
+from .response_cache import ainvoke_cached, invoke_cached
+from .semantic_cache import SemanticCacheConfig
+from .structured_output import build_structured_components, build_structured_model
+from .tokens import estimate_tokens
+
+
+COMPONENT_BUILDERS = {
+    "object": build_object_components,
+    "string": build_string_components,
+    "numeric": build_numeric_components,
+    "list": build_list_components,
+}
+
+
+def compile_field(key, config):
+    """
+    Compile the model-independent components of a data field
+
+    Args:
+        key (str): Key of the data field
+        config (dict): Configuration of the data field
+
+    Returns:
+        FieldDefinition: The compiled field
+
+    Raises:
+        ValueError: If the configuration has a missing or invalid type
+        ValueError: If the priority is not an integer
+        ValueError: If the model is not an alias or a list of aliases
+    """
+    data_type = config.get("type")
+    if not data_type:
+        raise ValueError(f"Configuration for key '{key}' must specify a type")
+    if data_type not in COMPONENT_BUILDERS:
+        raise ValueError(f"Invalid type '{data_type}' for key '{key}'")
+
+    chunking = None
+    if "chunking" in config:
+        chunking = ChunkingConfig.from_config(key, config["chunking"] or {})
+
+    relevance = None
+    if "relevance" in config:
+        relevance = RelevanceConfig.from_config(
+            key, config["relevance"] or {}, build_relevance_query(config)
+        )
+
+    priority = config.get("priority", 0)
+    if not isinstance(priority, int) or isinstance(priority, bool):
+        raise ValueError(f"Priority for key '{key}' must be an integer")
+
+    model_aliases = parse_model_aliases(key, config)
+
+    semantic_cache = None
+    if "semantic_cache" in config:
+        semantic_cache = SemanticCacheConfig.from_config(
+            key, config["semantic_cache"] or {}, config
+        )
+
+    components = COMPONENT_BUILDERS[data_type](config)
+    return FieldDefinition(
+        key=key,
+        data_type=data_type,
+        prompts=components["prompts"],
+        parser=components["parser"],
+        args=MappingProxyType(dict(components["args"])),
+        model_class=components["model_class"],
+        batchable=bool(
+            config.get("batch", True)
+            and chunking is None
+            and relevance is None
+            and semantic_cache is None
+        ),
+        chunking=chunking,
+        relevance=relevance,
+        semantic_cache=semantic_cache,
+        priority=priority,
+        model_aliases=model_aliases,
+    )
 
 
 class DataExecutor:
@@ -9,17 +106,39 @@ class DataExecutor:
     Manages the execution and state management of data processing from prompts
     """
 
-    def __init__(self, data_dict=None, model=None):
+    def __init__(
+        self,
+        data_dict=None,
+        model=None,
+        response_cache=None,
+        worker_pool=None,
+        structured_output=False,
+        cache_control=False,
+        fields=None,
+        models=None,
+    ):
         """
         Initialize DataExecutor with a data dictionary and LangChain model
 
         Args:
             data_dict (dict): Dictionary containing data fields and their configurations
             model: LangChain AI model instance
+            response_cache (ResponseCache, optional): Persistent cache of model responses
+            worker_pool (WorkerPool, optional): Process pool rendering prompts and
+                parsing model outputs
+            structured_output (bool): Run object, list and batch plans through the
+                native structured output of each model that supports it
+            cache_control (bool): Mark the shared prompt prefix of every plan for
+                provider prompt caching
+            fields (dict, optional): FieldDefinition by key, already compiled from
+                data_dict, e.g. by an EngineDefinition
+            models (dict, optional): LangChain models by the alias fields refer to
+                with "model". Fields without "model" call model
 
         Raises:
             ValueError: If data_dict is None or empty
             ValueError: If model is None
+            ValueError: If a field refers to a model alias that is not registered
         """
         if not data_dict:
             raise ValueError("data_dict must be provided and cannot be empty")
@@ -28,66 +147,428 @@ class DataExecutor:
 
         self.data_dict = data_dict
         self.model = model
+        self.registry = ModelRegistry(model, models)
+        self.response_cache = response_cache
+        self.worker_pool = worker_pool
+        self.structured_output = structured_output
+        self.cache_control = cache_control
+        self.fields = fields
+        if fields is None:
+            self.fields = {
+                key: compile_field(key, config) for key, config in data_dict.items()
+            }
+        self.plans = {}
+        self.batch_plans = {}
         self.executors = {}
+        self.async_executors = {}
         self._initialize_executors()
 
     def _initialize_executors(self):
         """
-        Initialize executor functions that return chain components for each key.
-        Each executor returns a dict with:
-        - prompts: The prompts to be used
-        - parser: Function to parse the output
-        - args: Additional arguments for the chain
-        """
-        for key, config in self.data_dict.items():
-            data_type = config.get("type")
-            if not data_type:
-                raise ValueError(f"Configuration for key '{key}' must specify a type")
-
-            if data_type == "object":
-                self.executors[key] = (
-                    lambda content, c=config, m=self.model: self._execute_chain(
-                        run_completion_for_object(content, c), m
-                    )
-                )
-            elif data_type == "string":
-                self.executors[key] = (
-                    lambda content, c=config, m=self.model: self._execute_chain(
-                        run_completion_for_string(content, c), m
-                    )
-                )
-            elif data_type == "numeric":
-                self.executors[key] = (
-                    lambda content, c=config, m=self.model: self._execute_chain(
-                        run_completion_for_numeric(content, c), m
-                    )
-                )
-            elif data_type == "list":
-                self.executors[key] = (
-                    lambda content, c=config, m=self.model: self._execute_chain(
-                        run_completion_for_list(content, c), m
-                    )
+        Bind each compiled data field into a FieldPlan and register executors
+        for it.
+
+        Prompts, pydantic models, parsers and format instructions are built once
+        per configuration, so executing a field for a document only substitutes
+        the content. A synchronous and an async executor are registered for
+        every key.
+        """
+        for key, field in self.fields.items():
+            plan = self._build_plan(
+                key,
+                field.data_type,
+                field.components,
+                batchable=field.batchable,
+                chunking=field.chunking,
+                relevance=field.relevance,
+                semantic_cache=field.semantic_cache,
+                priority=field.priority,
+                model_aliases=field.model_aliases,
+            )
+            self.plans[key] = plan
+            self.executors[key] = lambda content, p=plan: self._invoke_plan(p, content)
+            self.async_executors[key] = (
+                lambda content, p=plan: self._ainvoke_plan(p, content)
+            )
+
+    def _build_plan(
+        self,
+        key,
+        data_type,
+        components,
+        batchable,
+        chunking=None,
+        relevance=None,
+        semantic_cache=None,
+        priority=0,
+        model_aliases=(),
+    ):
+        """
+        Bind the static arguments of completion components into a FieldPlan.
+        With structured output, plans with a pydantic model call every model
+        that supports it through native structured output, with a prompt
+        without format instructions. Other models of the plan keep the prompt
+        and parser.
+
+        Args:
+            key (str): Key of the plan
+            data_type (str): Data type the plan produces
+            components (dict): Prompts, parser, static args and model class
+            batchable (bool): Whether the plan may be merged into a batch
+            chunking (ChunkingConfig, optional): Chunking settings of the field
+            relevance (RelevanceConfig, optional): Relevance filtering settings
+            semantic_cache (SemanticCacheConfig, optional): Semantic cache settings
+            priority (int): Scheduling priority, lower values first
+            model_aliases (tuple): Aliases of the models the plan calls in order
+
+        Returns:
+            FieldPlan: The compiled plan
+
+        Raises:
+            ValueError: If a model alias is not registered
+        """
+        format_instructions = components["args"].get("format_instructions")
+        routes = self.registry.resolve(key, model_aliases)
+        static_args = components["args"]
+        structured_prompts = None
+        if (
+            self.structured_output
+            and format_instructions
+            and components["model_class"] is not None
+        ):
+            structured_components = build_structured_components(components)
+            structured_prompts = self._bind_prompts(structured_components)
+            routes = tuple(
+                dataclasses.replace(
+                    route,
+                    structured_model=build_structured_model(
+                        route.model, components["model_class"]
+                    ),
                 )
-            else:
-                raise ValueError(f"Invalid type '{data_type}' for key '{key}'")
+                for route in routes
+            )
+            if routes[0].structured_model is not None:
+                static_args = structured_components["args"]
+
+        prompts = self._bind_prompts(components)
+        parser = coerce_to_runnable(components["parser"])
+
+        return FieldPlan(
+            key=key,
+            data_type=data_type,
+            prompts=prompts,
+            parser=parser,
+            model_class=components["model_class"],
+            format_instructions=format_instructions,
+            static_tokens=sum(estimate_tokens(value) for value in static_args.values()),
+            batchable=batchable,
+            chunking=chunking,
+            relevance=relevance,
+            semantic_cache=semantic_cache,
+            priority=priority,
+            repair_prompts=(
+                build_repair_prompts(format_instructions)
+                if format_instructions
+                else None
+            ),
+            model_aliases=model_aliases,
+            routes=routes,
+            structured_prompts=structured_prompts,
+        )
+
+    def _bind_prompts(self, components):
+        """
+        Bind the static arguments of completion components into their prompt,
+        marking the shared prefix for provider prompt caching if configured
+
+        Args:
+            components (dict): Prompts, parser, static args and model class
+
+        Returns:
+            ChatPromptTemplate: Prompt with only the content left to substitute
+        """
+        prompts = components["prompts"]
+        if self.cache_control:
+            prompts = mark_cache_control(prompts)
+        return prompts.partial(**components["args"])
+
+    def _invoke_plan(self, plan, content):
+        """
+        Execute a plan for a document in separately timed render, model and
+        parse stages, through the response cache if configured. An answer of a
+        cascade model that fails to parse escalates to the next model; only the
+        last model is asked to correct its answer.
+
+        Args:
+            plan (FieldPlan): The plan to execute
+            content (str): The content to process
+
+        Returns:
+            The parsed result of the plan
+        """
+        args = plan.build_args(content)
+
+        def call(route):
+            return invoke_cached(
+                self.response_cache,
+                route.runnable,
+                plan.get_prompts(route),
+                plan.parser,
+                args,
+                plan.get_namespace(route),
+                worker_pool=self.worker_pool,
+                repair_prompts=(
+                    plan.repair_prompts if route is plan.routes[-1] else None
+                ),
+                model_identity=route.identity,
+                model_name=route.alias,
+            )
+
+        return run_cascade(plan.routes, call)
+
+    async def _ainvoke_plan(self, plan, content):
+        """
+        Async version of _invoke_plan
+
+        Args:
+            plan (FieldPlan): The plan to execute
+            content (str): The content to process
+
+        Returns:
+            The parsed result of the plan
+        """
+        args = plan.build_args(content)
+
+        async def call(route):
+            return await ainvoke_cached(
+                self.response_cache,
+                route.runnable,
+                plan.get_prompts(route),
+                plan.parser,
+                args,
+                plan.get_namespace(route),
+                worker_pool=self.worker_pool,
+                repair_prompts=(
+                    plan.repair_prompts if route is plan.routes[-1] else None
+                ),
+                model_identity=route.identity,
+                model_name=route.alias,
+            )
+
+        return await arun_cascade(plan.routes, call)
+
+    def group_batches(self, keys, token_budget):
+        """
+        Group batchable data fields for combined extraction.
+
+        Fields calling the same models are packed greedily in the given order
+        until the estimated size of their prompts and format instructions would
+        exceed the token budget. Fields configured with "batch": false are left out.
+
+        Args:
+            keys (list): Keys of the data fields to group
+            token_budget (int): Maximum estimated field instruction tokens per group
 
-    def _execute_chain(self, chain_components, model):
+        Returns:
+            list: Groups of data field keys
+        """
+        groups = []
+        open_groups = {}  # Group being packed and its tokens by model aliases
+        for key in keys:
+            plan = self.plans[key]
+            if not plan.batchable:
+                continue
+            aliases = tuple(route.alias for route in plan.routes)
+            group, group_tokens = open_groups.get(aliases, ([], 0))
+            if group and group_tokens + plan.static_tokens > token_budget:
+                groups.append(group)
+                group, group_tokens = [], 0
+            group.append(key)
+            open_groups[aliases] = (group, group_tokens + plan.static_tokens)
+        groups.extend(group for group, _ in open_groups.values())
+        return groups
+
+    def get_batch_plan(self, keys):
         """
-        Execute a LangChain chain with the provided components
+        Get the compiled plan extracting several data fields with one completion.
+        Plans are compiled on first use and reused for the same group of keys.
 
         Args:
-            chain_components (dict): Dictionary containing prompts, parser, and args
-            model: LangChain model instance
+            keys (list): Keys of the data fields in the batch
 
         Returns:
-            The parsed result from the chain execution
+            FieldPlan: The compiled batch plan
+        """
+        batch_key = tuple(keys)
+        if batch_key not in self.batch_plans:
+            components = build_batch_components(
+                [self.plans[key] for key in keys], self.data_dict
+            )
+            self.batch_plans[batch_key] = self._build_plan(
+                ",".join(keys),
+                "batch",
+                components,
+                batchable=False,
+                model_aliases=self.plans[keys[0]].model_aliases,
+            )
+        return self.batch_plans[batch_key]
+
+    def execute_batch(self, keys, content):
         """
-        prompts = chain_components["prompts"]
-        parser = chain_components["parser"]
-        args = chain_components["args"]
+        Extract several data fields with a single completion
 
-        chain = prompts | model | parser
-        return chain.invoke(args)
+        Args:
+            keys (list): Keys of the data fields to extract
+            content (str): The content to process
+
+        Returns:
+            tuple: Dictionary of results by key and list of keys that failed to parse
+        """
+        parsed = self._invoke_plan(self.get_batch_plan(keys), content)
+        return split_batch_result(parsed, [self.plans[key] for key in keys])
+
+    async def aexecute_batch(self, keys, content):
+        """
+        Async version of execute_batch
+
+        Args:
+            keys (list): Keys of the data fields to extract
+            content (str): The content to process
+
+        Returns:
+            tuple: Dictionary of results by key and list of keys that failed to parse
+        """
+        parsed = await self._ainvoke_plan(self.get_batch_plan(keys), content)
+        return split_batch_result(parsed, [self.plans[key] for key in keys])
+
+    def select_relevant(self, key, content):
+        """
+        Select the content sent to a data field. Fields with relevance filtering
+        receive the best matching passages of the document up to their token
+        budget, selected with the passage index of the current document.
+
+        Args:
+            key (str): Key of the data field
+            content (str): The content to process
+
+        Returns:
+            str: The content for the field
+        """
+        plan = self.get_plan(key)
+        if plan.relevance is None:
+            return content
+        return get_prepared_document(content).select_relevant(key, plan.relevance)
+
+    def split_content(self, key, content):
+        """
+        Split content into the chunks a data field is extracted from
+
+        Args:
+            key (str): Key of the data field
+            content (str): The content to process
+
+        Returns:
+            list: The chunks, or only the content if the field is not chunked
+                or the content fits its window
+        """
+        chunking = self.plans[key].chunking
+        if chunking is None:
+            return [content]
+        return split_content(content, chunking)
+
+    def reduce_chunk_results(self, key, results):
+        """
+        Merge the results of a data field extracted from each chunk.
+        Lists are merged without duplicates, objects are merged by attribute and
+        numeric values are aggregated as configured. String fields are reduced by
+        a further completion over build_reduce_content instead.
+
+        Args:
+            key (str): Key of the data field
+            results (list): Results of each chunk, in chunk order
+
+        Returns:
+            The merged result
+        """
+        plan = self.plans[key]
+        if plan.data_type == "list":
+            return merge_lists(results)
+        if plan.data_type == "object":
+            return merge_objects(results, self.data_dict[key].get("attributes"))
+        if plan.data_type == "numeric":
+            return aggregate_numbers(results, plan.chunking.aggregate)
+        return results[0]
+
+    def build_reduce_content(self, results):
+        """
+        Build the content of the completion summarizing per-chunk string results
+
+        Args:
+            results (list): String results of each chunk, in chunk order
+
+        Returns:
+            str: Content listing the result of each chunk
+        """
+        return build_partial_answers(results)
+
+    def get_plan(self, key):
+        """
+        Get the compiled plan for a specific key
+
+        Args:
+            key (str): Key to fetch the plan for
+
+        Returns:
+            FieldPlan: The compiled plan for the specified key
+        """
+        return self.plans.get(key)
+
+    def estimate_tokens(self, key, content):
+        """
+        Estimate the prompt tokens of executing a data field for a document
+
+        Args:
+            key (str): Key of the data field
+            content (str): The content to process
+
+        Returns:
+            int: Estimated prompt tokens
+        """
+        return estimate_tokens(content) + self.plans[key].static_tokens
+
+    def estimate_field_tokens(self, key, content):
+        """
+        Estimate the prompt tokens of all completions of a data field for a
+        document, with relevance filtering and chunking applied
+
+        Args:
+            key (str): Key of the data field
+            content (str): The content to process
+
+        Returns:
+            int: Estimated prompt tokens
+        """
+        plan = self.plans[key]
+        if plan.relevance is not None:
+            content_tokens = min(estimate_tokens(content), plan.relevance.max_tokens)
+            return content_tokens + plan.static_tokens
+        return sum(
+            self.estimate_tokens(key, chunk)
+            for chunk in self.split_content(key, content)
+        )
+
+    def estimate_batch_tokens(self, keys, content):
+        """
+        Estimate the prompt tokens of a batch completion for a document
+
+        Args:
+            keys (list): Keys of the data fields in the batch
+            content (str): The content to process
+
+        Returns:
+            int: Estimated prompt tokens
+        """
+        return estimate_tokens(content) + self.get_batch_plan(keys).static_tokens
 
     def get_executor(self, key):
         """
@@ -101,6 +582,18 @@ class DataExecutor:
         """
         return self.executors.get(key)
 
+    def get_async_executor(self, key):
+        """
+        Get async executor function for a specific key
+
+        Args:
+            key (str): Key to fetch executor for
+
+        Returns:
+            callable: Coroutine function executing the specified key
+        """
+        return self.async_executors.get(key)
+
     def get_data_name(self, key):
         """
         Get the name of the data field for a specific key
@@ -0,0 +1,208 @@
+"""Module for compiled engine definitions shared by many engine instances."""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+from langchain_core.runnables import RunnableLambda
+
+from .data_executor import compile_field
+from .execution_graph import DATA_NODE
+from .model_routing import collect_model_aliases
+from .workflow_executor import WorkflowExecutor
+
+
+DEFINITION_CACHE_SIZE = 1024  # Compiled definitions kept by get_engine_definition
+FORMAT_VERSION = 1  # Version of saved definition files
+
+_definitions = OrderedDict()
+_definitions_lock = threading.Lock()
+
+
+def _unbound_model(_):
+    raise RuntimeError("Engine definitions must be bound to a model by an engine")
+
+
+def hash_config(engine_config: dict) -> str:
+    """
+    Hash the content of an engine configuration, independently of key order
+
+    Args:
+        engine_config (dict): Configuration containing data and workflow definitions
+
+    Returns:
+        str: SHA-256 hex digest of the canonical JSON of the configuration
+    """
+    canonical = json.dumps(engine_config, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True, eq=False)
+class EngineDefinition:
+    """
+    Compiled, immutable definition of an engine configuration: the validated
+    configuration, the model-independent components of every data field and
+    the validated workflows with their execution graph.
+
+    A definition holds no per-document state and no model, so one definition
+    can be shared by any number of concurrent engines, each of which binds it
+    to its model and keeps its own caches. Definitions are equal and hash alike
+    when their configurations have the same content.
+    """
+
+    config_hash: str
+    data_dict: Mapping[str, dict]
+    workflow_dict: Mapping[str, dict]
+    fields: Mapping[str, object]  # FieldDefinition by data key
+    workflow_executor: Optional[WorkflowExecutor] = None  # Bound to no model
+
+    def __eq__(self, other):
+        if not isinstance(other, EngineDefinition):
+            return NotImplemented
+        return self.config_hash == other.config_hash
+
+    def __hash__(self):
+        return hash(self.config_hash)
+
+    @property
+    def engine_config(self) -> dict:
+        """
+        A copy of the configuration the definition was compiled from
+        """
+        config = {"data": json.loads(json.dumps(dict(self.data_dict)))}
+        if self.workflow_dict:
+            config["workflow"] = json.loads(json.dumps(dict(self.workflow_dict)))
+        return config
+
+    def save(self, path: str):
+        """
+        Save the definition to a file.
+
+        Compiled pydantic models and parsers cannot be serialized, so the file
+        holds the validated configuration and its hash. Loading it checks the
+        hash and validates and compiles the configuration again, once per
+        process, through get_engine_definition.
+
+        Args:
+            path (str): Path of the definition file
+        """
+        with open(path, "w", encoding="utf-8") as definition_file:
+            json.dump(
+                {
+                    "version": FORMAT_VERSION,
+                    "config_hash": self.config_hash,
+                    "engine_config": self.engine_config,
+                },
+                definition_file,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "EngineDefinition":
+        """
+        Load a definition saved with save, reusing the definition of the same
+        configuration if this process already compiled it
+
+        Args:
+            path (str): Path of the definition file
+
+        Returns:
+            EngineDefinition: The definition
+
+        Raises:
+            ValueError: If the file has another format version or its
+                configuration does not match its hash
+        """
+        with open(path, encoding="utf-8") as definition_file:
+            saved = json.load(definition_file)
+        if saved.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported engine definition version in {path}")
+        if hash_config(saved["engine_config"]) != saved["config_hash"]:
+            raise ValueError(f"Engine definition in {path} does not match its hash")
+        return get_engine_definition(saved["engine_config"])
+
+
+def compile_engine(engine_config: dict) -> EngineDefinition:
+    """
+    Validate and compile an engine configuration
+
+    Args:
+        engine_config (dict): Configuration containing data and workflow definitions
+
+    Returns:
+        EngineDefinition: The compiled definition
+
+    Raises:
+        ValueError: If data is missing or empty in engine_config
+        ValueError: If a data field or workflow is invalid
+        ValueError: If a workflow references an unknown data field
+    """
+    if (
+        not engine_config
+        or "data" not in engine_config
+        or not engine_config["data"]
+    ):
+        raise ValueError("engine_config must contain non-empty data configuration")
+
+    config_hash = hash_config(engine_config)
+    # A private deep copy, so later changes to engine_config cannot desync the hash
+    config = json.loads(json.dumps(engine_config))
+    data_dict = config["data"]
+    workflow_dict = config.get("workflow") or {}
+    fields = {key: compile_field(key, value) for key, value in data_dict.items()}
+
+    workflow_executor = None
+    if workflow_dict:
+        unbound = RunnableLambda(_unbound_model)
+        workflow_executor = WorkflowExecutor(
+            workflow_dict,
+            unbound,
+            models={alias: unbound for alias in collect_model_aliases(config)},
+        )
+        for node in workflow_executor.get_execution_graph().nodes.values():
+            if node.kind == DATA_NODE and node.key not in fields:
+                raise ValueError(f"Workflows reference unknown data field '{node.key}'")
+
+    return EngineDefinition(
+        config_hash=config_hash,
+        data_dict=MappingProxyType(data_dict),
+        workflow_dict=MappingProxyType(workflow_dict),
+        fields=MappingProxyType(fields),
+        workflow_executor=workflow_executor,
+    )
+
+
+def get_engine_definition(engine_config: dict) -> EngineDefinition:
+    """
+    Get the compiled definition of an engine configuration, compiling it on
+    first use. Definitions are cached by the hash of the configuration content,
+    so tenants with the same configuration share one definition, and the least
+    recently used definitions are evicted beyond DEFINITION_CACHE_SIZE.
+
+    Args:
+        engine_config (dict): Configuration containing data and workflow definitions
+
+    Returns:
+        EngineDefinition: The compiled definition
+
+    Raises:
+        ValueError: If the configuration is invalid
+    """
+    config_hash = hash_config(engine_config)
+    with _definitions_lock:
+        definition = _definitions.get(config_hash)
+        if definition is not None:
+            _definitions.move_to_end(config_hash)
+            return definition
+
+    # Compiled outside the lock; concurrent first uses may compile twice
+    definition = compile_engine(engine_config)
+    with _definitions_lock:
+        definition = _definitions.setdefault(config_hash, definition)
+        _definitions.move_to_end(config_hash)
+        while len(_definitions) > DEFINITION_CACHE_SIZE:
+            _definitions.popitem(last=False)
+    return definition
@@ -0,0 +1,108 @@
+"""Module for the dependency graph of data fields and workflow classifiers."""
+
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+
+DATA_NODE = "data"
+CLASSIFY_NODE = "classify"
+
+
+@dataclass(frozen=True)
+class GraphNode:
+    """
+    A unit of model work executed at most once per document
+    """
+
+    node_id: str
+    kind: str  # DATA_NODE or CLASSIFY_NODE
+    key: str  # Data field ID or prompt workflow ID
+
+
+@dataclass(frozen=True)
+class ExecutionGraph:
+    """
+    Compiled dependency graph of a workflow configuration.
+
+    Root workflow data and classifiers are needed for every document. Explain
+    workflow data is only needed once a classifier chooses the explain workflow;
+    branches are the only record of that dependency.
+    """
+
+    nodes: Dict[str, GraphNode]
+    root_workflows: Tuple[str, ...]
+    initial_nodes: Tuple[str, ...]  # Nodes needed for every document
+    branches: Dict[Tuple[str, str], Tuple[str, ...]]  # (classifier, explain) -> nodes
+
+    @staticmethod
+    def data_node_id(data_key: str) -> str:
+        return f"{DATA_NODE}:{data_key}"
+
+    @staticmethod
+    def classify_node_id(workflow_id: str) -> str:
+        return f"{CLASSIFY_NODE}:{workflow_id}"
+
+    def get_branch(self, workflow_id: str, explain_workflow_id: str):
+        """
+        Returns the nodes needed once a classifier selects an explain workflow
+
+        Args:
+            workflow_id (str): Prompt workflow ID of the classifier
+            explain_workflow_id (str): Selected explain workflow ID
+
+        Returns:
+            tuple: Node IDs of the explain workflow data
+        """
+        return self.branches.get((workflow_id, explain_workflow_id), ())
+
+
+def build_execution_graph(workflow_executor) -> ExecutionGraph:
+    """
+    Compile the workflows of a WorkflowExecutor into an ExecutionGraph.
+    Data fields referenced by several workflows become a single node.
+
+    Args:
+        workflow_executor (WorkflowExecutor): The validated workflow configuration
+
+    Returns:
+        ExecutionGraph: The compiled graph
+    """
+    nodes = {}
+    initial_nodes = []
+    branches = {}
+    conditional_nodes = {}  # Explain data node -> data key
+
+    root_workflows = tuple(workflow_executor.get_root_workflows())
+    for workflow_id in root_workflows:
+        for data_key in workflow_executor.get_data_requirements(workflow_id):
+            node_id = ExecutionGraph.data_node_id(data_key)
+            if node_id not in nodes:
+                nodes[node_id] = GraphNode(node_id, DATA_NODE, data_key)
+                initial_nodes.append(node_id)
+
+        explain_ids = workflow_executor.get_explain_dependencies(workflow_id)
+        if not explain_ids:
+            continue
+
+        classify_id = ExecutionGraph.classify_node_id(workflow_id)
+        nodes[classify_id] = GraphNode(classify_id, CLASSIFY_NODE, workflow_id)
+        initial_nodes.append(classify_id)
+        for explain_id in explain_ids:
+            branch = []
+            for data_key in workflow_executor.get_data_requirements(explain_id):
+                node_id = ExecutionGraph.data_node_id(data_key)
+                branch.append(node_id)
+                conditional_nodes.setdefault(node_id, data_key)
+            branches[(workflow_id, explain_id)] = tuple(branch)
+
+    # Data needed by a root workflow anyway does not wait on any classifier
+    for node_id, data_key in conditional_nodes.items():
+        if node_id not in nodes:
+            nodes[node_id] = GraphNode(node_id, DATA_NODE, data_key)
+
+    return ExecutionGraph(
+        nodes=nodes,
+        root_workflows=root_workflows,
+        initial_nodes=tuple(initial_nodes),
+        branches=branches,
+    )
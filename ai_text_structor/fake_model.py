@@ -0,0 +1,254 @@
+"""Module for an offline chat model used in tests and benchmarks."""
+
+import asyncio
+import json
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from .process_batch import BATCH_PROMPT
+
+
+FIELD_TYPE_VALUES = {
+    "string": "Fake summary of the content",
+    "numeric": 42.0,
+    "list": ["First item", "Second item"],
+}
+
+BATCH_NEEDLE = BATCH_PROMPT.split("\n")[0]
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Offline chat model answering from canned responses.
+
+    A response is chosen by the first needle of responses found in the prompt
+    text. Latency is simulated per call from latencies, slow_responses, a seeded
+    latency distribution or the fixed latency, in that order. Calls fail with
+    RuntimeError for the first failures calls and then at failure_rate.
+    Streamed responses arrive in chunks of stream_chunk_size characters. With
+    bound tools, JSON object responses are returned as a call of the first tool,
+    unless tool_calling is disabled.
+    """
+
+    responses: Dict[str, str] = {}
+    default_response: str = ""
+    latency: float = 0.0
+    latencies: List[float] = []  # Per-call latencies used before other settings
+    slow_responses: Dict[str, float] = {}  # Latency of calls containing a needle
+    latency_distribution: Optional[Tuple[str, float, float]] = None
+    stream_chunk_size: int = 8  # Characters per chunk of streamed responses
+    failures: int = 0  # Number of initial calls that raise
+    failure_rate: float = 0.0  # Probability of any later call raising
+    seed: Optional[int] = None
+    tool_calling: bool = True  # Whether bind_tools and structured output work
+    calls: List[str] = []
+    prompts: List[List[BaseMessage]] = []  # Messages of every call
+    active: int = 0
+    max_active: int = 0
+    simulated_latency: float = 0.0  # Total latency simulated over all calls
+    random_source: Any = None
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.random_source = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    @classmethod
+    def from_engine_config(cls, engine_config: dict, **kwargs: Any):
+        """
+        Build a fake model with a valid canned response for every data field,
+        batch completion and workflow classifier of an engine configuration.
+        Classifiers choose the first explain workflow that requires them.
+
+        Args:
+            engine_config (dict): Engine configuration with data and workflow
+            **kwargs: Further FakeChatModel fields, e.g. latency settings
+
+        Returns:
+            FakeChatModel: The configured model
+        """
+        data_dict = engine_config.get("data", {})
+        workflow_dict = engine_config.get("workflow", {})
+        values = {
+            key: get_field_value(config) for key, config in data_dict.items()
+        }
+
+        responses = {BATCH_NEEDLE: json.dumps(values)}
+        for workflow_id, config in workflow_dict.items():
+            explain_ids = [
+                explain_id
+                for explain_id, explain in workflow_dict.items()
+                if workflow_id in explain.get("requires", [])
+            ]
+            if "prompt" in config and explain_ids:
+                needle = "Task: " + config["prompt"].split("{")[0]
+                responses[needle] = explain_ids[0]
+
+        # Longer prompts first so a prompt containing another one still matches
+        for key, config in sorted(
+            data_dict.items(), key=lambda item: -len(item[1].get("prompt", ""))
+        ):
+            value = values[key]
+            if config.get("type") == "list":
+                response = json.dumps({"items": value})
+            elif config.get("type") == "object":
+                response = json.dumps(value)
+            else:
+                response = str(value)
+            responses[config.get("prompt", key)] = response
+
+        # Explicit responses take precedence over the generated ones
+        overrides = kwargs.pop("responses", {})
+        responses = {
+            **overrides,
+            **{key: value for key, value in responses.items() if key not in overrides},
+        }
+        return cls(responses=responses, **kwargs)
+
+    def bind_tools(self, tools, tool_choice=None, **kwargs: Any):
+        if not self.tool_calling:
+            raise NotImplementedError("Tool calling is disabled for this model")
+        formatted = [convert_to_openai_tool(tool) for tool in tools]
+        return self.bind(tools=formatted, tool_choice=tool_choice, **kwargs)
+
+    def _next_latency(self, messages: List[BaseMessage]) -> float:
+        text = "\n".join(str(message.content) for message in messages)
+        for needle, latency in self.slow_responses.items():
+            if needle in text:
+                return latency
+        if self.latencies:
+            return self.latencies.pop(0)
+        if self.latency_distribution:
+            kind, first, second = self.latency_distribution
+            if kind == "uniform":
+                return self.random_source.uniform(first, second)
+            if kind == "lognormal":
+                # Median latency and sigma of the underlying normal distribution
+                return first * self.random_source.lognormvariate(0, second)
+            raise ValueError(f"Invalid latency distribution '{kind}'")
+        return self.latency
+
+    def _respond(self, messages: List[BaseMessage]) -> str:
+        text = "\n".join(str(message.content) for message in messages)
+        self.calls.append(text)
+        self.prompts.append(list(messages))
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("Model call failed")
+        if self.failure_rate and self.random_source.random() < self.failure_rate:
+            raise RuntimeError("Model call failed")
+        for needle, response in self.responses.items():
+            if needle in text:
+                return response
+        return self.default_response
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            latency = self._next_latency(messages)
+            self.simulated_latency += latency
+            time.sleep(latency)
+            content = self._respond(messages)
+        finally:
+            self.active -= 1
+        message = _build_message(content, kwargs.get("tools"))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            latency = self._next_latency(messages)
+            self.simulated_latency += latency
+            await asyncio.sleep(latency)
+            content = self._respond(messages)
+        finally:
+            self.active -= 1
+        message = _build_message(content, kwargs.get("tools"))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        result = self._generate(messages, stop, run_manager, **kwargs)
+        yield from self._split_chunks(result.generations[0].message)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        result = await self._agenerate(messages, stop, run_manager, **kwargs)
+        for chunk in self._split_chunks(result.generations[0].message):
+            await asyncio.sleep(0)
+            yield chunk
+
+    def _split_chunks(self, message: AIMessage):
+        if message.tool_calls:
+            tool_call = message.tool_calls[0]
+            yield ChatGenerationChunk(
+                message=AIMessageChunk(
+                    content="",
+                    tool_call_chunks=[
+                        {
+                            "name": tool_call["name"],
+                            "args": json.dumps(tool_call["args"]),
+                            "id": tool_call["id"],
+                            "index": 0,
+                        }
+                    ],
+                )
+            )
+            return
+        content = message.content
+        for start in range(0, max(1, len(content)), self.stream_chunk_size):
+            piece = content[start : start + self.stream_chunk_size]
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+
+
+def _build_message(content: str, tools: Optional[list]) -> AIMessage:
+    """
+    Build the response message, calling the first bound tool with a JSON object
+    response
+    """
+    if tools:
+        try:
+            args = json.loads(content)
+        except ValueError:
+            args = None
+        if isinstance(args, dict):
+            name = tools[0]["function"]["name"]
+            return AIMessage(
+                content="",
+                tool_calls=[{"name": name, "args": args, "id": "call_0"}],
+            )
+    return AIMessage(content=content)
+
+
+def get_field_value(config: dict):
+    """
+    Build a canned value of the configured type of a data field
+
+    Args:
+        config (dict): Configuration of the data field
+
+    Returns:
+        A value that parses as the data field type
+    """
+    if config.get("type") == "object":
+        return _build_object_value(config.get("attributes", {}))
+    return FIELD_TYPE_VALUES.get(config.get("type"), FIELD_TYPE_VALUES["string"])
+
+
+def _build_object_value(attributes):
+    if isinstance(attributes, list):
+        return [_build_object_value(attributes[0])] if attributes else []
+    if isinstance(attributes, dict):
+        return {
+            key: _build_object_value(value) for key, value in attributes.items()
+        }
+    return f"Fake {attributes}"
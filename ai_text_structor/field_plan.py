@@ -0,0 +1,128 @@
+"""Module for compiled, reusable data field execution plans."""
+
+from dataclasses import dataclass
+from typing import Any, Mapping, Optional, Tuple
+
+from langchain_core.prompts import ChatPromptTemplate
+
+
+STRUCTURED_NAMESPACE = "structured:"  # Prefix of plans called with structured output
+
+
+@dataclass(frozen=True)
+class FieldDefinition:
+    """
+    Model-independent compiled components of a data field: its prompt template,
+    parser, static prompt arguments and pydantic model. Definitions are shared
+    by every engine built from the same configuration and bound to a model as
+    a FieldPlan.
+    """
+
+    key: str
+    data_type: str
+    prompts: ChatPromptTemplate
+    parser: Any
+    args: Mapping[str, Any]
+    model_class: Optional[type] = None
+    batchable: bool = True
+    chunking: Optional[Any] = None
+    relevance: Optional[Any] = None
+    semantic_cache: Optional[Any] = None
+    priority: int = 0
+    model_aliases: Tuple[str, ...] = ()
+
+    @property
+    def components(self) -> dict:
+        """
+        The completion components of the field, as built by the type builders
+        """
+        return {
+            "prompts": self.prompts,
+            "parser": self.parser,
+            "args": dict(self.args),
+            "model_class": self.model_class,
+        }
+
+
+@dataclass(frozen=True)
+class FieldPlan:
+    """
+    Immutable execution plan of a data field, compiled once per engine.
+
+    The prompt template has every content-independent variable bound, so running
+    the plan for a document only substitutes the content. static_tokens is the
+    estimated size of the bound, content-independent prompt text. Plans with
+    chunking run once per chunk of long content and their results are reduced.
+    Plans with relevance only receive the passages of content matching the field.
+    Plans with semantic_cache reuse results of near-duplicate content.
+    Plans with a lower priority run first and are skipped last under a budget.
+    Plans with repair_prompts ask the model once to correct an unparsable answer.
+    Plans call the model of their first route, and an answer that fails to parse
+    or validate escalates to the next route. Routes with a structured_model are
+    sent structured_prompts, which have no format instructions.
+    """
+
+    key: str
+    data_type: str
+    prompts: ChatPromptTemplate
+    parser: Any
+    model_class: Optional[type] = None
+    format_instructions: Optional[str] = None
+    static_tokens: int = 0
+    batchable: bool = True
+    chunking: Optional[Any] = None  # ChunkingConfig of fields extracted per chunk
+    relevance: Optional[Any] = None  # RelevanceConfig of fields sent relevant content
+    semantic_cache: Optional[Any] = None  # SemanticCacheConfig of reusable fields
+    priority: int = 0
+    repair_prompts: Optional[ChatPromptTemplate] = None  # Re-ask on parse failure
+    model_aliases: Tuple[str, ...] = ()  # Configured model aliases
+    routes: Tuple[Any, ...] = ()  # ModelRoute of every model, tried in order
+    structured_prompts: Optional[ChatPromptTemplate] = None  # For structured routes
+
+    @property
+    def namespace(self) -> str:
+        """
+        Identity of the plan used in response cache keys
+        """
+        return f"{self.data_type}:{self.key}"
+
+    def get_prompts(self, route) -> ChatPromptTemplate:
+        """
+        Returns the prompt sent to the model of a route
+
+        Args:
+            route (ModelRoute): Route of the plan
+
+        Returns:
+            ChatPromptTemplate: The prompt
+        """
+        if route.structured_model is not None:
+            return self.structured_prompts
+        return self.prompts
+
+    def get_namespace(self, route) -> str:
+        """
+        Returns the identity of the plan called through a route, which tells
+        worker processes which prompt to render
+
+        Args:
+            route (ModelRoute): Route of the plan
+
+        Returns:
+            str: The namespace, prefixed for routes with structured output
+        """
+        if route.structured_model is not None:
+            return STRUCTURED_NAMESPACE + self.namespace
+        return self.namespace
+
+    def build_args(self, content: str) -> dict:
+        """
+        Build the prompt arguments for a document
+
+        Args:
+            content (str): The content to process
+
+        Returns:
+            dict: Variables to render the prompt with
+        """
+        return {"content": content}
@@ -0,0 +1,202 @@
+"""Module for updating the results of a growing document from its appended content."""
+
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Iterable, Mapping, Optional
+
+from .tokens import estimate_tokens
+
+
+UPDATE_PROMPT = """An earlier part of the content was already processed. This was the answer for it:
+
+{previous}
+
+The content continues with:
+
+{appended}
+
+Answer for the whole content: keep what still holds in the previous answer and update it with the new part."""
+
+_current_update: ContextVar = ContextVar("current_update", default=None)
+
+
+@dataclass(frozen=True)
+class IncrementalUpdate:
+    """
+    Previous results of a document and the content appended to it since
+    """
+
+    appended: str
+    values: Mapping[str, Any]  # Previous result by data key
+    classifications: Mapping[str, Optional[str]]  # Explain workflow by workflow
+
+    @classmethod
+    def from_result(cls, result: dict, appended: str, workflow_ids: Iterable[str]):
+        """
+        Collect the previous value of every data field and the previous choice
+        of every classifier from a result. Failed fields, fields without a
+        value, fields skipped for a token budget and failed classifiers are
+        left out, so they run again over the whole content.
+
+        Args:
+            result (dict): Previous result of execute
+            appended (str): Content appended since the previous result
+            workflow_ids (Iterable[str]): IDs of the workflows of the engine
+
+        Returns:
+            IncrementalUpdate: The update
+        """
+        workflow_ids = set(workflow_ids)
+        values = {}
+        classifications = {}
+
+        def collect(results):
+            for key, value in results.items():
+                if key not in workflow_ids and key != "classification_error":
+                    if not _is_missing(value):
+                        values.setdefault(key, value)
+
+        results = result.get("results", {})
+        if not workflow_ids:
+            collect(results)
+        for workflow_id, workflow_results in results.items():
+            if workflow_id not in workflow_ids:
+                continue
+            collect(workflow_results)
+            explain_ids = [key for key in workflow_results if key in workflow_ids]
+            for explain_id in explain_ids:
+                collect(workflow_results[explain_id])
+            if "classification_error" not in workflow_results:
+                classifications[workflow_id] = next(iter(explain_ids), None)
+        return cls(appended, values, classifications)
+
+
+def _is_missing(value) -> bool:
+    # None, error and skipped markers stand in for a value the field did not produce
+    if value is None:
+        return True
+    return isinstance(value, dict) and set(value) in ({"error"}, {"skipped"})
+
+
+def build_update_content(previous, appended: str) -> str:
+    """
+    Build the content of a completion updating a previous answer with the
+    appended content
+
+    Args:
+        previous: Previous answer of the data field
+        appended (str): Content appended since the previous answer
+
+    Returns:
+        str: Content with the previous answer and the appended content
+    """
+    if not isinstance(previous, str):
+        previous = json.dumps(previous, ensure_ascii=False)
+    return UPDATE_PROMPT.format(previous=previous, appended=appended)
+
+
+@contextmanager
+def incremental_update(update: Optional[IncrementalUpdate]):
+    """
+    Update the data fields and classifiers executed within the block from their
+    previous results instead of the whole content
+
+    Args:
+        update (IncrementalUpdate, optional): The previous results and appended
+            content, or None to process the whole content
+    """
+    token = _current_update.set(update)
+    try:
+        yield update
+    finally:
+        _current_update.reset(token)
+
+
+def get_incremental_update() -> Optional[IncrementalUpdate]:
+    """
+    Returns the incremental update of the current context, if any
+    """
+    return _current_update.get()
+
+
+class IncrementalSession:
+    """
+    Results of a live document whose content grows, e.g. a meeting transcript.
+    Each append updates the previous results from the appended content only,
+    and the whole content is processed again periodically so errors of the
+    incremental updates do not accumulate.
+    """
+
+    def __init__(
+        self,
+        engine,
+        refresh_every: int = 10,
+        refresh_ratio: Optional[float] = None,
+    ):
+        """
+        Initialize IncrementalSession
+
+        Args:
+            engine (AITextStructor): Engine processing the document
+            refresh_every (int): Incremental updates between full refreshes
+            refresh_ratio (float, optional): Refresh once the content appended
+                since the last full refresh exceeds this fraction of the tokens
+                processed then
+
+        Raises:
+            ValueError: If refresh_every is below 1 or refresh_ratio is not positive
+        """
+        if refresh_every < 1:
+            raise ValueError("refresh_every must be at least 1")
+        if refresh_ratio is not None and refresh_ratio <= 0:
+            raise ValueError("refresh_ratio must be positive")
+        self.engine = engine
+        self.refresh_every = refresh_every
+        self.refresh_ratio = refresh_ratio
+        self.content = ""
+        self.result = None
+        self.updates = 0  # Incremental updates since the last full refresh
+        self.refreshes = 0
+        self._refreshed_tokens = 0
+        self._appended_tokens = 0
+
+    def _refresh_due(self, appended_tokens: int) -> bool:
+        if self.result is None or self.updates >= self.refresh_every:
+            return True
+        return (
+            self.refresh_ratio is not None
+            and self._appended_tokens + appended_tokens
+            > self.refresh_ratio * self._refreshed_tokens
+        )
+
+    async def append(self, appended: str, metrics: bool = False) -> dict:
+        """
+        Append content to the document and update its results
+
+        Args:
+            appended (str): Content appended to the document
+            metrics (bool): Add the metrics of the update to the result
+
+        Returns:
+            dict: Results of the whole content
+        """
+        appended_tokens = estimate_tokens(appended)
+        content = self.content + appended
+        if self._refresh_due(appended_tokens):
+            result = await self.engine.execute(content, metrics=metrics)
+            self.updates = 0
+            self.refreshes += 1
+            self._refreshed_tokens = estimate_tokens(content)
+            self._appended_tokens = 0
+        else:
+            result = await self.engine.execute_update(
+                self.result, self.content, appended, metrics=metrics
+            )
+            self.updates += 1
+            self._appended_tokens += appended_tokens
+
+        self.content = content
+        self.result = {key: value for key, value in result.items() if key != "metrics"}
+        return result
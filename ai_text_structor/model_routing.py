@@ -0,0 +1,199 @@
+"""Module for routing data fields and classifiers to models of a registry."""
+
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from langchain_core.runnables import Runnable
+
+from .response_cache import get_model_identity
+from .tracing import get_call_record
+
+
+DEFAULT_MODEL = "default"  # Alias of the engine model
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    """
+    A model a plan or classifier calls, with its alias in the registry and its
+    identity in response cache keys
+    """
+
+    alias: str
+    model: Any
+    identity: str
+    # Model with native structured output, None if the model or plan has none
+    structured_model: Optional[Runnable] = None
+
+    @property
+    def runnable(self):
+        return self.structured_model or self.model
+
+
+def parse_model_aliases(name: str, config: dict) -> Tuple[str, ...]:
+    """
+    Parse the "model" setting of a data field or workflow: the alias of one
+    model, or a cascade of aliases tried in order, e.g. ["fast", "strong"]
+
+    Args:
+        name (str): Key of the data field or ID of the workflow
+        config (dict): Configuration of the data field or workflow
+
+    Returns:
+        Tuple[str, ...]: The aliases, empty to use the engine model
+
+    Raises:
+        ValueError: If the setting is not an alias or a non-empty list of aliases
+    """
+    aliases = config.get("model")
+    if aliases is None:
+        return ()
+    if isinstance(aliases, str):
+        aliases = [aliases]
+    if (
+        not isinstance(aliases, list)
+        or not aliases
+        or not all(isinstance(alias, str) and alias for alias in aliases)
+    ):
+        raise ValueError(
+            f"Model for '{name}' must be an alias or a non-empty list of aliases"
+        )
+    return tuple(aliases)
+
+
+class ModelRegistry:
+    """
+    Models of an engine by alias, with the engine model as "default". To run a
+    configuration assigning models against a single model, e.g. a fake model
+    or a cassette, register that model under every alias of the configuration.
+    """
+
+    def __init__(self, model, models: Optional[Dict[str, Any]] = None):
+        """
+        Initialize ModelRegistry
+
+        Args:
+            model: The engine model, registered as "default"
+            models (Dict[str, Any], optional): LangChain models by alias
+
+        Raises:
+            ValueError: If models registers "default" or a model that is None
+        """
+        models = dict(models or {})
+        if DEFAULT_MODEL in models:
+            raise ValueError(f"'{DEFAULT_MODEL}' is reserved for the engine model")
+        for alias, registered in models.items():
+            if not registered:
+                raise ValueError(f"A model must be provided for alias '{alias}'")
+        self.models = {DEFAULT_MODEL: model, **models}
+        self._routes = {}
+
+    def get_route(self, alias: str) -> ModelRoute:
+        """
+        Returns the route of a registered model
+
+        Args:
+            alias (str): Alias of the model
+
+        Returns:
+            ModelRoute: The route
+        """
+        route = self._routes.get(alias)
+        if route is None:
+            model = self.models[alias]
+            route = ModelRoute(alias, model, get_model_identity(model))
+            self._routes[alias] = route
+        return route
+
+    def resolve(self, name: str, aliases: Tuple[str, ...]) -> Tuple[ModelRoute, ...]:
+        """
+        Resolve the model aliases of a data field or workflow
+
+        Args:
+            name (str): Key of the data field or ID of the workflow
+            aliases (Tuple[str, ...]): Aliases from parse_model_aliases
+
+        Returns:
+            Tuple[ModelRoute, ...]: Routes tried in order
+
+        Raises:
+            ValueError: If an alias is not registered
+        """
+        if not aliases:
+            return (self.get_route(DEFAULT_MODEL),)
+        for alias in aliases:
+            if alias not in self.models:
+                raise ValueError(f"Unknown model '{alias}' for '{name}'")
+        return tuple(self.get_route(alias) for alias in aliases)
+
+
+def collect_model_aliases(engine_config: dict) -> Set[str]:
+    """
+    Collect the model aliases the data fields and workflows of an engine
+    configuration refer to, besides "default"
+
+    Args:
+        engine_config (dict): Configuration with data and workflow definitions
+
+    Returns:
+        Set[str]: The aliases
+    """
+    configs = [
+        *(engine_config.get("data") or {}).items(),
+        *(engine_config.get("workflow") or {}).items(),
+    ]
+    return {
+        alias
+        for name, config in configs
+        for alias in parse_model_aliases(name, config)
+        if alias != DEFAULT_MODEL
+    }
+
+
+def run_cascade(routes: Tuple[ModelRoute, ...], call: Callable[[ModelRoute], Any]):
+    """
+    Call the routes of a cascade in order until an answer parses and validates.
+    A ValueError or a None result, e.g. a numeric answer without a number, from
+    any route but the last escalates to the next route and is counted on the
+    record of the current model call.
+
+    Args:
+        routes (Tuple[ModelRoute, ...]): Routes tried in order
+        call (Callable): Function calling the model of a route
+
+    Returns:
+        The result of the first route that succeeded
+    """
+    for route in routes[:-1]:
+        try:
+            result = call(route)
+        except ValueError:
+            result = None
+        if result is not None:
+            return result
+        get_call_record().record_escalation(route.alias)
+    return call(routes[-1])
+
+
+async def arun_cascade(
+    routes: Tuple[ModelRoute, ...], call: Callable[[ModelRoute], Awaitable]
+):
+    """
+    Async version of run_cascade
+
+    Args:
+        routes (Tuple[ModelRoute, ...]): Routes tried in order
+        call (Callable): Coroutine function calling the model of a route
+
+    Returns:
+        The result of the first route that succeeded
+    """
+    for route in routes[:-1]:
+        try:
+            result = await call(route)
+        except ValueError:
+            result = None
+        if result is not None:
+            return result
+        get_call_record().record_escalation(route.alias)
+    return await call(routes[-1])
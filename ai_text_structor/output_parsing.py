@@ -0,0 +1,242 @@
+"""Module for tolerant parsing and local repair of model outputs."""
+
+import functools
+import json
+import re
+from typing import List, Optional
+
+from langchain_core.exceptions import OutputParserException
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.utils.json import parse_partial_json
+
+from .tracing import get_call_record
+
+
+REPAIR_PROMPT = """Your previous answer could not be parsed: {error}
+
+Previous answer:
+{output}
+
+Return only the corrected answer, without any other text.
+{format_instructions}"""
+
+_FENCE = re.compile(r"```[a-zA-Z]*\s*\n?(.*?)```", re.DOTALL)
+_NUMBER = re.compile(r"[-+]?(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?|[-+]?\.\d+")
+_BULLET = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+(.+?)\s*$")
+_PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+# A string literal, closed or cut off, or outside of strings a Python literal
+# or a trailing comma before a closing brace or bracket
+_STRING_OR_DEFECT = re.compile(
+    r'"(?:\\.|[^"\\])*"?|\b(True|False|None)\b|,(\s*[}\]])'
+)
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"'})
+
+
+@functools.lru_cache(maxsize=1024)
+def build_repair_prompts(format_instructions: Optional[str]) -> ChatPromptTemplate:
+    """
+    Build the prompt asking the model to correct an answer that failed to parse.
+    It contains the failed answer and the format instructions, not the content.
+    Prompts are shared by plans with the same format instructions.
+
+    Args:
+        format_instructions (str, optional): Format instructions of the plan
+
+    Returns:
+        ChatPromptTemplate: Prompt with output and error variables
+    """
+    prompts = ChatPromptTemplate.from_messages([("user", REPAIR_PROMPT)])
+    return prompts.partial(format_instructions=format_instructions or "")
+
+
+def record_repair():
+    """
+    Count a locally repaired output on the record of the current model call
+    """
+    get_call_record().repairs += 1
+
+
+def _find_json_span(text: str) -> Optional[str]:
+    """
+    Returns the text from the first opening brace or bracket to its matching
+    closing one, or to the end of the text if it is never closed
+    """
+    starts = [index for index in (text.find("{"), text.find("[")) if index >= 0]
+    if not starts:
+        return None
+    start = min(starts)
+    depth = 0
+    in_string = False
+    escaped = False
+    for index in range(start, len(text)):
+        char = text[index]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            depth += 1
+        elif char in "}]":
+            depth -= 1
+            if depth == 0:
+                return text[start : index + 1]
+    return text[start:]
+
+
+def _repair_json(text: str) -> str:
+    """
+    Fix common defects: smart quotes, and Python literals and trailing commas
+    outside of strings
+    """
+    text = text.translate(_SMART_QUOTES)
+    return _STRING_OR_DEFECT.sub(_repair_match, text)
+
+
+def _repair_match(match) -> str:
+    if match.group(1):
+        return _PYTHON_LITERALS[match.group(1)]
+    if match.group(2) is not None:
+        return match.group(2)  # The closing brace or bracket without the comma
+    return match.group(0)
+
+
+def parse_json_text(text: str):
+    """
+    Parse JSON from a model output.
+
+    Valid JSON is parsed directly. Otherwise the JSON is taken from a markdown
+    fence or from surrounding prose, common defects are repaired and truncated
+    output is closed. Repairs are counted on the current call record.
+
+    Args:
+        text (str): Raw model output
+
+    Returns:
+        The parsed JSON value
+
+    Raises:
+        OutputParserException: If no JSON can be recovered
+    """
+    try:
+        return json.loads(text)
+    except (TypeError, ValueError):
+        pass
+
+    fence = _FENCE.search(text)
+    candidate = _find_json_span(fence.group(1) if fence else text)
+    if candidate is not None:
+        for repaired in (candidate, _repair_json(candidate)):
+            try:
+                value = json.loads(repaired)
+            except ValueError:
+                continue
+            record_repair()
+            return value
+        value = parse_partial_json(_repair_json(candidate))
+        if value is not None:
+            record_repair()
+            return value
+    raise OutputParserException(
+        f"Invalid json output: {text[:200]}", llm_output=text
+    )
+
+
+def parse_number_text(text: str) -> Optional[float]:
+    """
+    Parse a number from a model output, e.g. "45", "45 minutes" or "1,200"
+
+    Args:
+        text (str): Raw model output
+
+    Returns:
+        float: The first number in the output, or None if there is none
+    """
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    match = _NUMBER.search(text)
+    if match is None:
+        return None
+    record_repair()
+    return float(match.group(0).replace(",", ""))
+
+
+def parse_items_text(text: str) -> List[str]:
+    """
+    Parse list items from a model output: a JSON object with an "items" array,
+    a bare JSON array, a JSON object with a single array, or a bulleted list
+
+    Args:
+        text (str): Raw model output
+
+    Returns:
+        List[str]: The items
+
+    Raises:
+        OutputParserException: If no items can be recovered
+    """
+    try:
+        value = parse_json_text(text)
+    except OutputParserException:
+        bullets = [
+            match.group(1)
+            for match in map(_BULLET.match, text.splitlines())
+            if match
+        ]
+        if not bullets:
+            raise
+        record_repair()
+        return bullets
+
+    if isinstance(value, dict) and isinstance(value.get("items"), list):
+        items = value["items"]
+    elif isinstance(value, list):
+        record_repair()
+        items = value
+    elif isinstance(value, dict) and len(value) == 1:
+        items = next(iter(value.values()))
+        if not isinstance(items, list):
+            raise OutputParserException(
+                f"Expected a list of items: {text[:200]}", llm_output=text
+            )
+        record_repair()
+    else:
+        raise OutputParserException(
+            f"Expected a list of items: {text[:200]}", llm_output=text
+        )
+
+    if any(not isinstance(item, str) for item in items):
+        record_repair()
+        items = [
+            item if isinstance(item, str) else json.dumps(item) for item in items
+        ]
+    return items
+
+
+def parse_object_text(text: str) -> dict:
+    """
+    Parse an object from a model output. Attribute values are returned as the
+    model gave them, like JsonOutputParser, so null or nested values of
+    attributes described as text are kept rather than rejected.
+
+    Args:
+        text (str): Raw model output
+
+    Returns:
+        dict: The parsed object
+
+    Raises:
+        OutputParserException: If no JSON object can be recovered
+    """
+    value = parse_json_text(text)
+    if not isinstance(value, dict):
+        raise OutputParserException(
+            f"Expected a json object: {text[:200]}", llm_output=text
+        )
+    return value
@@ -0,0 +1,444 @@
+"""Module for preprocessing content once per document before fields run."""
+
+import math
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, fields
+from typing import Callable, Iterable, List, Optional, Union
+
+from .tokens import CHARS_PER_TOKEN, estimate_tokens, is_token_count
+
+
+_FILLERS = re.compile(
+    r"(?<![\w-])(?:u+m+|u+h+|e+r+m+|uhm+|hmm+)(?![\w-]),?[ \t]*", re.IGNORECASE
+)
+# "Speaker (Role): text", the role being optional. The speaker is one to four
+# words of letters, so labels like "Q3:" are no speaker turns
+_NAME_WORD = r"[^\W\d_](?:[^\W\d_]|[.'-])*"
+_SPEAKER = re.compile(
+    rf"^(?P<speaker>{_NAME_WORD}(?: {_NAME_WORD}){{0,3}})\s*"
+    r"(?:\((?P<role>[^()\n]{1,60})\))?:\s+(?P<text>.*)$"
+)
+_WORD = re.compile(r"\w+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by did do does for from has have how in is it its of "
+    "on or that the their there this to was were what when where which who why "
+    "will with".split()
+)
+
+_current_document: ContextVar = ContextVar("current_document", default=None)
+
+
+def normalize_whitespace(content: str) -> str:
+    """
+    Normalize line endings and invisible characters, collapse runs of spaces
+    and blank lines, and strip trailing spaces
+
+    Args:
+        content (str): The content
+
+    Returns:
+        str: The normalized content
+    """
+    content = content.replace("\r\n", "\n").replace("\r", "\n")
+    content = content.replace("\u00a0", " ")
+    content = content.replace("\u200b", "").replace("\ufeff", "")
+    content = re.sub(r"[ \t]+", " ", content)
+    content = re.sub(r" *\n *", "\n", content)
+    content = re.sub(r"\n{3,}", "\n\n", content)
+    return content.strip()
+
+
+def remove_fillers(content: str) -> str:
+    """
+    Remove spoken filler words such as "um", "uh" and "hmm"
+
+    Args:
+        content (str): The content
+
+    Returns:
+        str: The content without filler words
+    """
+    return _FILLERS.sub("", content)
+
+
+def compact_speaker_turns(content: str) -> str:
+    """
+    Merge consecutive lines of the same speaker into one turn and drop the role
+    of a speaker after its first turn, e.g. "Emma (Product Manager):" becomes
+    "Emma:". Only labels that look like a name, capitalized words of letters,
+    are speakers. Other lines are kept as they are, but single capitalized
+    labels such as "Note:" cannot be told apart from names, so this step is
+    not applied by default.
+
+    Args:
+        content (str): Transcript with one "Speaker (Role): text" turn per line
+
+    Returns:
+        str: The compacted transcript
+    """
+    lines = []
+    introduced = set()
+    previous_speaker = None
+    for line in content.split("\n"):
+        match = _SPEAKER.match(line.strip())
+        if match is not None and not _is_name(match.group("speaker")):
+            match = None
+        if match is None:
+            lines.append(line)
+            previous_speaker = None
+            continue
+        speaker, role, text = match.group("speaker", "role", "text")
+        if speaker == previous_speaker:
+            lines[-1] = f"{lines[-1]} {text}"
+            continue
+        if role and speaker not in introduced:
+            lines.append(f"{speaker} ({role}): {text}")
+        else:
+            lines.append(f"{speaker}: {text}")
+        introduced.add(speaker)
+        previous_speaker = speaker
+    return "\n".join(lines)
+
+
+def _is_name(speaker: str) -> bool:
+    # Every word of a name is capitalized, unlike labels such as "Action items"
+    return all(word[0].isupper() for word in speaker.split())
+
+
+PREPROCESSING_STEPS = {
+    "fillers": remove_fillers,
+    "speaker_turns": compact_speaker_turns,
+    "whitespace": normalize_whitespace,
+}
+DEFAULT_STEPS = ("fillers", "whitespace")  # speaker_turns is opt-in for transcripts
+
+
+class Preprocessor:
+    """
+    Pipeline of content transformations applied once per document before any
+    data field or classifier runs
+    """
+
+    def __init__(
+        self,
+        steps: Iterable[Union[str, Callable]] = DEFAULT_STEPS,
+    ):
+        """
+        Initialize Preprocessor
+
+        Args:
+            steps (Iterable[Union[str, Callable]]): Names of built-in steps
+                (fillers, speaker_turns, whitespace) or functions taking and
+                returning the content, applied in order. speaker_turns is only
+                meant for transcripts and is not among the default steps
+
+        Raises:
+            ValueError: If a step name is unknown
+        """
+        self.steps = []
+        for step in steps:
+            if callable(step):
+                self.steps.append(step)
+            elif step in PREPROCESSING_STEPS:
+                self.steps.append(PREPROCESSING_STEPS[step])
+            else:
+                raise ValueError(
+                    f"Invalid preprocessing step '{step}', "
+                    f"expected one of {', '.join(PREPROCESSING_STEPS)}"
+                )
+
+    def __call__(self, content: str) -> str:
+        for step in self.steps:
+            content = step(content)
+        return content
+
+
+@dataclass(frozen=True)
+class RelevanceConfig:
+    """
+    Relevance filtering settings of a data field, from its "relevance"
+    configuration. Only the passages of the content that best match the query
+    are sent, up to max_tokens.
+    """
+
+    max_tokens: int = 1000
+    passage_tokens: int = 100
+    query: str = ""  # Field prompt and attribute descriptions
+
+    @classmethod
+    def from_config(cls, key: str, config: dict, query: str):
+        """
+        Build the relevance settings of a data field
+
+        Args:
+            key (str): Key of the data field
+            config (dict): The "relevance" configuration of the data field
+            query (str): Text the passages are scored against
+
+        Returns:
+            RelevanceConfig: The validated settings
+
+        Raises:
+            ValueError: If the configuration is not an object or has unknown keys
+            ValueError: If the token budget or passage size is invalid, e.g.
+                not an integer
+        """
+        if not isinstance(config, dict):
+            raise ValueError(f"Relevance for key '{key}' must be an object")
+        for name in config:
+            if name == "query" or name not in {setting.name for setting in fields(cls)}:
+                raise ValueError(f"Unknown relevance setting '{name}' for key '{key}'")
+        relevance = cls(**config, query=query)
+        if not is_token_count(relevance.max_tokens) or relevance.max_tokens <= 0:
+            raise ValueError(f"Relevance max_tokens for key '{key}' must be positive")
+        if (
+            not is_token_count(relevance.passage_tokens)
+            or not 0 < relevance.passage_tokens <= relevance.max_tokens
+        ):
+            raise ValueError(
+                f"Relevance passage_tokens for key '{key}' must be positive and "
+                "at most max_tokens"
+            )
+        return relevance
+
+
+def build_relevance_query(config: dict) -> str:
+    """
+    Build the relevance query of a data field from its prompt and, for objects,
+    the names and descriptions of its attributes
+
+    Args:
+        config (dict): Configuration of the data field
+
+    Returns:
+        str: The query text
+    """
+    parts = [config.get("prompt", "")]
+
+    def add_attributes(attributes):
+        if isinstance(attributes, dict):
+            for name, value in attributes.items():
+                parts.append(name.replace("_", " "))
+                add_attributes(value)
+        elif isinstance(attributes, list):
+            for value in attributes:
+                add_attributes(value)
+        elif isinstance(attributes, str):
+            parts.append(attributes)
+
+    add_attributes(config.get("attributes"))
+    return " ".join(part for part in parts if part)
+
+
+def _tokenize(text: str) -> List[str]:
+    return [
+        word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS
+    ]
+
+
+def split_passages(content: str, passage_tokens: int) -> List[str]:
+    """
+    Group consecutive lines of content into passages of about passage_tokens.
+    Lines longer than a passage are passages of their own.
+
+    Args:
+        content (str): The content
+        passage_tokens (int): Target size of a passage
+
+    Returns:
+        List[str]: The passages, in order
+    """
+    limit = passage_tokens * CHARS_PER_TOKEN
+    passages = []
+    current = []
+    size = 0
+    for line in content.split("\n"):
+        if current and size + len(line) > limit:
+            passages.append("\n".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        passages.append("\n".join(current))
+    return passages
+
+
+class PassageIndex:
+    """
+    BM25 index over the passages of a document
+    """
+
+    def __init__(self, passages: List[str], k1: float = 1.5, b: float = 0.75):
+        self.passages = passages
+        self.k1 = k1
+        self.b = b
+        self.term_counts = [Counter(_tokenize(passage)) for passage in passages]
+        self.lengths = [sum(counts.values()) for counts in self.term_counts]
+        self.average_length = sum(self.lengths) / max(1, len(passages)) or 1.0
+        document_frequency = Counter()
+        for counts in self.term_counts:
+            document_frequency.update(counts.keys())
+        total = len(passages)
+        self.idf = {
+            term: math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequency.items()
+        }
+
+    def score(self, query: str) -> List[float]:
+        """
+        Score every passage against a query
+
+        Args:
+            query (str): The query text
+
+        Returns:
+            List[float]: BM25 score of each passage
+        """
+        terms = set(_tokenize(query))
+        scores = []
+        for counts, length in zip(self.term_counts, self.lengths):
+            score = 0.0
+            normalization = self.k1 * (
+                1 - self.b + self.b * length / self.average_length
+            )
+            for term in terms:
+                frequency = counts.get(term)
+                if frequency:
+                    score += self.idf[term] * frequency * (self.k1 + 1) / (
+                        frequency + normalization
+                    )
+            scores.append(score)
+        return scores
+
+
+class PreparedDocument:
+    """
+    Content of a document after preprocessing. The passage index is built on
+    first use and shared by every field with relevance filtering, and the
+    tokens saved by preprocessing and filtering are recorded for the report.
+    """
+
+    def __init__(self, original: str, content: str):
+        self.original_tokens = estimate_tokens(original)
+        self.content = content
+        self.tokens = estimate_tokens(content)
+        self.indexes = {}  # Passage index by passage size
+        self.slices = {}  # Relevant content by data key
+        self.field_tokens_saved = {}
+
+    def select_relevant(self, key: str, relevance: RelevanceConfig) -> str:
+        """
+        Select the passages most relevant to a field, in document order, up to
+        its token budget. Content within the budget is returned unchanged.
+
+        Args:
+            key (str): Key of the data field
+            relevance (RelevanceConfig): Relevance settings of the field
+
+        Returns:
+            str: The relevant content
+        """
+        if key in self.slices:
+            return self.slices[key]
+        if self.tokens <= relevance.max_tokens:
+            selected = self.content
+        else:
+            index = self.indexes.get(relevance.passage_tokens)
+            if index is None:
+                index = PassageIndex(
+                    split_passages(self.content, relevance.passage_tokens)
+                )
+                self.indexes[relevance.passage_tokens] = index
+            selected = _select_passages(index, relevance)
+        self.slices[key] = selected
+        self.field_tokens_saved[key] = self.tokens - estimate_tokens(selected)
+        return selected
+
+    def get_report(self) -> dict:
+        """
+        Returns the tokens saved by preprocessing and relevance filtering
+
+        Returns:
+            dict: Estimated tokens of the original and preprocessed content,
+                tokens saved by preprocessing, and tokens saved per field with
+                relevance filtering
+        """
+        return {
+            "original_tokens": self.original_tokens,
+            "tokens": self.tokens,
+            "tokens_saved": self.original_tokens - self.tokens,
+            "fields": dict(self.field_tokens_saved),
+        }
+
+
+def _select_passages(index: PassageIndex, relevance: RelevanceConfig) -> str:
+    """
+    Select the best scoring passages up to the token budget, in document order.
+    The leading passages are used when no passage matches the query.
+    """
+    scores = index.score(relevance.query)
+    ranked = sorted(
+        (position for position, score in enumerate(scores) if score > 0),
+        key=lambda position: -scores[position],
+    )
+    if not ranked:
+        ranked = range(len(index.passages))
+
+    selected = []
+    budget = relevance.max_tokens
+    for position in ranked:
+        tokens = estimate_tokens(index.passages[position])
+        if tokens > budget:
+            continue
+        selected.append(position)
+        budget -= tokens
+    if not selected:
+        # Every passage exceeds the budget, so cut the best one
+        position = next(iter(ranked))
+        return index.passages[position][: relevance.max_tokens * CHARS_PER_TOKEN]
+    return "\n".join(index.passages[position] for position in sorted(selected))
+
+
+@contextmanager
+def prepare_document(content: str, preprocessor: Optional[Callable] = None):
+    """
+    Preprocess the content of a document and share the prepared document with
+    the fields executed within the block
+
+    Args:
+        content (str): Content of the document
+        preprocessor (Callable, optional): Function transforming the content
+
+    Yields:
+        PreparedDocument: The prepared document
+    """
+    document = PreparedDocument(
+        content, preprocessor(content) if preprocessor else content
+    )
+    token = _current_document.set(document)
+    try:
+        yield document
+    finally:
+        _current_document.reset(token)
+
+
+def get_prepared_document(content: str) -> PreparedDocument:
+    """
+    Returns the prepared document of the current context if it holds the
+    content, or a new prepared document of the content
+
+    Args:
+        content (str): Preprocessed content of the document
+
+    Returns:
+        PreparedDocument: The prepared document
+    """
+    document = _current_document.get()
+    if document is None or (
+        document.content is not content and document.content != content
+    ):
+        return PreparedDocument(content, content)
+    return document
@@ -0,0 +1,133 @@
+"""Module for extracting several data fields with a single completion."""
+
+from typing import List, Optional
+
+from langchain_core.output_parsers import JsonOutputParser
+from pydantic import Field, ValidationError, create_model
+
+from .output_parsing import parse_json_text
+from .process_list import ListModel
+from .prompt_layout import build_prompts
+
+
+BATCH_PROMPT = """Extract each of the following fields from the content above.
+Answer with a single JSON object that has one key per field:
+
+{field_prompts}"""
+
+EXTRACTION_PROMPT = """Be sure to return a valid json NOT encapsulated in markdown. Never use the invalid escape sequence \'
+
+Formatting Instructions: {format_instructions}"""
+
+
+def _field_type(plan):
+    """
+    Returns the type of a data field inside the composite batch model
+
+    Args:
+        plan (FieldPlan): Compiled plan of the data field
+
+    Returns:
+        type: Annotation for the field
+    """
+    if plan.data_type == "object":
+        return plan.model_class
+    if plan.data_type == "list":
+        return List[str]
+    if plan.data_type == "numeric":
+        return Optional[float]
+    return str
+
+
+def build_batch_components(plans: list, data_dict: dict) -> dict:
+    """
+    Build the completion components extracting several data fields at once.
+
+    Args:
+        plans (list): Compiled plans of the data fields to extract
+        data_dict (dict): Configuration of all data fields
+
+    Returns:
+        dict: Prompts, parser, static arguments and the composite model
+    """
+    fields = {}
+    field_prompts = []
+    for plan in plans:
+        prompt = data_dict[plan.key].get("prompt", "")
+        fields[plan.key] = (_field_type(plan), Field(description=prompt))
+        field_prompts.append(f"- {plan.key} ({plan.data_type}): {prompt}")
+
+    BatchModel = create_model("BatchModel", **fields)
+    parser = JsonOutputParser(pydantic_object=BatchModel)
+
+    prompts = build_prompts(("user", BATCH_PROMPT), ("user", EXTRACTION_PROMPT))
+
+    return {
+        "prompts": prompts,
+        "parser": lambda output: parse_json_text(output.content),
+        "args": {
+            "field_prompts": "\n".join(field_prompts),
+            "format_instructions": parser.get_format_instructions(),
+        },
+        "model_class": BatchModel,
+    }
+
+
+def validate_field_value(plan, value):
+    """
+    Validate a single field value of a batch answer against the field plan.
+    Objects are accepted like parse_object_text accepts them, without checking
+    the types of their attributes.
+
+    Args:
+        plan (FieldPlan): Compiled plan of the data field
+        value: The value the model returned for the field
+
+    Returns:
+        The value in the same shape a per-field completion returns
+
+    Raises:
+        ValueError: If the value does not match the field type
+    """
+    try:
+        if plan.data_type == "object":
+            if not isinstance(value, dict):
+                raise TypeError("expected an object")
+            return value
+        if plan.data_type == "list":
+            return ListModel.model_validate({"items": value}).items
+        if plan.data_type == "numeric":
+            return float(value)
+    except (TypeError, ValidationError) as error:
+        raise ValueError(f"Invalid value for field '{plan.key}': {error}") from error
+
+    if not isinstance(value, str):
+        raise ValueError(f"Invalid value for field '{plan.key}': expected a string")
+    return value
+
+
+def split_batch_result(parsed, plans: list) -> tuple:
+    """
+    Split a batch answer back into per-field results
+
+    Args:
+        parsed (dict): Parsed JSON answer of the batch completion
+        plans (list): Compiled plans of the data fields in the batch
+
+    Returns:
+        tuple: Dictionary of valid results by key and list of keys that failed
+    """
+    results = {}
+    failed = []
+    if not isinstance(parsed, dict):
+        return results, [plan.key for plan in plans]
+
+    for plan in plans:
+        if plan.key not in parsed:
+            failed.append(plan.key)
+            continue
+        try:
+            results[plan.key] = validate_field_value(plan, parsed[plan.key])
+        except ValueError:
+            failed.append(plan.key)
+    return results, failed
@@ -0,0 +1,205 @@
+"""Module for map-reduce extraction of data fields over long content."""
+
+import json
+from dataclasses import dataclass, fields
+from typing import List
+
+from .tokens import CHARS_PER_TOKEN, is_token_count
+
+
+AGGREGATIONS = ("sum", "max", "min", "first")
+
+PARTIAL_ANSWERS_PROMPT = """The content was processed in parts. These are the answers for each part:
+
+{answers}"""
+
+
+@dataclass(frozen=True)
+class ChunkingConfig:
+    """
+    Chunking settings of a data field, from its "chunking" configuration
+    """
+
+    window_tokens: int = 4000
+    overlap_tokens: int = 200
+    aggregate: str = "max"  # Aggregation of numeric fields
+
+    @classmethod
+    def from_config(cls, key: str, config: dict):
+        """
+        Build the chunking settings of a data field
+
+        Args:
+            key (str): Key of the data field
+            config (dict): The "chunking" configuration of the data field
+
+        Returns:
+            ChunkingConfig: The validated settings
+
+        Raises:
+            ValueError: If the configuration is not an object or has unknown keys
+            ValueError: If the window, overlap or aggregation is invalid, e.g. a
+                token count that is not an integer
+        """
+        if not isinstance(config, dict):
+            raise ValueError(f"Chunking for key '{key}' must be an object")
+        for name in config:
+            if name not in {setting.name for setting in fields(cls)}:
+                raise ValueError(f"Unknown chunking setting '{name}' for key '{key}'")
+        chunking = cls(**config)
+        if not is_token_count(chunking.window_tokens) or chunking.window_tokens <= 0:
+            raise ValueError(f"Chunking window for key '{key}' must be positive")
+        if (
+            not is_token_count(chunking.overlap_tokens)
+            or not 0 <= chunking.overlap_tokens < chunking.window_tokens
+        ):
+            raise ValueError(
+                f"Chunking overlap for key '{key}' must be smaller than the window"
+            )
+        if chunking.aggregate not in AGGREGATIONS:
+            raise ValueError(
+                f"Invalid aggregate '{chunking.aggregate}' for key '{key}', "
+                f"expected one of {', '.join(AGGREGATIONS)}"
+            )
+        return chunking
+
+
+def split_content(content: str, chunking: ChunkingConfig) -> List[str]:
+    """
+    Split content into overlapping chunks of at most the token window.
+    Chunks end at a line break or space when one is close to the window end.
+
+    Args:
+        content (str): The content to split
+        chunking (ChunkingConfig): Window and overlap settings
+
+    Returns:
+        List[str]: The chunks, a single one if the content fits the window
+    """
+    window = chunking.window_tokens * CHARS_PER_TOKEN
+    overlap = chunking.overlap_tokens * CHARS_PER_TOKEN
+    if len(content) <= window:
+        return [content]
+
+    chunks = []
+    start = 0
+    while start < len(content):
+        end = min(len(content), start + window)
+        if end < len(content):
+            # Prefer a natural boundary within the last tenth of the window
+            boundary = max(
+                content.rfind("\n", end - window // 10, end),
+                content.rfind(" ", end - window // 10, end),
+            )
+            if boundary > start + overlap:
+                end = boundary
+        chunks.append(content[start:end])
+        if end == len(content):
+            break
+        start = end - overlap
+    return chunks
+
+
+def build_partial_answers(results: list) -> str:
+    """
+    Combine the answers of each chunk into the content of a reduce pass
+
+    Args:
+        results (list): Answers of each chunk
+
+    Returns:
+        str: Content listing every answer
+    """
+    answers = "\n\n".join(
+        f"Part {index}:\n{result}" for index, result in enumerate(results, start=1)
+    )
+    return PARTIAL_ANSWERS_PROMPT.format(answers=answers)
+
+
+def _dedupe(items: list) -> list:
+    seen = set()
+    unique = []
+    for item in items:
+        marker = (
+            item.strip().lower()
+            if isinstance(item, str)
+            else json.dumps(item, sort_keys=True, default=str)
+        )
+        if marker not in seen:
+            seen.add(marker)
+            unique.append(item)
+    return unique
+
+
+def merge_lists(results: list) -> list:
+    """
+    Merge list answers of each chunk, dropping duplicates
+
+    Args:
+        results (list): List answers of each chunk
+
+    Returns:
+        list: Merged items in order of first appearance
+    """
+    return _dedupe([item for result in results if result for item in result])
+
+
+def merge_objects(results: list, attributes) -> dict:
+    """
+    Merge object answers of each chunk following the attribute schema.
+    Arrays are concatenated without duplicates, nested objects are merged
+    recursively and scalars keep the first value that is not null or an empty
+    string, so 0 and false are kept.
+
+    Args:
+        results (list): Object answers of each chunk
+        attributes: The "attributes" configuration of the data field
+
+    Returns:
+        dict: The merged object
+    """
+    results = [result for result in results if isinstance(result, dict)]
+    if not isinstance(attributes, dict):
+        attributes = {}
+
+    merged = {}
+    keys = list(attributes) + [
+        key for result in results for key in result if key not in attributes
+    ]
+    for key in dict.fromkeys(keys):
+        values = [result[key] for result in results if key in result]
+        schema = attributes.get(key)
+        if isinstance(schema, list) or any(isinstance(v, list) for v in values):
+            merged[key] = merge_lists(
+                [value for value in values if isinstance(value, list)]
+            )
+        elif isinstance(schema, dict):
+            merged[key] = merge_objects(values, schema)
+        else:
+            merged[key] = next(
+                (value for value in values if value is not None and value != ""), None
+            )
+    return merged
+
+
+def aggregate_numbers(results: list, aggregate: str):
+    """
+    Aggregate numeric answers of each chunk
+
+    Args:
+        results (list): Numeric answers of each chunk, None where parsing failed
+        aggregate (str): One of sum, max, min or first
+
+    Returns:
+        float: The aggregated value, or None if no chunk had a value
+    """
+    values = [result for result in results if result is not None]
+    if not values:
+        return None
+    if aggregate == "sum":
+        return sum(values)
+    if aggregate == "min":
+        return min(values)
+    if aggregate == "first":
+        return values[0]
+    return max(values)
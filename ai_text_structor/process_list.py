@@ -1,11 +1,13 @@
 """Module for processing lists using LangChain with JSON output parsing."""
 
 from langchain_core.output_parsers import JsonOutputParser
-from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel
 from typing import List
 from langchain_core.messages import AIMessage
 
+from .output_parsing import parse_items_text
+from .prompt_layout import build_prompts
+
 
 class ListModel(BaseModel):
     """Pydantic model for list items output."""
@@ -14,11 +16,12 @@ class ListModel(BaseModel):
 
 
 parser = JsonOutputParser(pydantic_object=ListModel)
+FORMAT_INSTRUCTIONS = parser.get_format_instructions()
 
 
 def items_only_parser(output: AIMessage) -> List[str]:
     """
-    Parse AIMessage output and extract items list.
+    Parse AIMessage output and extract items list, repairing common defects.
 
     Args:
         output (AIMessage): The AI message containing JSON response
@@ -26,8 +29,7 @@ def items_only_parser(output: AIMessage) -> List[str]:
     Returns:
         List[str]: Extracted list of items
     """
-    parsed = parser.parse(output.content)
-    return parsed["items"]
+    return parse_items_text(output.content)
 
 
 EXTRACTION_PROMPT = """Be sure to return a valid json NOT encapsulated in markdown. Never use the invalid escape sequence \'
@@ -36,36 +38,47 @@ The output should be a JSON object with a single key 'items' containing an array
 Formatting Instructions: {format_instructions}"""
 
 
-def run_completion_for_list(content: str, engine_object: dict) -> dict:
+def build_list_components(engine_object: dict) -> dict:
     """
-    Prepare completion parameters for list processing.
+    Build the content-independent completion components for list processing.
 
     Args:
-        content (str): The content to process
         engine_object (dict): Configuration for the engine
 
     Returns:
-        dict: Configuration for running the completion
+        dict: Prompts, parser and the static arguments of the completion
     """
     prompt = engine_object.get("prompt")
 
-    content_key = "content"
     prompt_key = "invocation_prompt"
 
-    prompts = ChatPromptTemplate.from_messages(
-        [
-            ("user", "{" + content_key + "}"),
-            ("user", "{" + prompt_key + "}"),
-            ("user", EXTRACTION_PROMPT),
-        ]
+    prompts = build_prompts(
+        ("user", "{" + prompt_key + "}"),
+        ("user", EXTRACTION_PROMPT),
     )
 
     return {
         "prompts": prompts,
         "parser": items_only_parser,  # Use the wrapper parser instead
         "args": {
-            "format_instructions": parser.get_format_instructions(),
+            "format_instructions": FORMAT_INSTRUCTIONS,
             prompt_key: prompt,
-            content_key: content,
         },
+        "model_class": ListModel,
     }
+
+
+def run_completion_for_list(content: str, engine_object: dict) -> dict:
+    """
+    Prepare completion parameters for list processing.
+
+    Args:
+        content (str): The content to process
+        engine_object (dict): Configuration for the engine
+
+    Returns:
+        dict: Configuration for running the completion
+    """
+    components = build_list_components(engine_object)
+    components["args"]["content"] = content
+    return components
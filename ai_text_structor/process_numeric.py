@@ -1,32 +1,33 @@
-from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import AIMessage
 
+from .output_parsing import parse_number_text
+from .prompt_layout import build_prompts
+
 
 def parse_output(output: AIMessage):
-    try:
-        return float(output.content)
-    except ValueError:
-        return None
+    return parse_number_text(output.content)
 
 
-def run_completion_for_numeric(content, engine_object):
+def build_numeric_components(engine_object):
     prompt = engine_object.get("prompt")
     prompt_key = "invocation_prompt"
-    content_key = "content"
-    prompts = ChatPromptTemplate.from_messages(
-        [
-            ("user", "{" + content_key + "}"),
-            ("user", "{" + prompt_key + "}"),
-            ("user", "output only numeric value"),
-        ]
+    prompts = build_prompts(
+        ("user", "{" + prompt_key + "}"),
+        ("user", "output only numeric value"),
     )
     args = {
         prompt_key: prompt,
-        content_key: content,
     }
 
     return {
         "prompts": prompts,
         "parser": parse_output,
         "args": args,
+        "model_class": None,
     }
+
+
+def run_completion_for_numeric(content, engine_object):
+    components = build_numeric_components(engine_object)
+    components["args"]["content"] = content
+    return components
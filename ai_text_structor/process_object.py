@@ -4,7 +4,9 @@ from pydantic import Field, create_model
 from typing import Annotated
 
 from langchain_core.output_parsers import JsonOutputParser
-from langchain_core.prompts import ChatPromptTemplate
+
+from .output_parsing import parse_object_text
+from .prompt_layout import build_prompts
 
 
 extraction_prompt = """Be sure to return a valid json NOT encapsulated in markdown.  Never use the invalid escape sequence \'
@@ -21,31 +23,34 @@ def build_pydantic_model(attributes):
     return DynamicModel
 
 
-def run_completion_for_object(content, engine_object):
+def build_object_components(engine_object):
     invocation_prompt = engine_object.get("prompt")
     attributes = engine_object.get("attributes")
     DynamicModel = build_pydantic_model(attributes)
     parser = JsonOutputParser(pydantic_object=DynamicModel)
 
-    content_key = "content"
-    prompt_key = "invocation_prompt"
+    def parse_object(output):
+        return parse_object_text(output.content)
 
-    extraction_prompt.format(format_instructions=parser.get_format_instructions())
+    prompt_key = "invocation_prompt"
 
-    prompts = ChatPromptTemplate.from_messages(
-        [
-            ("user", "{" + content_key + "}"),
-            ("user", "{" + prompt_key + "}"),
-            ("user", extraction_prompt),
-        ]
+    prompts = build_prompts(
+        ("user", "{" + prompt_key + "}"),
+        ("user", extraction_prompt),
     )
 
     return {
         "prompts": prompts,
-        "parser": parser,
+        "parser": parse_object,
         "args": {
             "format_instructions": parser.get_format_instructions(),
             prompt_key: invocation_prompt,
-            content_key: content,
         },
+        "model_class": DynamicModel,
     }
+
+
+def run_completion_for_object(content, engine_object):
+    components = build_object_components(engine_object)
+    components["args"]["content"] = content
+    return components
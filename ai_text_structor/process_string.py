@@ -1,23 +1,24 @@
-from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
+from .prompt_layout import build_prompts
 
-def run_completion_for_string(content, engine_object):
+
+def build_string_components(engine_object):
     prompt = engine_object.get("prompt")
 
-    content_key = "content"
     prompt_key = "invocation_prompt"
-    prompts = ChatPromptTemplate.from_messages(
-        [
-            ("user", "{" + content_key + "}"),
-            ("user", "{" + prompt_key + "}"),
-        ]
-    )
+    prompts = build_prompts(("user", "{" + prompt_key + "}"))
     return {
         "prompts": prompts,
         "parser": StrOutputParser(),
         "args": {
             prompt_key: prompt,
-            content_key: content,
         },
+        "model_class": None,
     }
+
+
+def run_completion_for_string(content, engine_object):
+    components = build_string_components(engine_object)
+    components["args"]["content"] = content
+    return components
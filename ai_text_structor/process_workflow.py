@@ -1,64 +1,176 @@
-from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableLambda
 from typing import Any
+import re
 
+from .output_parsing import record_repair
+from .prompt_layout import build_prompts, mark_cache_control
+from .response_cache import ainvoke_cached, invoke_cached
 
-def process_workflow(
-    model: Any,
+
+def build_workflow_components(
     content: str,
     workflow_prompt: str,
     workflow_paths: dict[str, str],
     context_data: dict[str, str],
-) -> str:
+    cache_control: bool = False,
+) -> dict:
     """
-    Process workflow to determine which path to take based on the initial prompt and possible paths
+    Build the classification prompt, parser and arguments for a workflow. The
+    prompt starts with the same preamble and content as the data field prompts.
 
     Args:
-        model: LangChain model instance to use for completion
         content (str): Input content to analyze
         workflow_prompt (str): Initial workflow prompt
         workflow_paths (dict[str, str]): Dictionary of possible workflow paths and their explanations
         context_data (dict[str, str]): Context data for variable replacement
+        cache_control (bool): Mark the shared prompt prefix for provider caching
 
     Returns:
-        str: Selected workflow path key
+        dict: The prompt, its parser and the arguments to render it with
     """
     # Construct the options string
     options = "\n".join([f"- {key}: {value}" for key, value in workflow_paths.items()])
 
     # Create the prompt template
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            (
-                "system",
-                "You are a workflow analyzer. Based on the content and description, "
-                "select ONE of the provided workflow types. Respond ONLY with the workflow key.",
-            ),
-            ("user", "Content: {content}"),
-            ("user", "Task: {workflow_prompt}"),
-            ("user", "Available workflows:\n{options}"),
-        ]
+    prompt = build_prompts(
+        (
+            "user",
+            "You are a workflow analyzer. Based on the content and description, "
+            "select ONE of the provided workflow types. Respond ONLY with the workflow key.",
+        ),
+        ("user", "Task: {workflow_prompt}"),
+        ("user", "Available workflows:\n{options}"),
     )
+    if cache_control:
+        prompt = mark_cache_control(prompt)
 
-    # Set up the chain with the provided model and string parser
-    chain = prompt | model | StrOutputParser()
+    # Parse the answer and validate the key
+    parser = StrOutputParser() | RunnableLambda(
+        lambda result: parse_workflow_result(result, workflow_paths)
+    )
 
     # Replace variables in workflow prompt with context data
     for key, value in context_data.items():
         workflow_prompt = workflow_prompt.replace(f"{{{key}}}", str(value))
 
-    # Execute the chain
-    result = chain.invoke(
-        {
+    return {
+        "prompt": prompt,
+        "parser": parser,
+        "args": {
             "content": content,
             "workflow_prompt": workflow_prompt,
             "options": options,
-        }
-    )
+        },
+    }
+
+
+def parse_workflow_result(result: str, workflow_paths: dict[str, str]) -> str:
+    """
+    Clean and validate the workflow key returned by the model.
+    An answer with quotes or surrounding prose is accepted if it names exactly
+    one workflow path.
+
+    Args:
+        result (str): Raw model output
+        workflow_paths (dict[str, str]): Dictionary of possible workflow paths
+
+    Returns:
+        str: Selected workflow path key
+
+    Raises:
+        ValueError: If the model returned a key that is not a workflow path
+    """
+    selected_workflow = result.strip().strip("`'\".:*").strip().lower()
+    if selected_workflow in workflow_paths:
+        return selected_workflow
 
-    # Clean and validate the result
-    selected_workflow = result.strip().lower()
-    if selected_workflow not in workflow_paths:
+    mentioned = [
+        key
+        for key in workflow_paths
+        if re.search(rf"(?<![\w-]){re.escape(key.lower())}(?![\w-])", result.lower())
+    ]
+    if len(mentioned) != 1:
         raise ValueError(f"Model returned invalid workflow: {selected_workflow}")
+    record_repair()
+    return mentioned[0]
+
+
+def process_workflow(
+    model: Any,
+    content: str,
+    workflow_prompt: str,
+    workflow_paths: dict[str, str],
+    context_data: dict[str, str],
+    response_cache: Any = None,
+    cache_control: bool = False,
+    model_name: str = "default",
+) -> str:
+    """
+    Process workflow to determine which path to take based on the initial prompt and possible paths
+
+    Args:
+        model: LangChain model instance to use for completion
+        content (str): Input content to analyze
+        workflow_prompt (str): Initial workflow prompt
+        workflow_paths (dict[str, str]): Dictionary of possible workflow paths and their explanations
+        context_data (dict[str, str]): Context data for variable replacement
+        response_cache (ResponseCache, optional): Persistent cache of model responses
+        cache_control (bool): Mark the shared prompt prefix for provider caching
+        model_name (str): Alias of the model in the per-model metrics
+
+    Returns:
+        str: Selected workflow path key
+    """
+    components = build_workflow_components(
+        content, workflow_prompt, workflow_paths, context_data, cache_control
+    )
+    return invoke_cached(
+        response_cache,
+        model,
+        components["prompt"],
+        components["parser"],
+        components["args"],
+        "workflow",
+        model_name=model_name,
+    )
+
+
+async def aprocess_workflow(
+    model: Any,
+    content: str,
+    workflow_prompt: str,
+    workflow_paths: dict[str, str],
+    context_data: dict[str, str],
+    response_cache: Any = None,
+    cache_control: bool = False,
+    model_name: str = "default",
+) -> str:
+    """
+    Async version of process_workflow that awaits the model without blocking the event loop
+
+    Args:
+        model: LangChain model instance to use for completion
+        content (str): Input content to analyze
+        workflow_prompt (str): Initial workflow prompt
+        workflow_paths (dict[str, str]): Dictionary of possible workflow paths and their explanations
+        context_data (dict[str, str]): Context data for variable replacement
+        response_cache (ResponseCache, optional): Persistent cache of model responses
+        cache_control (bool): Mark the shared prompt prefix for provider caching
+        model_name (str): Alias of the model in the per-model metrics
 
-    return selected_workflow
+    Returns:
+        str: Selected workflow path key
+    """
+    components = build_workflow_components(
+        content, workflow_prompt, workflow_paths, context_data, cache_control
+    )
+    return await ainvoke_cached(
+        response_cache,
+        model,
+        components["prompt"],
+        components["parser"],
+        components["args"],
+        "workflow",
+        model_name=model_name,
+    )
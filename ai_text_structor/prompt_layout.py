@@ -0,0 +1,52 @@
+"""Module for the canonical message layout shared by every model call."""
+
+from langchain_core.prompts import ChatPromptTemplate
+
+
+# The system preamble and the content come first in every prompt, so all calls
+# for a document share them as an identical prefix that providers with prompt
+# caching bill once. Field, batch and classifier instructions follow.
+SYSTEM_PREAMBLE = (
+    "You analyze the content provided by the user. "
+    "Follow the instructions given after the content."
+)
+CONTENT_TEMPLATE = "{content}"
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def build_prompts(*instructions) -> ChatPromptTemplate:
+    """
+    Build a prompt in the canonical layout: system preamble, content, then the
+    instructions of the call
+
+    Args:
+        *instructions: Message templates following the content, e.g.
+            ("user", "{invocation_prompt}")
+
+    Returns:
+        ChatPromptTemplate: The prompt, with a content variable
+    """
+    return ChatPromptTemplate.from_messages(
+        [("system", SYSTEM_PREAMBLE), ("user", CONTENT_TEMPLATE), *instructions]
+    )
+
+
+def mark_cache_control(prompts: ChatPromptTemplate) -> ChatPromptTemplate:
+    """
+    Mark the end of the shared prefix of a prompt in the canonical layout with a
+    cache control breakpoint, for providers that only cache marked prefixes
+
+    Args:
+        prompts (ChatPromptTemplate): Prompt built with build_prompts
+
+    Returns:
+        ChatPromptTemplate: The prompt with the content message as a text block
+            carrying cache_control
+    """
+    content_message = (
+        "user",
+        [{"type": "text", "text": CONTENT_TEMPLATE, "cache_control": CACHE_CONTROL}],
+    )
+    messages = list(prompts.messages)
+    messages[1] = content_message
+    return ChatPromptTemplate.from_messages(messages)
@@ -0,0 +1,171 @@
+"""Module for scheduling model calls under provider rate limits."""
+
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Callable, Optional
+
+
+PRIORITY_CLASSIFY = 0  # Workflow classification gates explain work, so it goes first
+PRIORITY_DATA = 1
+PRIORITY_SPECULATIVE = 2  # Work that may be discarded yields to work that is needed
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at a fixed rate up to its capacity
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float, clock: Callable):
+        """
+        Initialize a full token bucket
+
+        Args:
+            capacity (float): Maximum number of tokens in the bucket
+            refill_per_second (float): Tokens added per second
+            clock (Callable): Function returning the current time in seconds
+
+        Raises:
+            ValueError: If capacity or refill rate are not positive
+        """
+        if capacity <= 0 or refill_per_second <= 0:
+            raise ValueError("Token bucket capacity and refill rate must be positive")
+
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.clock = clock
+        self.tokens = capacity
+        self.updated_at = clock()
+
+    def _refill(self):
+        now = self.clock()
+        elapsed = max(0.0, now - self.updated_at)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_per_second)
+        self.updated_at = now
+
+    def time_until_available(self, amount: float) -> float:
+        """
+        Returns the seconds until the bucket holds the requested amount.
+        Amounts above capacity are capped so oversized requests cannot stall forever.
+
+        Args:
+            amount (float): Number of tokens requested
+
+        Returns:
+            float: Seconds to wait, 0 if the tokens are available now
+        """
+        self._refill()
+        missing = min(amount, self.capacity) - self.tokens
+        return max(0.0, missing / self.refill_per_second)
+
+    def consume(self, amount: float):
+        """
+        Remove tokens from the bucket
+
+        Args:
+            amount (float): Number of tokens to remove
+        """
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """
+    Schedules model calls under requests-per-minute and tokens-per-minute limits.
+
+    Waiting calls are granted by priority first (workflow classification before
+    data extraction) and then fairly across queues, so one large document cannot
+    starve the others. Queues are typically one per document.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        clock: Callable = time.monotonic,
+        sleep: Callable = asyncio.sleep,
+    ):
+        """
+        Initialize RateLimiter with provider limits
+
+        Args:
+            requests_per_minute (float, optional): Maximum requests per minute
+            tokens_per_minute (float, optional): Maximum estimated prompt tokens per minute
+            clock (Callable): Function returning the current time in seconds
+            sleep (Callable): Coroutine function sleeping for a number of seconds
+        """
+        self.clock = clock
+        self.sleep = sleep
+        self.request_bucket = (
+            TokenBucket(requests_per_minute, requests_per_minute / 60, clock)
+            if requests_per_minute
+            else None
+        )
+        self.token_bucket = (
+            TokenBucket(tokens_per_minute, tokens_per_minute / 60, clock)
+            if tokens_per_minute
+            else None
+        )
+        self._waiting = []  # Heap of (priority, virtual finish, sequence, tokens, future)
+        self._sequence = itertools.count()
+        self._virtual_time = 0
+        self._queue_finish = {}  # Last virtual finish time handed out per queue
+        self._dispatcher = None
+
+    async def acquire(
+        self, tokens: int = 0, priority: int = PRIORITY_DATA, queue="default"
+    ):
+        """
+        Wait until a model call may be sent
+
+        Args:
+            tokens (int): Estimated prompt tokens of the call
+            priority (int): Lower values are granted first
+            queue: Fair-queuing key, typically the document the call belongs to
+        """
+        future = asyncio.get_running_loop().create_future()
+        finish = max(self._virtual_time, self._queue_finish.get(queue, 0)) + 1
+        self._queue_finish[queue] = finish
+        heapq.heappush(
+            self._waiting, (priority, finish, next(self._sequence), tokens, future)
+        )
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+        await future
+
+    def _wait_time(self, tokens: int) -> float:
+        wait = 0.0
+        if self.request_bucket:
+            wait = max(wait, self.request_bucket.time_until_available(1))
+        if self.token_bucket and tokens:
+            wait = max(wait, self.token_bucket.time_until_available(tokens))
+        return wait
+
+    async def _dispatch(self):
+        """
+        Grant waiting calls in order as the buckets allow
+        """
+        while self._waiting:
+            _, finish, _, tokens, future = self._waiting[0]
+            if future.done():
+                heapq.heappop(self._waiting)
+                continue
+
+            wait = self._wait_time(tokens)
+            if wait > 0:
+                await self.sleep(wait)
+                continue
+
+            heapq.heappop(self._waiting)
+            if self.request_bucket:
+                self.request_bucket.consume(1)
+            if self.token_bucket and tokens:
+                self.token_bucket.consume(tokens)
+            self._virtual_time = finish
+            future.set_result(None)
+            # Let the granted call start before granting the next one
+            await asyncio.sleep(0)
+
+        # Start fair queuing afresh once idle so finished queues are released
+        self._queue_finish.clear()
@@ -0,0 +1,479 @@
+"""Module for a persistent, process-safe cache of model responses."""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Optional
+
+from langchain_core.messages import AIMessage
+
+from .streaming import get_partial_listener, parse_partial
+from .tracing import get_call_record
+
+
+class ResponseCache:
+    """
+    SQLite-backed cache of raw model responses keyed by a hash of the rendered
+    prompt messages, the model identity and the plan that produced the prompt.
+
+    Entries are evicted least-recently-used once max_entries or max_bytes is
+    exceeded, and expire after ttl seconds. The database runs in WAL mode so
+    several worker processes can share one cache file.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        ttl: Optional[float] = None,
+        clock: Callable = time.time,
+    ):
+        """
+        Initialize ResponseCache, creating the database if needed
+
+        Args:
+            path (str): Path of the SQLite database file
+            max_entries (int, optional): Maximum number of cached responses
+            max_bytes (int, optional): Maximum total size of cached responses
+            ttl (float, optional): Seconds after which a response expires
+            clock (Callable): Function returning the current time in seconds
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+
+        with self._lock:
+            self._connect().execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed_at "
+                "ON responses (accessed_at)"
+            )
+
+    def _connect(self):
+        """
+        Returns the connection of the current process, reconnecting after a fork
+        """
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None, check_same_thread=False
+            )
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._pid = os.getpid()
+        return self._connection
+
+    @staticmethod
+    def make_key(model_identity: str, namespace: str, messages) -> str:
+        """
+        Build the cache key of a model call
+
+        Args:
+            model_identity (str): Identity of the model and its parameters
+            namespace (str): Identity of the plan that rendered the messages
+            messages (list): Rendered prompt messages
+
+        Returns:
+            str: Hex digest identifying the call
+        """
+        payload = json.dumps(
+            [
+                model_identity,
+                namespace,
+                [(message.type, message.content) for message in messages],
+            ],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Get a cached response
+
+        Args:
+            key (str): Cache key of the call
+
+        Returns:
+            str: The cached response, or None on a miss or expired entry
+        """
+        now = self.clock()
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row and self.ttl is not None and now - row[1] > self.ttl:
+                connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.evictions += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+
+            connection.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, response: str):
+        """
+        Store a response and evict entries beyond the configured limits
+
+        Args:
+            key (str): Cache key of the call
+            response (str): Raw model response
+        """
+        now = self.clock()
+        with self._lock:
+            connection = self._connect()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.execute(
+                    "INSERT OR REPLACE INTO responses "
+                    "(key, response, size, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, response, len(response.encode("utf-8")), now, now),
+                )
+                self._evict(connection, now)
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+
+    def _evict(self, connection, now: float):
+        """
+        Delete expired entries and least recently used entries beyond the limits
+
+        Args:
+            connection (sqlite3.Connection): Connection inside a write transaction
+            now (float): Current time in seconds
+        """
+        if self.ttl is not None:
+            deleted = connection.execute(
+                "DELETE FROM responses WHERE created_at < ?", (now - self.ttl,)
+            )
+            self.evictions += deleted.rowcount
+        if self.max_entries is not None:
+            deleted = connection.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed_at DESC "
+                "LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self.evictions += deleted.rowcount
+        if self.max_bytes is not None:
+            total = connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()[0]
+            rows = connection.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at ASC"
+            ).fetchall()
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                total -= size
+                self.evictions += 1
+
+    async def aget(self, key: str) -> Optional[str]:
+        """
+        Async version of get that keeps disk access off the event loop
+
+        Args:
+            key (str): Cache key of the call
+
+        Returns:
+            str: The cached response, or None on a miss or expired entry
+        """
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, response: str):
+        """
+        Async version of set that keeps disk access off the event loop
+
+        Args:
+            key (str): Cache key of the call
+            response (str): Raw model response
+        """
+        await asyncio.to_thread(self.set, key, response)
+
+    def get_stats(self) -> dict:
+        """
+        Returns cache counters of this process and the size of the shared cache
+
+        Returns:
+            dict: Hits, misses, evictions, entries and bytes
+        """
+        with self._lock:
+            entries, size = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size,
+        }
+
+
+def get_model_identity(model) -> str:
+    """
+    Describe a model and its parameters for cache keys
+
+    Args:
+        model: LangChain model instance
+
+    Returns:
+        str: Class name and identifying parameters of the model
+    """
+    params = getattr(model, "_identifying_params", {}) or {}
+    return json.dumps([type(model).__name__, params], sort_keys=True, default=str)
+
+
+def invoke_cached(
+    cache,
+    model,
+    prompts,
+    parser,
+    args: dict,
+    namespace: str,
+    worker_pool=None,
+    repair_prompts=None,
+    model_identity: Optional[str] = None,
+    model_name: str = "default",
+):
+    """
+    Render a prompt, run the model and parse its response as separate stages,
+    through the response cache if one is given. The time of each stage and the
+    tokens are added to the record of the current model call.
+
+    Only responses that parse successfully are stored. With a worker pool, the
+    prompt is rendered and the response parsed by the plan compiled in a worker
+    process. If the response does not parse and repair prompts are given, the
+    model is asked once to correct its answer, and the corrected answer is
+    stored in place of the original one.
+
+    Args:
+        cache (ResponseCache, optional): The response cache
+        model: LangChain model instance
+        prompts (ChatPromptTemplate): Prompt to render
+        parser (Runnable): Parser of the model output
+        args (dict): Prompt variables
+        namespace (str): Identity of the plan that rendered the prompt
+        worker_pool (WorkerPool, optional): Pool rendering and parsing the plan
+        repair_prompts (ChatPromptTemplate, optional): Prompt asking the model
+            to correct an answer that could not be parsed
+        model_identity (str, optional): Identity of the model in cache keys, for
+            models wrapped in a runnable that hides their parameters
+        model_name (str): Alias of the model in the per-model metrics
+
+    Returns:
+        The parsed result
+    """
+    record = get_call_record()
+    started_at = time.perf_counter()
+    if worker_pool:
+        messages = worker_pool.render(namespace, args)
+    else:
+        messages = prompts.format_messages(**args)
+    rendered_at = time.perf_counter()
+    record.render_time += rendered_at - started_at
+
+    key = response = None
+    if cache:
+        key = cache.make_key(
+            model_identity or get_model_identity(model), namespace, messages
+        )
+        response = cache.get(key)
+    if response is not None:
+        message = AIMessage(content=response)
+    else:
+        message = model.invoke(messages)
+    model_time = time.perf_counter() - rendered_at
+    record.model_time += model_time
+    record.record_response(messages, message, cached=response is not None)
+    if response is None:
+        record.record_model(model_name, model_time)
+
+    try:
+        result = _parse_response(parser, namespace, message, worker_pool)
+    except ValueError as error:
+        if repair_prompts is None:
+            raise
+        repair_messages = _render_repair(repair_prompts, message, error)
+        requested_at = time.perf_counter()
+        message = model.invoke(repair_messages)
+        model_time = time.perf_counter() - requested_at
+        record.model_time += model_time
+        record.record_response(repair_messages, message, cached=False)
+        record.record_model(model_name, model_time)
+        result = _parse_response(parser, namespace, message, worker_pool)
+        response = None
+    if cache and response is None and isinstance(message.content, str):
+        cache.set(key, message.content)
+    return result
+
+
+async def ainvoke_cached(
+    cache,
+    model,
+    prompts,
+    parser,
+    args: dict,
+    namespace: str,
+    worker_pool=None,
+    repair_prompts=None,
+    model_identity: Optional[str] = None,
+    model_name: str = "default",
+):
+    """
+    Async version of invoke_cached
+
+    Args:
+        cache (ResponseCache, optional): The response cache
+        model: LangChain model instance
+        prompts (ChatPromptTemplate): Prompt to render
+        parser (Runnable): Parser of the model output
+        args (dict): Prompt variables
+        namespace (str): Identity of the plan that rendered the prompt
+        worker_pool (WorkerPool, optional): Pool rendering and parsing the plan
+        repair_prompts (ChatPromptTemplate, optional): Prompt asking the model
+            to correct an answer that could not be parsed
+        model_identity (str, optional): Identity of the model in cache keys, for
+            models wrapped in a runnable that hides their parameters
+        model_name (str): Alias of the model in the per-model metrics
+
+    Returns:
+        The parsed result
+    """
+    record = get_call_record()
+    started_at = time.perf_counter()
+    if worker_pool:
+        messages = await worker_pool.arender(namespace, args)
+    else:
+        messages = prompts.format_messages(**args)
+    rendered_at = time.perf_counter()
+    record.render_time += rendered_at - started_at
+
+    key = response = None
+    if cache:
+        key = cache.make_key(
+            model_identity or get_model_identity(model), namespace, messages
+        )
+        response = await cache.aget(key)
+    if response is not None:
+        message = AIMessage(content=response)
+    elif get_partial_listener() is not None:
+        message = await _astream_partial(model, messages, get_partial_listener())
+    else:
+        message = await model.ainvoke(messages)
+    model_time = time.perf_counter() - rendered_at
+    record.model_time += model_time
+    record.record_response(messages, message, cached=response is not None)
+    if response is None:
+        record.record_model(model_name, model_time)
+
+    try:
+        result = await _aparse_response(parser, namespace, message, worker_pool)
+    except ValueError as error:
+        if repair_prompts is None:
+            raise
+        repair_messages = _render_repair(repair_prompts, message, error)
+        requested_at = time.perf_counter()
+        message = await model.ainvoke(repair_messages)
+        model_time = time.perf_counter() - requested_at
+        record.model_time += model_time
+        record.record_response(repair_messages, message, cached=False)
+        record.record_model(model_name, model_time)
+        result = await _aparse_response(parser, namespace, message, worker_pool)
+        response = None
+    if cache and response is None and isinstance(message.content, str):
+        await cache.aset(key, message.content)
+    return result
+
+
+def _render_repair(repair_prompts, message, error: Exception) -> list:
+    """
+    Render the prompt asking the model to correct an answer, counting the re-ask
+    on the record of the current model call
+    """
+    get_call_record().reasks += 1
+    return repair_prompts.format_messages(
+        output=str(message.content), error=str(error)[:500]
+    )
+
+
+def _parse_response(parser, namespace: str, message, worker_pool=None):
+    """
+    Parse a model response, in a worker process if a pool is given, timing the
+    parse on the record of the current model call
+    """
+    parsed_at = time.perf_counter()
+    try:
+        if worker_pool and isinstance(message.content, str):
+            return worker_pool.parse(namespace, message.content)
+        return parser.invoke(message)
+    finally:
+        get_call_record().parse_time += time.perf_counter() - parsed_at
+
+
+async def _aparse_response(parser, namespace: str, message, worker_pool=None):
+    """
+    Async version of _parse_response
+    """
+    parsed_at = time.perf_counter()
+    try:
+        if worker_pool and isinstance(message.content, str):
+            return await worker_pool.aparse(namespace, message.content)
+        # Parsers are CPU-bound, so the synchronous version avoids a thread hop
+        return parser.invoke(message)
+    finally:
+        get_call_record().parse_time += time.perf_counter() - parsed_at
+
+
+async def _astream_partial(model, messages, listener: Callable):
+    """
+    Stream a model response, passing each new partially parsed value to a listener
+
+    Args:
+        model: LangChain model instance
+        messages (list): Rendered prompt messages
+        listener (Callable): Function called with each new partial value
+
+    Returns:
+        AIMessageChunk: The complete response
+    """
+    message = None
+    last = None
+    async for chunk in model.astream(messages):
+        message = chunk if message is None else message + chunk
+        if isinstance(message.content, str):
+            partial = parse_partial(message.content)
+            if partial is not None and partial != last:
+                last = partial
+                listener(partial)
+    return message if message is not None else AIMessage(content="")
@@ -0,0 +1,118 @@
+"""Module for per-document token budgets of model calls."""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+
+SKIPPED_REASON = "token_budget"
+
+_current_budget: ContextVar = ContextVar("current_budget", default=None)
+
+
+class TokenBudget:
+    """
+    Estimated prompt tokens a document may spend. Data fields reserve their
+    estimate before they start and are skipped when it does not fit the
+    remaining budget; classifiers gate other work and are always charged.
+    """
+
+    def __init__(self, tokens: int):
+        """
+        Initialize TokenBudget
+
+        Args:
+            tokens (int): Estimated prompt tokens the document may spend
+
+        Raises:
+            ValueError: If tokens is not positive
+        """
+        if tokens <= 0:
+            raise ValueError("token_budget must be positive")
+        self.tokens = tokens
+        self.spent = 0
+        self.skipped = []  # Keys of the data fields skipped for the budget
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.tokens - self.spent)
+
+    def reserve(self, tokens: int) -> bool:
+        """
+        Reserve tokens if they fit the remaining budget
+
+        Args:
+            tokens (int): Estimated prompt tokens of the work
+
+        Returns:
+            bool: Whether the tokens were reserved
+        """
+        if self.spent + tokens > self.tokens:
+            return False
+        self.spent += tokens
+        return True
+
+    def charge(self, tokens: int):
+        """
+        Charge tokens of work that runs regardless of the budget
+
+        Args:
+            tokens (int): Estimated prompt tokens of the work
+        """
+        self.spent += tokens
+
+    def skip(self, key: str, tokens: int) -> dict:
+        """
+        Record a data field skipped for the budget
+
+        Args:
+            key (str): Key of the data field
+            tokens (int): Estimated prompt tokens the field needed
+
+        Returns:
+            dict: The marker returned as the result of the field
+        """
+        if key not in self.skipped:
+            self.skipped.append(key)
+        return {"skipped": {"reason": SKIPPED_REASON, "estimated_tokens": tokens}}
+
+    def get_report(self) -> dict:
+        """
+        Returns the budget, the estimated tokens spent and the skipped fields
+        """
+        return {
+            "tokens": self.tokens,
+            "spent": self.spent,
+            "skipped": list(self.skipped),
+        }
+
+
+@contextmanager
+def limit_tokens(tokens: Optional[int]):
+    """
+    Apply a token budget to the data fields and classifiers executed within the
+    block
+
+    Args:
+        tokens (int, optional): Estimated prompt tokens the document may spend,
+            unlimited if None
+
+    Yields:
+        TokenBudget: The budget, or None if unlimited
+    """
+    if tokens is None:
+        yield None
+        return
+    budget = TokenBudget(tokens)
+    token = _current_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _current_budget.reset(token)
+
+
+def get_token_budget() -> Optional[TokenBudget]:
+    """
+    Returns the token budget of the current context, if any
+    """
+    return _current_budget.get()
@@ -0,0 +1,357 @@
+"""Module for reusing field results of near-duplicate content."""
+
+import copy
+import hashlib
+import json
+import re
+import threading
+import zlib
+from collections import OrderedDict, deque
+from dataclasses import dataclass, fields
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+
+_WORD = re.compile(r"\w+")
+
+SIMILARITY_BINS = np.linspace(0.0, 1.0, 11)  # Histogram bins of the report
+
+
+class HashingEmbedder:
+    """
+    CPU-only embedding of content as a signed hashing vector of its word
+    unigrams and bigrams with sublinear term frequencies. Near-identical texts,
+    e.g. recurring stand-ups, have a cosine similarity close to 1.
+    """
+
+    def __init__(self, dimensions: int = 2048, ngrams: int = 2):
+        """
+        Initialize HashingEmbedder
+
+        Args:
+            dimensions (int): Size of the embedding
+            ngrams (int): Longest word n-gram hashed into the embedding
+
+        Raises:
+            ValueError: If dimensions or ngrams is not positive
+        """
+        if dimensions <= 0 or ngrams <= 0:
+            raise ValueError("dimensions and ngrams must be positive")
+        self.dimensions = dimensions
+        self.ngrams = ngrams
+
+    def __call__(self, content: str) -> np.ndarray:
+        words = _WORD.findall(content.lower())
+        counts = {}
+        for size in range(1, self.ngrams + 1):
+            for start in range(len(words) - size + 1):
+                feature = " ".join(words[start : start + size])
+                counts[feature] = counts.get(feature, 0) + 1
+
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature, count in counts.items():
+            digest = zlib.crc32(feature.encode("utf-8"))
+            sign = 1.0 if digest & 0x80000000 else -1.0
+            vector[digest % self.dimensions] += sign * (1.0 + np.log(count))
+        return vector
+
+
+class SemanticMatch(NamedTuple):
+    """Result reused from similar content, with the similarity of the content"""
+
+    result: Any
+    similarity: float
+
+
+class ANNIndex:
+    """
+    Approximate nearest-neighbor index of unit vectors using random hyperplane
+    locality-sensitive hashing. Vectors sharing a bucket in any table are
+    candidates, ranked by exact cosine similarity. The oldest vectors are
+    evicted beyond max_entries.
+    """
+
+    def __init__(
+        self,
+        dimensions: int,
+        tables: int = 8,
+        bits: int = 8,
+        max_entries: int = 10000,
+        seed: int = 0,
+    ):
+        """
+        Initialize ANNIndex
+
+        Args:
+            dimensions (int): Size of the indexed vectors
+            tables (int): Number of hash tables; more tables find more neighbors
+            bits (int): Hyperplanes per table; more bits make buckets smaller
+            max_entries (int): Maximum number of indexed vectors
+            seed (int): Seed of the random hyperplanes
+        """
+        self.dimensions = dimensions
+        self.tables = tables
+        self.bits = bits
+        self.max_entries = max_entries
+        self.planes = np.random.default_rng(seed).standard_normal(
+            (tables * bits, dimensions)
+        ).astype(np.float32)
+        self.powers = 1 << np.arange(bits)
+        self.buckets = [{} for _ in range(tables)]
+        self.entries = OrderedDict()  # Vector, value and buckets by entry id
+        self._next_id = 0
+
+    def _signatures(self, vector: np.ndarray) -> List[int]:
+        bits = (self.planes @ vector > 0).reshape(self.tables, self.bits)
+        return [int(signature) for signature in bits @ self.powers]
+
+    def add(self, vector: np.ndarray, value: Any):
+        """
+        Index a vector
+
+        Args:
+            vector (np.ndarray): Unit vector
+            value: Value returned with the vector by search
+        """
+        signatures = self._signatures(vector)
+        entry_id = self._next_id
+        self._next_id += 1
+        self.entries[entry_id] = (vector, value, signatures)
+        for table, signature in zip(self.buckets, signatures):
+            table.setdefault(signature, []).append(entry_id)
+
+        while len(self.entries) > self.max_entries:
+            evicted_id, (_, _, evicted) = self.entries.popitem(last=False)
+            for table, signature in zip(self.buckets, evicted):
+                bucket = table[signature]
+                bucket.remove(evicted_id)
+                if not bucket:
+                    del table[signature]
+
+    def search(self, vector: np.ndarray):
+        """
+        Find the most similar indexed vector among the candidates of a vector
+
+        Args:
+            vector (np.ndarray): Unit vector
+
+        Returns:
+            tuple: Cosine similarity and value of the nearest candidate, or
+                (0.0, None) if no indexed vector shares a bucket
+        """
+        candidates = set()
+        for table, signature in zip(self.buckets, self._signatures(vector)):
+            candidates.update(table.get(signature, ()))
+        best = (0.0, None)
+        for entry_id in candidates:
+            indexed, value, _ = self.entries[entry_id]
+            similarity = float(indexed @ vector)
+            if similarity > best[0]:
+                best = (similarity, value)
+        return best
+
+
+@dataclass(frozen=True)
+class SemanticCacheConfig:
+    """
+    Semantic cache settings of a data field, from its "semantic_cache"
+    configuration. Results are reused for content at least threshold similar
+    to content the field was already extracted from.
+    """
+
+    threshold: float = 0.95
+    scope: str = ""  # Digest of the field configuration the results belong to
+
+    @classmethod
+    def from_config(cls, key: str, config: dict, field_config: dict):
+        """
+        Build the semantic cache settings of a data field
+
+        Args:
+            key (str): Key of the data field
+            config (dict): The "semantic_cache" configuration of the data field
+            field_config (dict): Configuration of the data field
+
+        Returns:
+            SemanticCacheConfig: The validated settings
+
+        Raises:
+            ValueError: If the configuration is not an object or has unknown keys
+            ValueError: If the threshold is not a number in (0, 1]
+        """
+        if not isinstance(config, dict):
+            raise ValueError(f"Semantic cache for key '{key}' must be an object")
+        for name in config:
+            if name == "scope" or name not in {setting.name for setting in fields(cls)}:
+                raise ValueError(
+                    f"Unknown semantic cache setting '{name}' for key '{key}'"
+                )
+        scope = hashlib.sha256(
+            json.dumps([key, field_config], sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        semantic_cache = cls(**config, scope=scope)
+        threshold = semantic_cache.threshold
+        if (
+            not isinstance(threshold, (int, float))
+            or isinstance(threshold, bool)
+            or not 0 < threshold <= 1
+        ):
+            raise ValueError(
+                f"Semantic cache threshold for key '{key}' must be in (0, 1]"
+            )
+        return semantic_cache
+
+
+class SemanticCache:
+    """
+    In-memory cache of data field results looked up by content similarity, for
+    fields that opt in with "semantic_cache" in their configuration. Every
+    field has its own approximate nearest-neighbor index of content
+    embeddings, so a result is only reused by the field that produced it.
+
+    One cache can be shared by engines and documents; the similarity of every
+    lookup is kept to report the hit rate and similarity distribution.
+    """
+
+    def __init__(
+        self,
+        embedder: Optional[Callable[[str], np.ndarray]] = None,
+        max_entries: int = 10000,
+        tables: int = 8,
+        bits: int = 8,
+        seed: int = 0,
+    ):
+        """
+        Initialize SemanticCache
+
+        Args:
+            embedder (Callable, optional): Function returning the embedding of a
+                content as a 1-D array, a HashingEmbedder by default
+            max_entries (int): Maximum number of results kept per field
+            tables (int): Hash tables of the nearest-neighbor index
+            bits (int): Hyperplanes per hash table
+            seed (int): Seed of the nearest-neighbor index
+        """
+        self.embedder = embedder or HashingEmbedder()
+        self.max_entries = max_entries
+        self.tables = tables
+        self.bits = bits
+        self.seed = seed
+        self.indexes: Dict[str, ANNIndex] = {}
+        self.lookups = 0
+        self.hits = 0
+        self.similarities = deque(maxlen=10000)  # Best similarity of recent lookups
+        self._embeddings = OrderedDict()  # Recent embeddings by content digest
+        self._lock = threading.Lock()
+
+    def embed(self, content: str) -> np.ndarray:
+        """
+        Embed a content as a unit vector. Recent embeddings are reused, so
+        fields of one document embed their content once.
+
+        Args:
+            content (str): The content
+
+        Returns:
+            np.ndarray: The normalized embedding
+        """
+        digest = hashlib.sha256(content.encode("utf-8")).digest()
+        with self._lock:
+            vector = self._embeddings.get(digest)
+            if vector is not None:
+                self._embeddings.move_to_end(digest)
+                return vector
+
+        vector = np.asarray(self.embedder(content), dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        if norm:
+            vector = vector / norm
+        with self._lock:
+            self._embeddings[digest] = vector
+            while len(self._embeddings) > 256:
+                self._embeddings.popitem(last=False)
+        return vector
+
+    def lookup(self, scope: str, content: str, threshold: float):
+        """
+        Find the result of the most similar content a field was extracted from
+
+        Args:
+            scope (str): Scope of the field, from its SemanticCacheConfig
+            content (str): The content sent to the field
+            threshold (float): Minimum cosine similarity of a reused result
+
+        Returns:
+            SemanticMatch: A copy of the result and its similarity, or None if
+                no content is similar enough
+        """
+        vector = self.embed(content)
+        with self._lock:
+            index = self.indexes.get(scope)
+            similarity, result = index.search(vector) if index else (0.0, None)
+            self.lookups += 1
+            self.similarities.append(similarity)
+            if similarity < threshold:
+                return None
+            self.hits += 1
+        return SemanticMatch(copy.deepcopy(result), similarity)
+
+    def add(self, scope: str, content: str, result):
+        """
+        Store the result a field extracted from a content
+
+        Args:
+            scope (str): Scope of the field, from its SemanticCacheConfig
+            content (str): The content sent to the field
+            result: The result of the field
+        """
+        vector = self.embed(content)
+        with self._lock:
+            index = self.indexes.get(scope)
+            if index is None:
+                index = ANNIndex(
+                    len(vector),
+                    tables=self.tables,
+                    bits=self.bits,
+                    max_entries=self.max_entries,
+                    seed=self.seed,
+                )
+                self.indexes[scope] = index
+            index.add(vector, copy.deepcopy(result))
+
+    def get_stats(self) -> dict:
+        """
+        Returns the hit rate and the distribution of lookup similarities
+
+        Returns:
+            dict: Lookups, hits, hit rate, cached results, similarity
+                percentiles and a histogram of the best similarity of recent
+                lookups (0.0 when no cached content shared a bucket)
+        """
+        with self._lock:
+            similarities = np.array(self.similarities, dtype=np.float64)
+            stats = {
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+                "entries": sum(len(index.entries) for index in self.indexes.values()),
+            }
+        if len(similarities):
+            p50, p90, p99 = np.percentile(similarities, [50, 90, 99])
+            stats["similarity"] = {
+                "p50": float(p50),
+                "p90": float(p90),
+                "p99": float(p99),
+                "max": float(similarities.max()),
+            }
+        else:
+            stats["similarity"] = {}
+        counts, _ = np.histogram(np.clip(similarities, 0, 1), bins=SIMILARITY_BINS)
+        stats["histogram"] = {
+            f"{low:.1f}-{high:.1f}": int(count)
+            for low, high, count in zip(
+                SIMILARITY_BINS[:-1], SIMILARITY_BINS[1:], counts
+            )
+        }
+        return stats
@@ -0,0 +1,145 @@
+"""Module for processing a stream of documents across several processes."""
+
+import asyncio
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from typing import Callable, Iterable, Optional, Union
+
+from .ai_text_structor import AITextStructor
+from .response_cache import ResponseCache
+
+
+_shard_engine = None  # Engine built once in each shard process
+
+
+def _initialize_shard(engine_config, model_factory, cache_path, engine_options):
+    """
+    Build the engine of a shard process, sharing the persistent response cache
+
+    Args:
+        engine_config (dict): Configuration containing data and workflow definitions
+        model_factory (Callable): Picklable function returning the model
+        cache_path (str, optional): Path of the shared response cache database
+        engine_options (dict): Further AITextStructor arguments
+    """
+    global _shard_engine
+    response_cache = ResponseCache(cache_path) if cache_path else None
+    _shard_engine = AITextStructor(
+        engine_config, model_factory(), response_cache=response_cache, **engine_options
+    )
+
+
+def _process_shard(documents, max_concurrency):
+    """
+    Process a shard of documents with the engine of the current process
+
+    Args:
+        documents (list): (document_id, content) tuples
+        max_concurrency (int): Maximum number of model calls in flight
+
+    Returns:
+        list: (document_id, result) tuples
+    """
+    results = asyncio.run(_shard_engine.execute_many(documents, max_concurrency))
+    return [
+        (document_id, result) for (document_id, _), result in zip(documents, results)
+    ]
+
+
+def iter_sharded(
+    engine_config: dict,
+    model_factory: Callable,
+    contents: Iterable[Union[str, tuple]],
+    processes: Optional[int] = None,
+    shard_size: int = 8,
+    max_concurrency: int = 8,
+    cache_path: Optional[str] = None,
+    engine_options: Optional[dict] = None,
+):
+    """
+    Process documents across processes and yield results as shards complete.
+
+    Documents are read lazily and grouped into shards of shard_size. Each process
+    builds its engine and model once and processes one shard at a time with
+    execute_many, and at most two shards per process are pending, so memory
+    stays flat regardless of input size. Processes share the response cache
+    database at cache_path.
+
+    Args:
+        engine_config (dict): Configuration containing data and workflow definitions
+        model_factory (Callable): Picklable function returning the LangChain model
+            of a process
+        contents (Iterable[Union[str, tuple]]): Documents to process, either
+            content strings or (document_id, content) tuples
+        processes (int, optional): Number of processes, the number of CPUs by default
+        shard_size (int): Number of documents sent to a process at once
+        max_concurrency (int): Maximum number of model calls in flight per process
+        cache_path (str, optional): Path of a response cache shared by all processes
+        engine_options (dict, optional): Further AITextStructor arguments
+
+    Yields:
+        tuple: Document ID (the input index for plain strings) and its results
+    """
+    if shard_size < 1:
+        raise ValueError("shard_size must be at least 1")
+
+    processes = processes or os.cpu_count() or 1
+    documents = (
+        item if isinstance(item, tuple) else (index, item)
+        for index, item in enumerate(contents)
+    )
+    with ProcessPoolExecutor(
+        max_workers=processes,
+        initializer=_initialize_shard,
+        initargs=(engine_config, model_factory, cache_path, engine_options or {}),
+    ) as executor:
+        max_pending = 2 * processes
+        pending = set()
+
+        def submit_next():
+            shard = list(islice(documents, shard_size))
+            if shard:
+                pending.add(executor.submit(_process_shard, shard, max_concurrency))
+            return bool(shard)
+
+        try:
+            while len(pending) < max_pending and submit_next():
+                pass
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    submit_next()
+                    yield from future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def run_sharded(
+    engine_config: dict,
+    model_factory: Callable,
+    contents: Iterable[Union[str, tuple]],
+    **kwargs,
+):
+    """
+    Process documents across processes
+
+    Args:
+        engine_config (dict): Configuration containing data and workflow definitions
+        model_factory (Callable): Picklable function returning the LangChain model
+            of a process
+        contents (Iterable[Union[str, tuple]]): Documents to process, either
+            content strings or (document_id, content) tuples
+        **kwargs: Arguments of iter_sharded
+
+    Returns:
+        list: Results of processing, in input order
+    """
+    contents = list(contents)
+    results = dict(iter_sharded(engine_config, model_factory, contents, **kwargs))
+    return [
+        results[item[0] if isinstance(item, tuple) else index]
+        for index, item in enumerate(contents)
+    ]
@@ -0,0 +1,103 @@
+"""Module for streaming execution events while a document is processed."""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from langchain_core.utils.json import parse_partial_json
+
+
+FIELD_EVENT = "field"  # A data field completed
+PARTIAL_EVENT = "partial"  # A data field's answer parsed so far
+CLASSIFIED_EVENT = "classified"  # A classifier chose an explain workflow
+BRANCH_EVENT = "branch"  # The data of a chosen explain workflow started
+ERROR_EVENT = "error"  # A data field or classifier failed
+SKIPPED_EVENT = "skipped"  # A data field was skipped for the token budget
+COMPLETED_EVENT = "completed"  # The final results and titles
+
+_current_emitter: ContextVar = ContextVar("current_emitter", default=None)
+_current_partial: ContextVar = ContextVar("current_partial", default=False)
+_current_partial_listener: ContextVar = ContextVar(
+    "current_partial_listener", default=None
+)
+
+
+@contextmanager
+def emit_events(emitter: Callable, partial: bool = False):
+    """
+    Send the events of executions started within the block to an emitter
+
+    Args:
+        emitter (Callable): Function called with every event
+        partial (bool): Also emit partial values of object and list fields
+    """
+    token = _current_emitter.set(emitter)
+    partial_token = _current_partial.set(partial)
+    try:
+        yield
+    finally:
+        _current_partial.reset(partial_token)
+        _current_emitter.reset(token)
+
+
+def emit_event(event_type: str, **fields):
+    """
+    Emit an event to the emitter of the current context, if any
+
+    Args:
+        event_type (str): Type of the event
+        **fields: Fields of the event
+    """
+    emitter = _current_emitter.get()
+    if emitter is not None:
+        emitter({"type": event_type, **fields})
+
+
+def wants_partial() -> bool:
+    """
+    Returns whether the current context emits partial values
+    """
+    return _current_emitter.get() is not None and _current_partial.get()
+
+
+@contextmanager
+def listen_partial(listener: Optional[Callable]):
+    """
+    Stream the model response of calls made within the block and pass each new
+    partially parsed JSON value to a listener
+
+    Args:
+        listener (Callable, optional): Function called with each partial value
+    """
+    token = _current_partial_listener.set(listener)
+    try:
+        yield
+    finally:
+        _current_partial_listener.reset(token)
+
+
+def get_partial_listener() -> Optional[Callable]:
+    """
+    Returns the partial listener of the current context, if any
+    """
+    return _current_partial_listener.get()
+
+
+def parse_partial(text: str):
+    """
+    Parse the JSON received so far, ignoring a leading markdown fence
+
+    Args:
+        text (str): Response text received so far
+
+    Returns:
+        The partially parsed JSON value, or None if nothing parses yet
+    """
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0] if text.rstrip().endswith("```") else text
+    try:
+        return parse_partial_json(text)
+    except ValueError:
+        return None
@@ -0,0 +1,75 @@
+"""Module for running plans through the native structured output of a model."""
+
+import json
+from typing import Optional
+
+from langchain_core.messages import AIMessage
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable, RunnableLambda
+
+
+def build_structured_model(model, model_class: type) -> Optional[Runnable]:
+    """
+    Wrap a model so it answers with an instance of model_class through its native
+    structured output. The wrapped model returns an AIMessage holding the answer
+    as JSON, so it can be cached and parsed like a model answering in text.
+
+    Args:
+        model: LangChain model instance
+        model_class (type): Pydantic model of the answer
+
+    Returns:
+        Runnable: The wrapped model, or None if the model does not support
+            structured output
+    """
+    try:
+        structured = model.with_structured_output(model_class, include_raw=True)
+    except (AttributeError, NotImplementedError):
+        return None
+    return structured | RunnableLambda(_to_message)
+
+
+def build_structured_components(components: dict) -> dict:
+    """
+    Remove the format instructions from completion components, since the answer
+    format is given by the schema of the structured output instead
+
+    Args:
+        components (dict): Prompts, parser, static args and model class
+
+    Returns:
+        dict: The components without format instruction messages and args
+    """
+    prompts = components["prompts"]
+    messages = [
+        message
+        for message in prompts.messages
+        if "format_instructions" not in getattr(message, "input_variables", [])
+    ]
+    args = {
+        key: value
+        for key, value in components["args"].items()
+        if key != "format_instructions"
+    }
+    return {
+        **components,
+        "prompts": ChatPromptTemplate.from_messages(messages),
+        "args": args,
+    }
+
+
+def _to_message(output: dict) -> AIMessage:
+    """
+    Convert the raw and parsed output of a structured model into an AIMessage
+    with the JSON answer. If the answer did not validate, the tool call arguments
+    or the text of the raw answer are returned for the output parser to repair.
+    """
+    raw = output["raw"]
+    parsed = output.get("parsed")
+    if parsed is not None:
+        content = parsed.model_dump_json()
+    elif getattr(raw, "tool_calls", None):
+        content = json.dumps(raw.tool_calls[0]["args"])
+    else:
+        content = str(raw.content)
+    return AIMessage(content=content, usage_metadata=raw.usage_metadata)
@@ -0,0 +1,34 @@
+"""Module for lightweight, provider-independent token estimates."""
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text) -> int:
+    """
+    Estimate the number of tokens of a text without a tokenizer.
+
+    Uses the common approximation of four characters per token, which is close
+    enough for budgeting and scheduling decisions.
+
+    Args:
+        text (str): The text to estimate
+
+    Returns:
+        int: Estimated number of tokens
+    """
+    if not text:
+        return 0
+    return -(-len(str(text)) // CHARS_PER_TOKEN)
+
+
+def is_token_count(value) -> bool:
+    """
+    Returns whether a configured setting is a whole number of tokens
+
+    Args:
+        value: The setting
+
+    Returns:
+        bool: True for integers, False for floats, strings and booleans
+    """
+    return isinstance(value, int) and not isinstance(value, bool)
@@ -0,0 +1,373 @@
+"""Module for tracing spans and per-call metrics of document processing."""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from .tokens import estimate_tokens
+
+
+DOCUMENT_SPAN = "document"
+WORKFLOW_SPAN = "workflow"
+FIELD_SPAN = "field"
+CLASSIFY_SPAN = "classify"
+BATCH_SPAN = "batch"
+CALL_SPAN = "call"
+
+# Call metrics are grouped by the kind of span issuing the call
+CALL_GROUPS = {
+    FIELD_SPAN: "fields",
+    CLASSIFY_SPAN: "classifiers",
+    BATCH_SPAN: "batches",
+}
+
+_current_span: ContextVar = ContextVar("current_span", default=None)
+_current_call: ContextVar = ContextVar("current_call", default=None)
+_current_collector: ContextVar = ContextVar("current_collector", default=None)
+
+
+@dataclass
+class CallRecord:
+    """
+    Timings, tokens and cache hits of one model call across all its attempts
+    """
+
+    attempts: int = 0
+    cache_hits: int = 0
+    repairs: int = 0  # Outputs that only parsed after local repair
+    reasks: int = 0  # Repair prompts sent after local repair failed
+    queue_time: float = 0.0  # Waiting on the rate limiter and concurrency limit
+    render_time: float = 0.0
+    model_time: float = 0.0
+    parse_time: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    escalations: int = 0  # Answers that failed and went to the next model
+    models: Dict[str, dict] = field(default_factory=dict)  # Metrics by model alias
+
+    def record_response(self, messages, message, cached: bool):
+        """
+        Count the tokens of a response, as reported by the model when available
+
+        Args:
+            messages (list): Rendered prompt messages
+            message (BaseMessage): Model response
+            cached (bool): Whether the response came from the response cache
+        """
+        usage = getattr(message, "usage_metadata", None)
+        if usage and not cached:
+            self.prompt_tokens += usage.get("input_tokens", 0)
+            self.completion_tokens += usage.get("output_tokens", 0)
+        else:
+            self.prompt_tokens += sum(
+                estimate_tokens(str(prompt.content)) for prompt in messages
+            )
+            self.completion_tokens += estimate_tokens(str(message.content))
+        if cached:
+            self.cache_hits += 1
+
+    def record_model(self, alias: str, model_time: float):
+        """
+        Count a request sent to a model
+
+        Args:
+            alias (str): Alias of the model
+            model_time (float): Seconds the model took to answer
+        """
+        metrics = self.models.setdefault(alias, _empty_model_metrics())
+        metrics["calls"] += 1
+        metrics["model_time"] += model_time
+
+    def record_escalation(self, alias: str):
+        """
+        Count an answer of a model that failed and went to the next model of
+        its cascade
+
+        Args:
+            alias (str): Alias of the model that failed
+        """
+        self.escalations += 1
+        self.models.setdefault(alias, _empty_model_metrics())["escalations"] += 1
+
+    def as_attributes(self) -> dict:
+        """
+        Returns the record as span attributes
+        """
+        return {
+            "attempts": self.attempts,
+            "retries": max(0, self.attempts - 1),
+            "cache_hits": self.cache_hits,
+            "repairs": self.repairs,
+            "reasks": self.reasks,
+            "queue_time": self.queue_time,
+            "render_time": self.render_time,
+            "model_time": self.model_time,
+            "parse_time": self.parse_time,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "escalations": self.escalations,
+            "models": {alias: dict(metrics) for alias, metrics in self.models.items()},
+        }
+
+
+@dataclass
+class Span:
+    """
+    A timed unit of document processing: a document, workflow, data field,
+    classifier, batch or model call
+    """
+
+    kind: str
+    name: str
+    start_time: float
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    parent: Optional["Span"] = None
+    end_time: Optional[float] = None
+    handle: Any = None  # OpenTelemetry span mirroring this span
+
+    @property
+    def duration(self) -> float:
+        return (self.end_time or time.perf_counter()) - self.start_time
+
+
+class Tracer:
+    """
+    Receives every finished span and forwards it to callbacks and, optionally,
+    to an OpenTelemetry tracer (opentelemetry-api must be installed to use it)
+    """
+
+    def __init__(
+        self,
+        callbacks: Optional[Iterable[Callable]] = None,
+        otel_tracer: Any = None,
+    ):
+        """
+        Initialize Tracer
+
+        Args:
+            callbacks (Iterable[Callable], optional): Functions called with every
+                finished Span
+            otel_tracer (opentelemetry.trace.Tracer, optional): Tracer that receives
+                a span for every Span, nested like the Spans
+        """
+        self.callbacks = list(callbacks or [])
+        self.otel_tracer = otel_tracer
+
+    def start_span(self, span: Span):
+        """
+        Start the OpenTelemetry span mirroring a span
+
+        Args:
+            span (Span): The started span
+        """
+        if self.otel_tracer is None:
+            return
+        from opentelemetry import trace
+
+        context = None
+        if span.parent is not None and span.parent.handle is not None:
+            context = trace.set_span_in_context(span.parent.handle)
+        span.handle = self.otel_tracer.start_span(
+            f"{span.kind} {span.name}",
+            context=context,
+            attributes={"ai_text_structor.kind": span.kind},
+        )
+
+    def end_span(self, span: Span):
+        """
+        Forward a finished span to the callbacks and OpenTelemetry
+
+        Args:
+            span (Span): The finished span
+        """
+        if span.handle is not None:
+            span.handle.set_attributes(
+                {
+                    f"ai_text_structor.{key}": value
+                    for key, value in span.attributes.items()
+                    if isinstance(value, (str, bool, int, float))
+                }
+            )
+            span.handle.end()
+        for callback in self.callbacks:
+            callback(span)
+
+
+class MetricsCollector:
+    """
+    Aggregates the spans of one document into a metrics dictionary
+    """
+
+    def __init__(self):
+        self.wall_time = 0.0
+        self.workflows = {}
+        self.groups = {group: {} for group in CALL_GROUPS.values()}
+        self.models = {}
+        self.totals = _empty_call_metrics()
+        del self.totals["wall_time"]
+
+    def add_span(self, span: Span):
+        """
+        Aggregate a finished span
+
+        Args:
+            span (Span): The finished span
+        """
+        if span.kind == DOCUMENT_SPAN:
+            self.wall_time = span.duration
+        elif span.kind == WORKFLOW_SPAN:
+            self.workflows[span.name] = {"wall_time": span.duration}
+        elif span.kind in CALL_GROUPS:
+            metrics = self._get_metrics(span.kind, span.name)
+            metrics["wall_time"] += span.duration
+            if "semantic_similarity" in span.attributes:
+                # The result was reused from similar content without a call
+                metrics["semantic_similarity"] = span.attributes["semantic_similarity"]
+        elif span.kind == CALL_SPAN and span.parent is not None:
+            if span.parent.kind not in CALL_GROUPS:
+                return
+            metrics = self._get_metrics(span.parent.kind, span.parent.name)
+            for target in (metrics, self.totals):
+                target["calls"] += 1
+                for key in target:
+                    if key in span.attributes:
+                        target[key] += span.attributes[key]
+            for alias, model_metrics in span.attributes.get("models", {}).items():
+                target = self.models.setdefault(alias, _empty_model_metrics())
+                for key, value in model_metrics.items():
+                    target[key] += value
+
+    def _get_metrics(self, kind: str, name: str) -> dict:
+        return self.groups[CALL_GROUPS[kind]].setdefault(name, _empty_call_metrics())
+
+    def get_metrics(self) -> dict:
+        """
+        Returns the aggregated metrics
+
+        Returns:
+            dict: Document wall time, wall time per workflow, call metrics per
+                data field, classifier and batch with their totals, and requests,
+                model time and escalations per model alias
+        """
+        return {
+            "wall_time": self.wall_time,
+            "workflows": self.workflows,
+            **self.groups,
+            "totals": self.totals,
+            "models": self.models,
+        }
+
+
+def _empty_call_metrics() -> dict:
+    return {
+        "wall_time": 0.0,
+        "calls": 0,
+        "retries": 0,
+        "cache_hits": 0,
+        "repairs": 0,
+        "reasks": 0,
+        "queue_time": 0.0,
+        "render_time": 0.0,
+        "model_time": 0.0,
+        "parse_time": 0.0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "escalations": 0,
+    }
+
+
+def _empty_model_metrics() -> dict:
+    return {"calls": 0, "model_time": 0.0, "escalations": 0}
+
+
+@contextmanager
+def trace_span(tracer: Optional[Tracer], kind: str, name: str, **attributes):
+    """
+    Time a block as a span of the current span. Spans are only created when a
+    tracer is configured or metrics are collected for the current document.
+
+    Args:
+        tracer (Tracer, optional): Tracer receiving the finished span
+        kind (str): Kind of the span
+        name (str): Name of the span, e.g. the data field key
+        **attributes: Attributes of the span
+
+    Yields:
+        Span: The span, or None if nothing records it
+    """
+    collector = _current_collector.get()
+    if tracer is None and collector is None:
+        yield None
+        return
+
+    span = Span(
+        kind=kind,
+        name=name,
+        start_time=time.perf_counter(),
+        attributes=attributes,
+        parent=_current_span.get(),
+    )
+    if tracer is not None:
+        tracer.start_span(span)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as error:
+        span.attributes["error"] = type(error).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end_time = time.perf_counter()
+        if collector is not None:
+            collector.add_span(span)
+        if tracer is not None:
+            tracer.end_span(span)
+
+
+@contextmanager
+def collect_metrics(enabled: bool = True):
+    """
+    Collect metrics of the spans started within the block
+
+    Args:
+        enabled (bool): Whether to collect metrics at all
+
+    Yields:
+        MetricsCollector: The collector, or None if disabled
+    """
+    if not enabled:
+        yield None
+        return
+    collector = MetricsCollector()
+    token = _current_collector.set(collector)
+    try:
+        yield collector
+    finally:
+        _current_collector.reset(token)
+
+
+@contextmanager
+def record_call():
+    """
+    Record the model call made within the block. Attempts of the call started
+    within the block share the record with the staged invocation of the model.
+
+    Yields:
+        CallRecord: The record of the call
+    """
+    record = CallRecord()
+    token = _current_call.set(record)
+    try:
+        yield record
+    finally:
+        _current_call.reset(token)
+
+
+def get_call_record() -> CallRecord:
+    """
+    Returns the record of the model call made in the current context, or a
+    throwaway record outside of instrumented calls
+    """
+    return _current_call.get() or CallRecord()
@@ -0,0 +1,176 @@
+"""Module for offloading prompt rendering and output parsing to worker processes."""
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from .data_executor import DataExecutor
+from .field_plan import STRUCTURED_NAMESPACE
+from .model_routing import collect_model_aliases
+from .tracing import get_call_record, record_call
+
+
+_worker_plans = None  # DataExecutor compiled once in each worker process
+
+
+def _no_model(_):
+    raise RuntimeError("Worker processes only render prompts and parse outputs")
+
+
+def _initialize_worker(data_dict: dict, structured_output: bool, cache_control: bool):
+    """
+    Compile the field plans of the engine once per worker process
+
+    Args:
+        data_dict (dict): Data configuration of the engine
+        structured_output (bool): Whether the engine uses structured output
+        cache_control (bool): Whether the engine marks prompt prefixes
+    """
+    global _worker_plans
+    model = RunnableLambda(_no_model)
+    _worker_plans = DataExecutor(
+        data_dict,
+        model,
+        structured_output=structured_output,
+        cache_control=cache_control,
+        models={alias: model for alias in collect_model_aliases({"data": data_dict})},
+    )
+
+
+def _get_worker_plan(namespace: str):
+    if namespace.startswith(STRUCTURED_NAMESPACE):
+        namespace = namespace[len(STRUCTURED_NAMESPACE) :]
+    data_type, key = namespace.split(":", 1)
+    if data_type == "batch":
+        return _worker_plans.get_batch_plan(key.split(","))
+    return _worker_plans.get_plan(key)
+
+
+def _render(namespace: str, args: dict):
+    plan = _get_worker_plan(namespace)
+    prompts = plan.prompts
+    if namespace.startswith(STRUCTURED_NAMESPACE):
+        prompts = plan.structured_prompts
+    return prompts.format_messages(**args)
+
+
+def _parse(namespace: str, content: str):
+    with record_call() as record:
+        result = _get_worker_plan(namespace).parser.invoke(AIMessage(content=content))
+    return result, record.repairs
+
+
+class WorkerPool:
+    """
+    Process pool rendering prompts and parsing model outputs of data fields, so
+    JSON parsing and pydantic validation do not compete with the event loop.
+
+    Every worker compiles the field plans of the engine once when it starts, so
+    only the prompt arguments and the raw model output cross process boundaries.
+    Model calls stay on the event loop of the engine.
+    """
+
+    def __init__(
+        self,
+        engine_config: dict,
+        max_workers: Optional[int] = None,
+        structured_output: bool = False,
+        cache_control: bool = False,
+    ):
+        """
+        Initialize WorkerPool and start its worker processes
+
+        Args:
+            engine_config (dict): Configuration containing data and workflow
+                definitions, the same the engine is built from
+            max_workers (int, optional): Number of worker processes, the number
+                of CPUs by default
+            structured_output (bool): Whether the engine uses the structured
+                output of its models, so prompts of models that support it are
+                rendered without format instructions
+            cache_control (bool): Whether the engine marks the shared prompt
+                prefix for provider prompt caching
+        """
+        self.data_dict = engine_config["data"]
+        self.structured_output = structured_output
+        self.cache_control = cache_control
+        self.executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_initialize_worker,
+            initargs=(self.data_dict, structured_output, cache_control),
+        )
+
+    def render(self, namespace: str, args: dict):
+        """
+        Render the prompt of a plan in a worker process
+
+        Args:
+            namespace (str): Namespace of the field or batch plan
+            args (dict): Prompt variables
+
+        Returns:
+            list: Rendered prompt messages
+        """
+        return self.executor.submit(_render, namespace, args).result()
+
+    def parse(self, namespace: str, content: str):
+        """
+        Parse a model output with the parser of a plan in a worker process
+
+        Args:
+            namespace (str): Namespace of the field or batch plan
+            content (str): Raw model output
+
+        Returns:
+            The parsed result
+        """
+        result, repairs = self.executor.submit(_parse, namespace, content).result()
+        get_call_record().repairs += repairs
+        return result
+
+    async def arender(self, namespace: str, args: dict):
+        """
+        Async version of render
+
+        Args:
+            namespace (str): Namespace of the field or batch plan
+            args (dict): Prompt variables
+
+        Returns:
+            list: Rendered prompt messages
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, _render, namespace, args)
+
+    async def aparse(self, namespace: str, content: str):
+        """
+        Async version of parse
+
+        Args:
+            namespace (str): Namespace of the field or batch plan
+            content (str): Raw model output
+
+        Returns:
+            The parsed result
+        """
+        loop = asyncio.get_running_loop()
+        result, repairs = await loop.run_in_executor(
+            self.executor, _parse, namespace, content
+        )
+        get_call_record().repairs += repairs
+        return result
+
+    def close(self):
+        """
+        Shut down the worker processes
+        """
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,4 +1,9 @@
-from .process_workflow import process_workflow
+import copy
+
+from .execution_graph import build_execution_graph
+from .model_routing import ModelRegistry, arun_cascade, parse_model_aliases, run_cascade
+from .process_workflow import process_workflow, aprocess_workflow
+from .tokens import estimate_tokens
 
 
 class WorkflowExecutor:
@@ -6,16 +11,30 @@ class WorkflowExecutor:
     Manages the execution and validation of workflows based on their dependencies
     """
 
-    def __init__(self, workflow_dict=None, model=None):
+    def __init__(
+        self,
+        workflow_dict=None,
+        model=None,
+        response_cache=None,
+        cache_control=False,
+        models=None,
+    ):
         """
         Initialize WorkflowExecutor with a workflow dictionary and model
 
         Args:
             workflow_dict (dict): Dictionary containing workflow definitions
             model: The language model to use for execution
+            response_cache (ResponseCache, optional): Persistent cache of model responses
+            cache_control (bool): Mark the shared prompt prefix of classifier
+                prompts for provider prompt caching
+            models (dict, optional): LangChain models by the alias prompt
+                workflows refer to with "model". Classifiers without "model"
+                call model
 
         Raises:
             ValueError: If workflow_dict is None or empty or if model is None
+            ValueError: If a prompt workflow refers to an unregistered model alias
         """
         if not workflow_dict:
             raise ValueError("workflow_dict must be provided and cannot be empty")
@@ -24,13 +43,62 @@ class WorkflowExecutor:
 
         self.workflow_dict = workflow_dict
         self.model = model
+        self.response_cache = response_cache
+        self.cache_control = cache_control
         self.prompt_workflows = {}  # Prompt-based workflows (independent execution steps)
         self.explain_workflows = {}  # Explanation-based workflows (dependent steps)
         self.explain_dependencies = {}  # Mapping of prompt workflows to their explain dependencies
         self.workflow_data = {}  # Mapping of workflows to their data requirements
+        self.execution_graph = None  # Dependency graph of data and classifier nodes
+        self.routes = {}  # ModelRoute of every classifier model by prompt workflow
 
         if self._validate():
             self._initialize()
+            self.execution_graph = build_execution_graph(self)
+            self._resolve_routes(models)
+
+    def bind(self, model, response_cache=None, cache_control=False, models=None):
+        """
+        Create a copy that shares the validated workflows and execution graph
+        but calls another model
+
+        Args:
+            model: The language model to use for execution
+            response_cache (ResponseCache, optional): Persistent cache of model responses
+            cache_control (bool): Mark the shared prompt prefix of classifier
+                prompts for provider prompt caching
+            models (dict, optional): LangChain models by the alias prompt
+                workflows refer to with "model". Classifiers without
+                "model" call model
+
+        Returns:
+            WorkflowExecutor: The bound copy
+
+        Raises:
+            ValueError: If model is None
+            ValueError: If a prompt workflow refers to an unregistered model alias
+        """
+        if not model:
+            raise ValueError("model must be provided")
+        executor = copy.copy(self)
+        executor.model = model
+        executor.response_cache = response_cache
+        executor.cache_control = cache_control
+        executor._resolve_routes(models)
+        return executor
+
+    def _resolve_routes(self, models):
+        """
+        Resolve the models of every classifier against a model registry
+
+        Args:
+            models (dict, optional): LangChain models by alias
+        """
+        registry = ModelRegistry(self.model, models)
+        self.routes = {
+            workflow_id: registry.resolve(workflow_id, config["models"])
+            for workflow_id, config in self.prompt_workflows.items()
+        }
 
     def _validate(self):
         """
@@ -84,6 +152,9 @@ class WorkflowExecutor:
                         f"Data field references in workflow '{workflow_id}' must be strings"
                     )
 
+            # Validate classifier model aliases
+            parse_model_aliases(workflow_id, config)
+
         return True
 
     def _initialize(self):
@@ -101,6 +172,7 @@ class WorkflowExecutor:
                     "requires": config.get("requires", []),
                     "name": config.get("name", workflow_id),
                     "description": config.get("description", ""),
+                    "models": parse_model_aliases(workflow_id, config),
                 }
 
                 # Initialize explain dependencies list
@@ -145,6 +217,44 @@ class WorkflowExecutor:
         """
         return self.explain_dependencies.get(workflow_id, [])
 
+    def get_execution_graph(self):
+        """
+        Returns the compiled dependency graph of the workflows
+
+        Returns:
+            ExecutionGraph: Graph of data field and classifier nodes
+        """
+        return self.execution_graph
+
+    def get_explain_data_likelihoods(self, workflow_id, classification_counts=None):
+        """
+        Estimates, for each data field of the explain workflows of a prompt workflow,
+        the probability that the chosen explain workflow requires it
+
+        Args:
+            workflow_id (str): Prompt workflow ID
+            classification_counts (dict, optional): Times each explain workflow was
+                chosen so far. Without counts all explain workflows are equally likely
+
+        Returns:
+            dict: Probability by data field ID
+        """
+        explain_ids = self.get_explain_dependencies(workflow_id)
+        counts = classification_counts or {}
+        # Add-one smoothing keeps unseen explain workflows possible
+        weights = {
+            explain_id: counts.get(explain_id, 0) + 1 for explain_id in explain_ids
+        }
+        total = sum(weights.values())
+
+        field_weights = {}
+        for explain_id, weight in weights.items():
+            for data_field in self.get_data_requirements(explain_id):
+                field_weights[data_field] = field_weights.get(data_field, 0) + weight
+        return {
+            data_field: weight / total for data_field, weight in field_weights.items()
+        }
+
     def get_data_requirements(self, workflow_id):
         """
         Returns data field requirements for a workflow
@@ -167,6 +277,97 @@ class WorkflowExecutor:
         Returns:
             callable: Function that accepts content and returns the selected workflow path
 
+        Raises:
+            ValueError: If workflow_id is not found or is not a prompt-based workflow
+        """
+        workflow_config, explain_paths = self._get_classifier_config(workflow_id)
+
+        # If there are no explain paths, return a function that returns None
+        # This supports prompt workflows that don't have explain dependencies
+        if not explain_paths:
+            return lambda _: None
+
+        # Return a function that only needs content as an argument
+        def executor(content: str) -> str:
+            return run_cascade(
+                self.routes[workflow_id],
+                lambda route: process_workflow(
+                    model=route.model,
+                    content=content,
+                    workflow_prompt=workflow_config["prompt"],
+                    workflow_paths=explain_paths,
+                    context_data={},  # You might want to add context data handling here
+                    response_cache=self.response_cache,
+                    cache_control=self.cache_control,
+                    model_name=route.alias,
+                ),
+            )
+
+        return executor
+
+    def get_async_workflow_executor_by_id(self, workflow_id: str):
+        """
+        Returns a coroutine function that executes a specific workflow without
+        blocking the event loop
+
+        Args:
+            workflow_id (str): ID of the workflow to execute
+
+        Returns:
+            callable: Coroutine function that accepts content and returns the selected workflow path
+
+        Raises:
+            ValueError: If workflow_id is not found or is not a prompt-based workflow
+        """
+        workflow_config, explain_paths = self._get_classifier_config(workflow_id)
+
+        async def executor(content: str) -> str:
+            if not explain_paths:
+                return None
+            return await arun_cascade(
+                self.routes[workflow_id],
+                lambda route: aprocess_workflow(
+                    model=route.model,
+                    content=content,
+                    workflow_prompt=workflow_config["prompt"],
+                    workflow_paths=explain_paths,
+                    context_data={},
+                    response_cache=self.response_cache,
+                    cache_control=self.cache_control,
+                    model_name=route.alias,
+                ),
+            )
+
+        return executor
+
+    def estimate_tokens(self, workflow_id: str, content: str) -> int:
+        """
+        Estimate the prompt tokens of classifying content for a prompt workflow
+
+        Args:
+            workflow_id (str): ID of the prompt workflow
+            content (str): Content to classify
+
+        Returns:
+            int: Estimated prompt tokens
+        """
+        workflow_config, explain_paths = self._get_classifier_config(workflow_id)
+        return (
+            estimate_tokens(content)
+            + estimate_tokens(workflow_config["prompt"])
+            + sum(estimate_tokens(explain) for explain in explain_paths.values())
+        )
+
+    def _get_classifier_config(self, workflow_id: str):
+        """
+        Returns the prompt workflow configuration and its explain paths
+
+        Args:
+            workflow_id (str): ID of the prompt workflow
+
+        Returns:
+            tuple: Workflow configuration and dictionary of explain paths
+
         Raises:
             ValueError: If workflow_id is not found or is not a prompt-based workflow
         """
@@ -183,23 +384,7 @@ class WorkflowExecutor:
             explain_id: self.explain_workflows[explain_id]["explain"]
             for explain_id in self.explain_dependencies[workflow_id]
         }
-
-        # If there are no explain paths, return a function that returns None
-        # This supports prompt workflows that don't have explain dependencies
-        if not explain_paths:
-            return lambda _: None
-
-        # Return a function that only needs content as an argument
-        def executor(content: str) -> str:
-            return process_workflow(
-                model=self.model,
-                content=content,
-                workflow_prompt=workflow_config["prompt"],
-                workflow_paths=explain_paths,
-                context_data={},  # You might want to add context data handling here
-            )
-
-        return executor
+        return workflow_config, explain_paths
 
     def get_workflow_name(self, workflow_id: str) -> str:
         """
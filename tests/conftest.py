@@ -0,0 +1,115 @@
+import copy
+import functools
+
+import pytest
+
+from ai_text_structor.fake_model import FakeChatModel
+
+
+MEETING_FIELDS = {
+    "summary": {"type": "string", "prompt": "Summarize the content"},
+    "topic": {"type": "string", "prompt": "Name the topic"},
+    "duration": {"type": "numeric", "prompt": "How long was the meeting"},
+    "next_steps": {"type": "list", "prompt": "List the next steps"},
+    "risks": {"type": "list", "prompt": "List the risks"},
+    "owner": {
+        "type": "object",
+        "prompt": "Who owns the project",
+        "attributes": {"name": "Name of the owner", "team": "Team of the owner"},
+    },
+    "metadata": {
+        "type": "object",
+        "prompt": "Extract key meeting information",
+        "attributes": {"meeting_type": "Type of meeting"},
+    },
+}
+
+
+def build_meeting_config(
+    *data_keys, overview=None, classify=None, explain=None, **settings
+):
+    """
+    Build an engine configuration of meeting fields
+
+    Args:
+        *data_keys: Keys of the meeting fields outside of the workflows
+        overview (list, optional): Data of an "overview" workflow, which has
+            no classifier
+        classify (list, optional): Data of a "classification" prompt workflow
+        explain (dict, optional): Data of the explain workflows requiring the
+            classification, by workflow ID, e.g. {"status": ["risks"]}
+        **settings: Settings merged into a meeting field, or a further field
+            configuration, by key
+
+    Returns:
+        dict: The configuration
+    """
+    explain = explain or {}
+    keys = [
+        *data_keys,
+        *(overview or []),
+        *(classify or []),
+        *sum(explain.values(), []),
+        *settings,
+    ]
+    data = {}
+    for key in dict.fromkeys(keys):
+        field = copy.deepcopy(MEETING_FIELDS.get(key, {}))
+        data[key] = {**field, **settings.get(key, {})}
+
+    config = {"data": data}
+    workflows = {}
+    if overview is not None:
+        workflows["overview"] = {"prompt": "Describe the meeting", "data": overview}
+    if classify is not None:
+        workflows["classification"] = {
+            "prompt": "Classify the meeting",
+            "data": classify,
+        }
+        for workflow_id, explain_data in explain.items():
+            workflows[workflow_id] = {
+                "explain": f"A {workflow_id.replace('_', ' ')} meeting",
+                "requires": ["classification"],
+                "data": explain_data,
+            }
+    if workflows:
+        config["workflow"] = workflows
+    return config
+
+
+@pytest.fixture(scope="session")
+def meeting_config():
+    """
+    Factory of engine configurations of meeting fields, see build_meeting_config
+    """
+    return build_meeting_config
+
+
+@pytest.fixture
+def engine_config():
+    """
+    Configuration of the engine under test; test modules override it with the
+    fields they need
+    """
+    return build_meeting_config(
+        "risks",
+        classify=["summary", "duration", "next_steps", "owner"],
+        explain={"risk_analysis": ["risks"]},
+    )
+
+
+@pytest.fixture
+def fake_model(engine_config):
+    """
+    Factory of fake models answering every field and classifier of
+    engine_config, taking further FakeChatModel fields
+    """
+    return functools.partial(FakeChatModel.from_engine_config, engine_config)
+
+
+@pytest.fixture
+def model(fake_model):
+    """
+    Fake model answering every field and classifier of engine_config
+    """
+    return fake_model()
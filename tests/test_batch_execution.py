@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+from ai_text_structor.ai_text_structor import AITextStructor
+from ai_text_structor.fake_model import BATCH_NEEDLE
+
+
+@pytest.fixture
+def engine_config(meeting_config):
+    return meeting_config(
+        "metadata", "next_steps", "duration", summary={"batch": False}
+    )
+
+
+@pytest.fixture
+def batch_model(fake_model):
+    def build(batch_response, **kwargs):
+        return fake_model(responses={BATCH_NEEDLE: batch_response}, **kwargs)
+
+    return build
+
+
+def test_batch_merges_fields_into_one_call(engine_config, batch_model):
+    model = batch_model(
+        '{"metadata": {"meeting_type": "status"}, '
+        '"next_steps": ["Ship the demo"], "duration": 30}'
+    )
+    engine = AITextStructor(engine_config, model, batch=True)
+
+    result = asyncio.run(engine.execute("Some meeting"))
+
+    assert result["results"] == {
+        "metadata": {"meeting_type": "status"},
+        "next_steps": ["Ship the demo"],
+        "duration": 30.0,
+        "summary": "Fake summary of the content",
+    }
+    assert len(model.calls) == 2
+
+
+def test_batch_falls_back_for_invalid_fields(engine_config, batch_model):
+    model = batch_model('{"metadata": {"meeting_type": "status"}, "duration": "n/a"}')
+    engine = AITextStructor(engine_config, model, batch=True)
+
+    result = asyncio.run(engine.execute("Some meeting"))
+
+    assert result["results"]["metadata"] == {"meeting_type": "status"}
+    assert result["results"]["next_steps"] == ["First item", "Second item"]
+    assert result["results"]["duration"] == 42.0
+    assert len(model.calls) == 4
+
+
+def test_batch_respects_token_budget(engine_config, batch_model):
+    model = batch_model("{}")
+    engine = AITextStructor(engine_config, model, batch=True, batch_token_budget=1)
+
+    groups = engine.data_executor.group_batches(
+        list(engine_config["data"]), engine.batch_token_budget
+    )
+
+    assert groups == [["metadata"], ["next_steps"], ["duration"]]
+
+
+def test_sequential_batches_run_one_at_a_time(meeting_config, batch_model):
+    config = meeting_config(
+        "metadata", "next_steps", "duration", "topic", summary={"batch": False}
+    )
+    model = batch_model(
+        '{"metadata": {"meeting_type": "status"}, "next_steps": ["Ship the demo"], '
+        '"duration": "n/a", "topic": "Launch"}',
+        latency=0.01,
+    )
+    engine = AITextStructor(
+        config, model, batch=True, batch_token_budget=320, parallel=False
+    )
+
+    result = asyncio.run(engine.execute("Some meeting"))
+
+    assert result["results"]["topic"] == "Launch"
+    assert result["results"]["duration"] == 42.0
+    assert sum(BATCH_NEEDLE in call for call in model.calls) == 2
+    assert len(model.calls) == 4
+    assert model.max_active == 1
+
+
+def test_cancelled_documents_cancel_their_batches(engine_config, batch_model):
+    config = {
+        "data": {
+            key: field
+            for key, field in engine_config["data"].items()
+            if field.get("batch", True)
+        }
+    }
+    model = batch_model("{}", latency=0.05)
+    engine = AITextStructor(config, model, batch=True)
+
+    async def run():
+        task = asyncio.ensure_future(engine.execute("Some meeting"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.sleep(0.2)
+        return asyncio.all_tasks() - {asyncio.current_task()}
+
+    assert asyncio.run(run()) == set()
+    assert model.calls == []
+
+
+def test_batch_accepts_objects_like_single_fields(engine_config, batch_model):
+    model = batch_model(
+        '{"metadata": {"meeting_type": null}, '
+        '"next_steps": ["Ship the demo"], "duration": 30}'
+    )
+    engine = AITextStructor(engine_config, model, batch=True)
+
+    result = asyncio.run(engine.execute("Some meeting"))
+
+    assert result["results"]["metadata"] == {"meeting_type": None}
+    assert len(model.calls) == 2
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from ai_text_structor.ai_text_structor import AITextStructor
+from ai_text_structor.benchmark import format_report, run_benchmark
+from ai_text_structor.fake_model import FakeChatModel
+
+
+@pytest.fixture
+def engine_config(meeting_config):
+    return meeting_config(
+        classify=["metadata", "next_steps", "duration"],
+        explain={"risk_analysis": ["risks"]},
+        metadata={
+            "attributes": {
+                "meeting_type": "Type of meeting",
+                "people": [{"name": "Name"}],
+            }
+        },
+    )
+
+
+def test_fake_model_answers_every_field_and_classifier(engine_config, model):
+    engine = AITextStructor(engine_config, model)
+
+    result = asyncio.run(engine.execute("Some meeting"))
+
+    assert result["results"] == {
+        "classification": {
+            "metadata": {
+                "meeting_type": "Fake Type of meeting",
+                "people": [{"name": "Fake Name"}],
+            },
+            "next_steps": ["First item", "Second item"],
+            "duration": 42.0,
+            "risk_analysis": {"risks": ["First item", "Second item"]},
+        }
+    }
+
+
+def test_fake_model_latency_and_failures_are_seeded():
+    def run(seed):
+        model = FakeChatModel(
+            latency_distribution=("uniform", 0.0, 0.01), failure_rate=0.5, seed=seed
+        )
+        outcomes = []
+        for _ in range(10):
+            try:
+                model.invoke("hello")
+                outcomes.append(True)
+            except RuntimeError:
+                outcomes.append(False)
+        return outcomes, model.simulated_latency
+
+    assert run(3) == run(3)
+    assert not all(run(3)[0])
+
+
+def test_benchmark_reports_each_mode(engine_config):
+    reports = run_benchmark(engine_config, document_count=3, latency=0.02)
+
+    sequential, parallel = reports
+    assert [report["mode"] for report in reports] == ["sequential", "parallel"]
+    assert sequential["calls_per_document"] == parallel["calls_per_document"] == 5
+    assert sequential["peak_concurrency"] == 1
+    assert parallel["peak_concurrency"] > 1
+    assert parallel["wall_time"] < sequential["wall_time"]
+    assert format_report(reports).splitlines()[0].startswith("mode")
+
+
+def test_benchmark_requires_documents(engine_config):
+    with pytest.raises(ValueError):
+        run_benchmark(engine_config, documents=[])
@@ -0,0 +1,111 @@
+import asyncio
+from typing import List
+
+import pytest
+
+from ai_text_structor.fake_model import FakeChatModel
+from ai_text_structor import AITextStructor, CallPolicy
+
+
+@pytest.fixture
+def engine_config(meeting_config):
+    return meeting_config("summary")
+
+
+def fast_policy(**kwargs):
+    return CallPolicy(backoff_base=0, **kwargs)
+
+
+def test_failed_calls_are_retried(engine_config, fake_model):
+    model = fake_model(failures=2)
+    engine = AITextStructor(
+        engine_config, model, call_policy=fast_policy(max_attempts=3)
+    )
+
+    result = asyncio.run(engine.execute("Some meeting"))
+
+    assert result["results"] == {"summary": "Fake summary of the content"}
+    assert len(model.calls) == 3
+
+
+def test_hung_call_times_out_and_is_retried(engine_config, fake_model):
+    model = fake_model(latencies=[5.0])
+    policy = fast_policy(timeout=0.05, max_attempts=2)
+    engine = AITextStructor(engine_config, model, call_policy=policy)
+
+    result = asyncio.run(engine.execute("Some meeting"))
+
+    assert result["results"] == {"summary": "Fake summary of the content"}
+
+
+def test_slow_call_is_hedged(engine_config, fake_model):
+    model = fake_model(latencies=[5.0])
+    engine = AITextStructor(
+        engine_config, model, call_policy=fast_policy(hedge_after=0.05)
+    )
+
+    async def run():
+        started_at = asyncio.get_running_loop().time()
+        result = await engine.execute("Some meeting")
+        return result, asyncio.get_running_loop().time() - started_at
+
+    result, elapsed = asyncio.run(run())
+
+    assert result["results"] == {"summary": "Fake summary of the content"}
+    assert elapsed < 1.0
+
+
+class FlakyClassifierModel(FakeChatModel):
+    """Fake model whose first classification answer is not a workflow key"""
+
+    classifications: List[str] = ["retrospective", "status"]
+
+    def _respond(self, messages):
+        response = super()._respond(messages)
+        if "workflow analyzer" in self.calls[-1]:
+            return self.classifications.pop(0)
+        return response
+
+
+def test_invalid_classification_is_retried(meeting_config):
+    config = meeting_config(classify=["summary"], explain={"status": ["risks"]})
+    model = FlakyClassifierModel.from_engine_config(config)
+    engine = AITextStructor(config, model, call_policy=fast_policy(max_attempts=2))
+
+    result = asyncio.run(engine.execute("Some meeting"))
+
+    assert result["results"]["classification"]["status"] == {
+        "risks": ["First item", "Second item"]
+    }
+    assert model.classifications == []
+
+
+def test_partial_results_return_structured_errors(engine_config, fake_model):
+    model = fake_model(failures=1)
+    engine = AITextStructor(engine_config, model, partial_results=True)
+
+    result = asyncio.run(engine.execute("Some meeting"))
+
+    assert result["results"]["summary"] == {
+        "error": {"type": "RuntimeError", "message": "Model call failed"}
+    }
+
+
+def test_errors_propagate_without_partial_results(engine_config, fake_model):
+    engine = AITextStructor(engine_config, fake_model(failures=1))
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(engine.execute("Some meeting"))
+
+
+def test_backoff_grows_exponentially_with_jitter():
+    policy = CallPolicy(
+        backoff_base=1, backoff_max=5, jitter=0.5, random_source=lambda: 1
+    )
+
+    assert [policy.get_backoff(attempt) for attempt in range(1, 5)] == [
+        0.5,
+        1.0,
+        2.0,
+        2.5,
+    ]
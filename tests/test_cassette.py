@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from ai_text_structor.ai_text_structor import AITextStructor
+from ai_text_structor.benchmark import replay_benchmark
+from ai_text_structor.cassette import CassetteModel, load_cassette
+from ai_text_structor.fake_model import FakeChatModel
+
+
+@pytest.fixture
+def engine_config(meeting_config):
+    return meeting_config("summary", "duration", "owner")
+
+
+def record(path, engine_config, documents, **engine_options):
+    model = FakeChatModel.from_engine_config(engine_config, latency=0.02)
+    cassette = CassetteModel(path=str(path), mode="record", model=model)
+    engine = AITextStructor(engine_config, cassette, **engine_options)
+    results = [asyncio.run(engine.execute(document)) for document in documents]
+    return results, model
+
+
+def test_replayed_calls_match_recorded_calls(tmp_path, engine_config):
+    path = tmp_path / "calls.jsonl"
+    recorded, model = record(path, engine_config, ["Some meeting"])
+
+    cassette = CassetteModel(path=str(path))
+    engine = AITextStructor(engine_config, cassette)
+    replayed = asyncio.run(engine.execute("Some meeting"))
+
+    assert replayed["results"] == recorded[0]["results"]
+    assert cassette.get_stats()["hits"] == len(model.calls) == 3
+    assert all(entry["latency"] >= 0.02 for entry in load_cassette(str(path)).values())
+
+
+def test_structured_output_calls_are_replayed(tmp_path, engine_config):
+    path = tmp_path / "calls.jsonl"
+    recorded, _ = record(path, engine_config, ["Some meeting"], structured_output=True)
+
+    cassette = CassetteModel(path=str(path))
+    engine = AITextStructor(engine_config, cassette, structured_output=True)
+
+    assert engine.structured_output
+    assert asyncio.run(engine.execute("Some meeting"))["results"] == (
+        recorded[0]["results"]
+    )
+
+
+def test_missing_calls_are_reported(tmp_path, engine_config):
+    path = tmp_path / "calls.jsonl"
+    record(path, engine_config, ["Some meeting"])
+
+    cassette = CassetteModel(path=str(path))
+    engine = AITextStructor(engine_config, cassette, partial_results=True)
+    asyncio.run(engine.execute("Another meeting"))
+
+    assert len(cassette.misses) == 3
+    assert all("Another meeting" in miss["prompt"] for miss in cassette.misses)
+
+
+def test_auto_mode_records_only_missing_calls(tmp_path, engine_config, model):
+    path = tmp_path / "calls.jsonl"
+    record(path, engine_config, ["Some meeting"])
+    cassette = CassetteModel(path=str(path), mode="auto", model=model)
+    engine = AITextStructor(engine_config, cassette)
+
+    asyncio.run(engine.execute("Some meeting"))
+    asyncio.run(engine.execute("Another meeting"))
+
+    assert len(model.calls) == 3
+    assert len(load_cassette(str(path))) == 6
+
+
+def test_recording_requires_a_model(tmp_path):
+    with pytest.raises(ValueError):
+        CassetteModel(path=str(tmp_path / "calls.jsonl"), mode="record")
+    with pytest.raises(ValueError):
+        CassetteModel(path=str(tmp_path / "calls.jsonl"), mode="rewind")
+
+
+def test_replay_benchmark_uses_recorded_latency(tmp_path, engine_config):
+    path = tmp_path / "calls.jsonl"
+    record(path, engine_config, ["Some meeting"])
+
+    report = replay_benchmark(
+engine_config, str(path), ["Some meeting"] * 4)
+    instant = replay_benchmark(
+        engine_config, str(path), ["Some meeting"] * 4, latency_scale=0.0
+    )
+
+    assert report["calls"] == 12
+    assert report["misses"] == []
+    assert report["wall_time"] >= 0.02
+    assert instant["calls"] == 12
@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from ai_text_structor.ai_text_structor import AITextStructor
+from ai_text_structor.process_chunks import (
+    ChunkingConfig,
+    merge_objects,
+    split_content,
+)
+
+
+CHUNKING = {"window_tokens": 10, "overlap_tokens": 2}
+
+FIRST_PART = "alpha " * 6
+SECOND_PART = "omega " * 6
+
+
+@pytest.fixture
+def engine_config(meeting_config):
+    return meeting_config(
+        next_steps={"chunking": CHUNKING},
+        duration={"chunking": {**CHUNKING, "aggregate": "sum"}},
+        summary={"chunking": CHUNKING},
+    )
+
+
+@pytest.fixture
+def model(fake_model):
+    return fake_model(
+        responses={
+            "Part 2:": "Overall summary",
+            "Summarize": "Partial summary",
+            "How long": "15",
+            "omega omega omega": '{"items": ["ship demo", "Write docs"]}',
+            "next steps": '{"items": ["Fix login", "Ship demo"]}',
+        }
+    )
+
+
+def test_split_content_overlaps_chunks():
+    chunking = ChunkingConfig(window_tokens=3, overlap_tokens=1)
+
+    chunks = split_content("abcdefghijklmnopqrst", chunking)
+
+    assert chunks == ["abcdefghijkl", "ijklmnopqrst"]
+    assert split_content("short", chunking) == ["short"]
+
+
+def test_chunked_fields_are_reduced_per_type(engine_config, model):
+    engine = AITextStructor(engine_config, model)
+
+    result = asyncio.run(engine.execute_data(FIRST_PART + SECOND_PART, None))
+
+    assert result["results"] == {
+        "next_steps": ["Fix login", "Ship demo", "Write docs"],
+        "duration": 30.0,
+        "summary": "Overall summary",
+    }
+    # Two chunks for each field plus the summary reduce completion
+    assert len(model.calls) == 7
+
+
+def test_short_content_is_not_chunked(engine_config, model):
+    engine = AITextStructor(engine_config, model)
+
+    result = asyncio.run(engine.execute_data("alpha", ["summary"]))
+
+    assert result["results"] == {"summary": "Partial summary"}
+    assert len(model.calls) == 1
+
+
+def test_merge_objects_follows_attribute_schema():
+    attributes = {"meeting_type": "Type", "attendees": [{"name": "Name"}]}
+
+    merged = merge_objects(
+        [
+            {"meeting_type": "", "attendees": [{"name": "Ann"}]},
+            {"meeting_type": "review", "attendees": [{"name": "Ann"}, {"name": "Bo"}]},
+        ],
+        attributes,
+    )
+
+    assert merged == {
+        "meeting_type": "review",
+        "attendees": [{"name": "Ann"}, {"name": "Bo"}],
+    }
+
+
+def test_merge_objects_keeps_zero_and_false():
+    merged = merge_objects(
+        [
+            {"count": 0, "done": False, "owner": ""},
+            {"count": 3, "done": True, "owner": "Ann"},
+        ],
+        {"count": "Count", "done": "Done", "owner": "Owner"},
+    )
+
+    assert merged == {"count": 0, "done": False, "owner": "Ann"}
+
+
+def test_invalid_chunking_config_raises(meeting_config, model):
+    config = meeting_config(duration={"chunking": {"aggregate": "median"}})
+
+    with pytest.raises(ValueError, match="Invalid aggregate"):
+        AITextStructor(config, model)
+
+    config["data"]["duration"]["chunking"] = {"window": 1000}
+    with pytest.raises(ValueError, match="setting 'window' for key 'duration'"):
+        AITextStructor(config, model)
+
+    for chunking in ({"window_tokens": "4000"}, {"overlap_tokens": 20.5}):
+        config["data"]["duration"]["chunking"] = chunking
+        with pytest.raises(ValueError, match="for key 'duration' must"):
+            AITextStructor(config, model)
@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+from ai_text_structor.ai_text_structor import AITextStructor
+
+
+@pytest.fixture
+def engine_config(meeting_config):
+    return meeting_config("summary", "topic", "duration")
+
+
+def test_fields_run_concurrently(engine_config, fake_model):
+    model = fake_model(latency=0.05)
+    engine = AITextStructor(engine_config, model)
+
+    result = asyncio.run(engine.execute("Some meeting"))
+
+    assert result["results"] == {
+        "summary": "Fake summary of the content",
+        "topic": "Fake summary of the content",
+        "duration": 42.0,
+    }
+    assert model.max_active == 3
+
+
+def test_same_key_is_executed_once(engine_config, fake_model):
+    model = fake_model(latency=0.05)
+    engine = AITextStructor(engine_config, model)
+
+    async def run():
+        return await asyncio.gather(
+            engine.execute_data("Some meeting", "summary"),
+            engine.execute_data("Some meeting", "summary"),
+        )
+
+    first, second = asyncio.run(run())
+
+    assert first == second
+    assert len(model.calls) == 1
+
+
+def test_cache_is_keyed_by_content(engine_config, model):
+    engine = AITextStructor(engine_config, model)
+
+    async def run():
+        await engine.execute_data("First meeting", "summary")
+        await engine.execute_data("Second meeting", "summary")
+        await engine.execute_data("First meeting", "summary")
+
+    asyncio.run(run())
+
+    assert len(model.calls) == 2
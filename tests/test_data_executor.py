@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from ai_text_structor import process_object
+from ai_text_structor.data_executor import DataExecutor
+
+
+@pytest.fixture
+def engine_config(meeting_config):
+    return meeting_config(
+        "next_steps",
+        metadata={
+            "attributes": {
+                "meeting_type": "Type of meeting",
+                "attendees": [{"name": "Participant's full name"}],
+            }
+        },
+    )
+
+
+def test_plans_are_compiled_once(monkeypatch, engine_config, model):
+    calls = []
+    build_pydantic_model = process_object.build_pydantic_model
+
+    def counting_build(attributes):
+        calls.append(attributes)
+        return build_pydantic_model(attributes)
+
+    monkeypatch.setattr(process_object, "build_pydantic_model", counting_build)
+    executor = DataExecutor(engine_config["data"], model)
+
+    for content in ["First meeting", "Second meeting"]:
+        assert executor.get_executor("metadata")(content) == {
+            "meeting_type": "Fake Type of meeting",
+            "attendees": [{"name": "Fake Participant's full name"}],
+        }
+
+    assert len(calls) == 1
+
+
+def test_plan_binds_everything_but_content(engine_config, model):
+    executor = DataExecutor(engine_config["data"], model)
+    plan = executor.get_plan("metadata")
+
+    assert plan.prompts.input_variables == ["content"]
+    assert "meeting_type" in plan.model_class.model_fields
+    assert "meeting_type" in plan.format_instructions
+
+
+def test_async_executor_matches_sync_executor(engine_config, model):
+    executor = DataExecutor(engine_config["data"], model)
+
+    result = asyncio.run(executor.get_async_executor("next_steps")("Some meeting"))
+
+    assert result == executor.get_executor("next_steps")("Some meeting")
+    assert result == ["First item", "Second item"]
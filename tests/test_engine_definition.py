@@ -0,0 +1,94 @@
+import asyncio
+import json
+
+import pytest
+
+from ai_text_structor import AITextStructor, EngineDefinition, get_engine_definition
+from ai_text_structor.engine_definition import compile_engine
+
+
+@pytest.fixture
+def engine_config(meeting_config):
+    return meeting_config(
+        classify=["summary"], explain={"planning": ["duration", "owner"]}
+    )
+
+
+def test_definitions_are_identified_by_content(engine_config):
+    reordered = {
+        "workflow": engine_config["workflow"],
+        "data": dict(reversed(list(engine_config["data"].items()))),
+    }
+
+    definition = compile_engine(engine_config)
+
+    assert definition == compile_engine(reordered)
+    assert hash(definition) == hash(compile_engine(reordered))
+    assert get_engine_definition(engine_config) is get_engine_definition(reordered)
+
+
+def test_definition_is_not_affected_by_config_changes(engine_config):
+    definition = compile_engine(engine_config)
+
+    engine_config["data"]["summary"]["prompt"] = "Changed"
+
+    assert definition.data_dict["summary"]["prompt"] == "Summarize the content"
+    with pytest.raises(TypeError):
+        definition.fields["other"] = None
+
+
+def test_engines_from_a_definition_match_engines_from_a_config(
+    engine_config, fake_model
+):
+    definition = get_engine_definition(engine_config)
+    expected = asyncio.run(
+        AITextStructor(engine_config, fake_model()).execute("Some meeting")
+    )
+
+    engines = [AITextStructor(definition, fake_model()) for _ in range(3)]
+
+    async def run_all():
+        return await asyncio.gather(
+            *(
+                engine.execute(f"Meeting {index}")
+                for index, engine in enumerate(engines)
+            )
+        )
+
+    for result in asyncio.run(run_all()):
+        assert result["results"] == expected["results"]
+    for index, engine in enumerate(engines):
+        assert all(f"Meeting {index}" in call for call in engine.model.calls)
+
+
+def test_saved_definitions_are_loaded(tmp_path, engine_config):
+    path = tmp_path / "engine.json"
+    definition = compile_engine(engine_config)
+
+    definition.save(path)
+
+    assert EngineDefinition.load(path) == definition
+
+
+def test_tampered_definitions_are_rejected(tmp_path, engine_config):
+    path = tmp_path / "engine.json"
+    compile_engine(engine_config).save(path)
+    path.write_text(path.read_text().replace("Summarize", "Shorten"))
+
+    with pytest.raises(ValueError):
+        EngineDefinition.load(path)
+
+
+def test_workflows_must_reference_known_data(engine_config):
+    engine_config["workflow"]["classification"]["data"] = ["missing"]
+
+    with pytest.raises(ValueError):
+        get_engine_definition(engine_config)
+
+
+def test_engines_from_a_config_share_its_definition(engine_config, model):
+    first = AITextStructor(engine_config, model)
+    second = AITextStructor(json.loads(json.dumps(engine_config)), model)
+
+    assert first.definition is second.definition
+    assert first.definition is get_engine_definition(engine_config)
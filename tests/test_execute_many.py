@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from ai_text_structor.ai_text_structor import AITextStructor
+
+
+SUMMARY = "Fake summary of the content"
+
+
+@pytest.fixture
+def engine_config(meeting_config):
+    return meeting_config("summary", "topic")
+
+
+def test_execute_many_returns_results_in_input_order(engine_config, fake_model):
+    model = fake_model(latency=0.01)
+    engine = AITextStructor(engine_config, model)
+    contents = [f"Meeting {index}" for index in range(10)]
+
+    results = asyncio.run(engine.execute_many(contents, max_concurrency=3))
+
+    assert len(results) == 10
+    assert all(
+        result["results"] == {"summary": SUMMARY, "topic": SUMMARY}
+        for result in results
+    )
+    assert len(model.calls) == 20
+    assert model.max_active == 3
+    assert engine.data_cache == {}
+
+
+def test_iter_many_yields_document_ids(engine_config, fake_model):
+    engine = AITextStructor(engine_config, fake_model(latency=0.01))
+
+    async def collect():
+        return [
+            document_id
+            async for document_id, _ in engine.iter_many(
+                (("a", "First"), ("b", "Second"), ("c", "Third")), max_concurrency=2
+            )
+        ]
+
+    assert sorted(asyncio.run(collect())) == ["a", "b", "c"]
+
+
+def test_failed_documents_do_not_stop_the_others(engine_config, fake_model):
+    model = fake_model(failures=1)
+    engine = AITextStructor(engine_config, model)
+
+    results = asyncio.run(
+        engine.execute_many(["Meeting 1", "Meeting 2", "Meeting 3"], max_concurrency=1)
+    )
+
+    assert results[0] == {
+        "error": {"type": "RuntimeError", "message": "Model call failed"}
+    }
+    assert [result["results"]["topic"] for result in results[1:]] == [
+        SUMMARY,
+        SUMMARY,
+    ]
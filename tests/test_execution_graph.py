@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from ai_text_structor.ai_text_structor import AITextStructor
+from ai_text_structor.workflow_executor import WorkflowExecutor
+
+
+SUMMARY = "Fake summary of the content"
+
+LATENCY = 0.1
+
+
+@pytest.fixture
+def engine_config(meeting_config):
+    config = meeting_config(
+        classify=["summary", "participants"],
+        explain={"status": ["risks", "summary"], "decision": ["risks", "decisions"]},
+        participants={"type": "string", "prompt": "Name the participants"},
+        decisions={"type": "string", "prompt": "Describe the decisions"},
+    )
+    config["workflow"]["extraction"] = {
+        "prompt": "Extract basics",
+        "data": ["participants"],
+    }
+    return config
+
+
+@pytest.fixture
+def model(fake_model):
+    return fake_model(latency=LATENCY)
+
+
+def test_graph_deduplicates_data_nodes(engine_config, model):
+    workflow_executor = WorkflowExecutor(engine_config["workflow"], model)
+    graph = workflow_executor.get_execution_graph()
+
+    assert graph.initial_nodes == (
+        "data:summary",
+        "data:participants",
+        "classify:classification",
+    )
+    assert set(graph.nodes) == {
+        *graph.initial_nodes,
+        "data:risks",
+        "data:decisions",
+    }
+    assert graph.get_branch("classification", "decision") == (
+        "data:risks",
+        "data:decisions",
+    )
+
+
+@pytest.mark.parametrize("parallel", [True, False])
+def test_each_node_runs_once_per_document(engine_config, model, parallel):
+    engine = AITextStructor(engine_config, model, parallel=parallel)
+
+    result = asyncio.run(engine.execute("Some meeting"))
+
+    assert result["results"] == {
+        "classification": {
+            "summary": SUMMARY,
+            "participants": SUMMARY,
+            "status": {"risks": ["First item", "Second item"], "summary": SUMMARY},
+        },
+        "extraction": {"participants": SUMMARY},
+    }
+    assert len(model.calls) == 4
+
+
+def test_classification_runs_alongside_root_data(engine_config, model):
+    engine = AITextStructor(engine_config, model)
+
+    async def run():
+        started_at = asyncio.get_running_loop().time()
+        await engine.execute("Some meeting")
+        return asyncio.get_running_loop().time() - started_at
+
+    assert asyncio.run(run()) < 2.5 * LATENCY
+
+
+def test_unknown_data_field_is_rejected(engine_config, model):
+    engine_config["workflow"]["extraction"]["data"] = ["missing"]
+
+    with pytest.raises(ValueError, match="unknown data field 'missing'"):
+        AITextStructor(engine_config, model)
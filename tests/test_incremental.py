@@ -0,0 +1,149 @@
+import asyncio
+
+import pytest
+
+from ai_text_structor import AITextStructor, IncrementalSession, Preprocessor
+from ai_text_structor.incremental import IncrementalUpdate
+
+
+@pytest.fixture
+def engine_config(meeting_config):
+    return meeting_config(
+        classify=["summary", "next_steps", "owner"],
+        explain={"risk_analysis": ["risks"]},
+    )
+
+
+@pytest.fixture
+def engine(engine_config, model):
+    return AITextStructor(engine_config, model)
+
+
+FIRST_PART = "Emma: We start the migration.\n"
+APPENDED = "Ryan: I will write the rollback plan.\n"
+
+
+def test_update_only_sends_the_appended_content_and_previous_answers(engine, model):
+    previous = asyncio.run(engine.execute(FIRST_PART))
+    model.calls.clear()
+
+    result = asyncio.run(engine.execute_update(previous, FIRST_PART, APPENDED))
+
+    assert result["results"] == previous["results"]
+    assert len(model.calls) == 4
+    assert not any("Classify the meeting" in call for call in model.calls)
+    assert all(APPENDED.strip() in call for call in model.calls)
+    assert all(FIRST_PART.strip() not in call for call in model.calls)
+    summary_call = next(call for call in model.calls if "Summarize" in call)
+    assert "Fake summary of the content" in summary_call
+    owner_call = next(call for call in model.calls if "Who owns" in call)
+    assert '"name": "Fake Name of the owner"' in owner_call
+
+
+def test_list_fields_append_new_items(engine, model):
+    previous = asyncio.run(engine.execute(FIRST_PART))
+    model.responses["List the next steps"] = '{"items": ["Second item", "Rollback"]}'
+
+    result = asyncio.run(engine.execute_update(previous, FIRST_PART, APPENDED))
+
+    assert result["results"]["classification"]["next_steps"] == [
+        "First item",
+        "Second item",
+        "Rollback",
+    ]
+
+
+def test_full_execution_does_not_reuse_updated_results(engine, model):
+    previous = asyncio.run(engine.execute(FIRST_PART))
+    asyncio.run(engine.execute_update(previous, FIRST_PART, APPENDED))
+    model.calls.clear()
+
+    asyncio.run(engine.execute(FIRST_PART + APPENDED))
+
+    assert len(model.calls) == 5
+    assert all(FIRST_PART.strip() in call for call in model.calls)
+
+
+def test_failed_fields_run_over_the_whole_content(engine_config):
+    update = IncrementalUpdate.from_result(
+        {
+            "results": {
+                "classification": {
+                    "summary": {"error": {"type": "RuntimeError", "message": ""}},
+                    "next_steps": ["First item"],
+                    "owner": None,
+                    "classification_error": {"type": "RuntimeError", "message": ""},
+                }
+            }
+        },
+        APPENDED,
+        engine_config["workflow"],
+    )
+
+    assert update.values == {"next_steps": ["First item"]}
+    assert update.classifications == {}
+
+
+def test_appended_content_is_taken_from_the_preprocessed_document(
+    engine_config, model
+):
+    preprocessor = Preprocessor(["fillers", "speaker_turns", "whitespace"])
+    engine = AITextStructor(engine_config, model, preprocessor=preprocessor)
+    previous = asyncio.run(engine.execute(FIRST_PART))
+    model.calls.clear()
+
+    # The turn continues Emma's, so preprocessing merges it into her last turn
+    asyncio.run(
+        engine.execute_update(
+            previous, FIRST_PART, "Emma: Um, we finish it.\n" + APPENDED
+        )
+    )
+
+    assert len(model.calls) == 4
+    appended = " we finish it.\nRyan: I will write the rollback plan."
+    assert all(appended in call for call in model.calls)
+    assert not any("Emma: we finish it" in call for call in model.calls)
+    assert not any("the migration" in call for call in model.calls)
+
+
+def test_fields_skipped_for_the_budget_run_over_the_whole_content(
+    engine_config, model
+):
+    engine = AITextStructor(engine_config, model, parallel=False, token_budget=200)
+    previous = asyncio.run(engine.execute(FIRST_PART))
+    assert "skipped" in previous["results"]["classification"]["next_steps"]
+
+    engine.token_budget = None
+    model.calls.clear()
+    result = asyncio.run(engine.execute_update(previous, FIRST_PART, APPENDED))
+
+    assert result["results"]["classification"]["next_steps"] == [
+        "First item",
+        "Second item",
+    ]
+    next_steps_call = next(call for call in model.calls if "next steps" in call)
+    assert FIRST_PART.strip() in next_steps_call
+    assert "skipped" not in next_steps_call
+
+
+def test_session_refreshes_periodically(engine, model):
+    session = IncrementalSession(engine, refresh_every=2)
+
+    for _ in range(4):
+        asyncio.run(session.append(APPENDED))
+
+    assert session.content == APPENDED * 4
+    assert session.refreshes == 2
+    assert session.updates == 0
+    assert sum("Classify the meeting" in call for call in model.calls) == 2
+
+
+def test_session_refreshes_after_large_appends(engine):
+    session = IncrementalSession(engine, refresh_ratio=1.0)
+
+    asyncio.run(session.append(FIRST_PART))
+    asyncio.run(session.append(FIRST_PART * 2))
+
+    assert session.refreshes == 2
+    with pytest.raises(ValueError):
+        IncrementalSession(engine, refresh_every=0)
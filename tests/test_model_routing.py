@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+
+from ai_text_structor.ai_text_structor import AITextStructor
+from ai_text_structor.fake_model import get_field_value
+
+
+CONTENT = "Emma: The migration is late and the meeting took 15 minutes."
+
+
+@pytest.fixture
+def engine_config(meeting_config):
+    config = meeting_config(
+        classify=["owner", "summary", "duration"],
+        explain={"risk_analysis": ["risks"]},
+        owner={"model": ["fast", "strong"]},
+        duration={"model": "fast"},
+        risks={"model": "fast"},
+    )
+    config["workflow"]["classification"]["model"] = "fast"
+    return config
+
+
+@pytest.fixture
+def models(fake_model):
+    return {"default": fake_model(), "fast": fake_model(), "strong": fake_model()}
+
+
+def prompts_of(model):
+    needles = ("Classify", "Who owns", "Summarize", "How long", "List the risks")
+    return sorted(
+        next(needle for needle in needles if needle in call) for call in model.calls
+    )
+
+
+def build_engine(engine_config, models, **options):
+    return AITextStructor(
+        engine_config,
+        models["default"],
+        models={"fast": models["fast"], "strong": models["strong"]},
+        **options,
+    )
+
+
+def test_fields_and_classifiers_call_their_models(engine_config, models):
+    engine = build_engine(engine_config, models)
+    result = asyncio.run(engine.execute(CONTENT, metrics=True))
+
+    classification = result["results"]["classification"]
+    assert classification["owner"] == get_field_value(engine_config["data"]["owner"])
+    assert classification["risk_analysis"]["risks"] == get_field_value(
+        engine_config["data"]["risks"]
+    )
+    assert prompts_of(models["default"]) == ["Summarize"]
+    assert prompts_of(models["fast"]) == [
+        "Classify",
+        "How long",
+        "List the risks",
+        "Who owns",
+    ]
+    assert models["strong"].calls == []
+
+    model_metrics = result["metrics"]["models"]
+    assert model_metrics["default"]["calls"] == 1
+    assert model_metrics["fast"]["calls"] == 4
+    assert "strong" not in model_metrics
+    assert result["metrics"]["totals"]["escalations"] == 0
+
+
+def test_cascade_escalates_unparsable_answers(engine_config, models, fake_model):
+    models["fast"] = fake_model(responses={"Who owns": "The owner is Emma"})
+    engine = build_engine(engine_config, models)
+    result = asyncio.run(engine.execute(CONTENT, metrics=True))
+
+    owner = result["results"]["classification"]["owner"]
+    assert owner == get_field_value(engine_config["data"]["owner"])
+    # The cheap model is not asked to correct its answer before escalating
+    assert prompts_of(models["fast"]).count("Who owns") == 1
+    assert prompts_of(models["strong"]) == ["Who owns"]
+
+    metrics = result["metrics"]
+    assert metrics["fields"]["owner"]["escalations"] == 1
+    assert metrics["models"]["fast"]["escalations"] == 1
+    assert metrics["models"]["strong"] == {
+        "calls": 1,
+        "model_time": metrics["models"]["strong"]["model_time"],
+        "escalations": 0,
+    }
+
+
+def test_cascade_escalates_numeric_answers_without_a_number(
+    meeting_config, fake_model
+):
+    config = meeting_config(duration={"model": ["fast", "strong"]})
+    fast = fake_model(responses={"How long": "The meeting had no fixed length"})
+    strong = fake_model()
+    engine = AITextStructor(
+        config, fake_model(), models={"fast": fast, "strong": strong}
+    )
+
+    result = asyncio.run(engine.execute_data(CONTENT, metrics=True))
+
+    assert result["results"]["duration"] == get_field_value(config["data"]["duration"])
+    assert len(fast.calls) == len(strong.calls) == 1
+    assert result["metrics"]["models"]["fast"]["escalations"] == 1
+
+
+def test_one_model_can_serve_every_alias(engine_config, model):
+    engine = AITextStructor(
+        engine_config, model, models={"fast": model, "strong": model}
+    )
+    result = asyncio.run(engine.execute(CONTENT, metrics=True))
+
+    assert result["results"]["classification"]["duration"] == get_field_value(
+        engine_config["data"]["duration"]
+    )
+    model_metrics = result["metrics"]["models"]
+    assert sum(metrics["calls"] for metrics in model_metrics.values()) == 5
+    assert len(model.calls) == 5
+
+
+def test_batches_only_merge_fields_of_the_same_models(engine_config, models):
+    engine = build_engine(engine_config, models, batch=True, parallel=False)
+    groups = engine.data_executor.group_batches(list(engine_config["data"]), 2000)
+
+    assert groups == [["owner"], ["summary"], ["duration", "risks"]]
+
+
+def test_invalid_model_settings_are_rejected(engine_config, meeting_config, models):
+    with pytest.raises(ValueError, match="Unknown model 'strong'"):
+        AITextStructor(
+            engine_config, models["default"], models={"fast": models["fast"]}
+        )
+    with pytest.raises(ValueError, match="Unknown model 'fast'"):
+        AITextStructor(engine_config, models["default"])
+    with pytest.raises(ValueError, match="reserved"):
+        AITextStructor(
+            engine_config, models["default"], models={"default": models["fast"]}
+        )
+
+    config = meeting_config(summary={"model": []})
+    with pytest.raises(ValueError, match="non-empty list of aliases"):
+        AITextStructor(config, models["default"])
@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+from langchain_core.exceptions import OutputParserException
+
+from ai_text_structor.ai_text_structor import AITextStructor
+from ai_text_structor.output_parsing import (
+    parse_items_text,
+    parse_json_text,
+    parse_number_text,
+)
+from ai_text_structor.process_workflow import parse_workflow_result
+from ai_text_structor.tracing import record_call
+
+
+@pytest.fixture
+def engine_config(meeting_config):
+    return meeting_config(overview=["duration", "next_steps", "owner"])
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        '{"a": [1, 2]}',
+        '```json\n{"a": [1, 2]}\n```',
+        'Here is the answer: {"a": [1, 2]} Hope this helps!',
+        '{"a": [1, 2,],}',
+        '{"a": [1, 2]',
+    ],
+)
+def test_parse_json_text_recovers_common_defects(text):
+    assert parse_json_text(text) == {"a": [1, 2]}
+
+
+def test_parse_json_text_keeps_python_literals_inside_strings():
+    text = '{"summary": "None of the tasks are \\"True\\" blockers", "done": False,}'
+
+    assert parse_json_text(text) == {
+        "summary": 'None of the tasks are "True" blockers',
+        "done": False,
+    }
+
+
+def test_parse_json_text_keeps_commas_inside_strings():
+    text = '{"items": ["Compare a, ] and b, }", "Ship",], "done": True,}'
+
+    assert parse_json_text(text) == {
+        "items": ["Compare a, ] and b, }", "Ship"],
+        "done": True,
+    }
+
+
+def test_parse_json_text_counts_repairs():
+    with record_call() as record:
+        parse_json_text('{"a": 1}')
+        parse_json_text('Sure: {"a": 1}')
+
+    assert record.repairs == 1
+
+
+def test_parse_json_text_rejects_prose():
+    with pytest.raises(OutputParserException):
+        parse_json_text("I cannot answer that")
+
+
+def test_parse_number_text():
+    assert parse_number_text("45") == 45.0
+    assert parse_number_text("About 45 minutes") == 45.0
+    assert parse_number_text("1,200 people") == 1200.0
+    assert parse_number_text("unknown") is None
+
+
+def test_parse_items_text_accepts_other_list_shapes():
+    assert parse_items_text('{"items": ["a", "b"]}') == ["a", "b"]
+    assert parse_items_text('["a", "b"]') == ["a", "b"]
+    assert parse_items_text('{"steps": ["a", "b"]}') == ["a", "b"]
+    assert parse_items_text("- a\n- b") == ["a", "b"]
+
+
+def test_parse_workflow_result_finds_single_path_in_prose():
+    paths = {"status": "", "planning": ""}
+
+    assert parse_workflow_result('"Status".', paths) == "status"
+    assert parse_workflow_result("The answer is planning", paths) == "planning"
+    with pytest.raises(ValueError):
+        parse_workflow_result("status or planning", paths)
+
+
+def test_sloppy_outputs_are_repaired_without_reasking(engine_config, fake_model):
+    model = fake_model(
+        responses={
+            "How long": "It lasted 45 minutes.",
+            "next steps": '```json\n["Ship it", "Write docs",]\n```',
+            "owns": 'The owner is {"name": "Ada", "team": 7}',
+        },
+    )
+    engine = AITextStructor(engine_config, model)
+
+    result = asyncio.run(engine.execute("Some meeting", metrics=True))
+
+    assert result["results"]["overview"] == {
+        "duration": 45.0,
+        "next_steps": ["Ship it", "Write docs"],
+        "owner": {"name": "Ada", "team": 7},
+    }
+    assert len(model.calls) == 3
+    totals = result["metrics"]["totals"]
+    assert totals["repairs"] >= 3
+    assert totals["reasks"] == 0
+
+
+def test_object_attributes_are_not_type_checked(engine_config, fake_model):
+    model = fake_model(responses={"owns": '{"name": "Ada", "team": null}'})
+    engine = AITextStructor(engine_config, model)
+
+    result = asyncio.run(engine.execute("Some meeting", metrics=True))
+
+    assert result["results"]["overview"]["owner"] == {"name": "Ada", "team": None}
+    assert len(model.calls) == 3
+    assert result["metrics"]["totals"]["reasks"] == 0
+
+
+def test_unparsable_output_is_reasked_once(engine_config, fake_model):
+    model = fake_model(
+        responses={
+            "could not be parsed": '{"name": "Ada", "team": "Core"}',
+            "owns": "Ada from the core team",
+        },
+    )
+    engine = AITextStructor(engine_config, model)
+
+    result = asyncio.run(engine.execute("Some meeting", metrics=True))
+
+    assert result["results"]["overview"]["owner"] == {
+        "name": "Ada",
+        "team": "Core",
+    }
+    assert result["metrics"]["fields"]["owner"]["reasks"] == 1
+    assert result["metrics"]["totals"]["reasks"] == 1
@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from ai_text_structor.ai_text_structor import AITextStructor
+from ai_text_structor.preprocessing import (
+    Preprocessor,
+    RelevanceConfig,
+    compact_speaker_turns,
+    normalize_whitespace,
+    remove_fillers,
+)
+
+
+FILLER_LINES = [
+    f"Ryan (Developer): Um, I worked on ticket {number} and it is uh done."
+    for number in range(40)
+]
+TRANSCRIPT = "\n".join(
+    FILLER_LINES[:20]
+    + ["Emma (Product Manager): The meeting took 15 minutes."]
+    + FILLER_LINES[20:]
+)
+
+
+@pytest.fixture
+def engine_config(meeting_config):
+    return meeting_config(
+        "summary", duration={"relevance": {"max_tokens": 40, "passage_tokens": 20}}
+    )
+
+
+def test_normalize_whitespace():
+    assert normalize_whitespace("a  \t b \r\n\n\n\nc d ") == "a b\n\nc d"
+
+
+def test_remove_fillers():
+    assert remove_fillers("Um, I think uh we are done") == "I think we are done"
+    assert remove_fillers("The umbrella is here") == "The umbrella is here"
+
+
+def test_compact_speaker_turns():
+    transcript = (
+        "Emma (Product Manager): Hello.\n"
+        "Emma (Product Manager): Let's start.\n"
+        "Ryan (Developer): Done.\n"
+        "Emma (Product Manager): Thanks."
+    )
+
+    assert compact_speaker_turns(transcript) == (
+        "Emma (Product Manager): Hello. Let's start.\n"
+        "Ryan (Developer): Done.\n"
+        "Emma: Thanks."
+    )
+
+
+def test_labels_are_no_speaker_turns():
+    notes = (
+        "Action items: Fix the login.\n"
+        "Action items: Ship the demo.\n"
+        "Q3: Hire a designer.\n"
+        "Q3: Plan the offsite.\n"
+        "Note: Budget is fixed.\n"
+        "Note: Ask finance."
+    )
+
+    assert compact_speaker_turns(notes).startswith(notes[: notes.index("Note")])
+    assert Preprocessor()(notes) == notes
+
+
+def test_preprocessor_rejects_unknown_steps():
+    with pytest.raises(ValueError):
+        Preprocessor(["spelling"])
+
+
+def test_relevance_config_is_validated():
+    with pytest.raises(ValueError):
+        RelevanceConfig.from_config("duration", {"max_tokens": 0}, "query")
+    with pytest.raises(ValueError):
+        RelevanceConfig.from_config(
+            "duration", {"max_tokens": 10, "passage_tokens": 20}, "query"
+        )
+    with pytest.raises(ValueError, match="Unknown relevance setting 'top_k'"):
+        RelevanceConfig.from_config("duration", {"top_k": 3}, "query")
+    with pytest.raises(ValueError, match="max_tokens for key 'duration' must"):
+        RelevanceConfig.from_config("duration", {"max_tokens": "400"}, "query")
+    with pytest.raises(ValueError, match="passage_tokens for key 'duration' must"):
+        RelevanceConfig.from_config("duration", {"passage_tokens": 50.5}, "query")
+
+
+def test_fields_receive_preprocessed_and_relevant_content(engine_config, model):
+    engine = AITextStructor(engine_config, model, preprocessor=Preprocessor())
+
+    result = asyncio.run(engine.execute(TRANSCRIPT, metrics=True))
+
+    summary_call = next(call for call in model.calls if "Summarize" in call)
+    duration_call = next(call for call in model.calls if "How long" in call)
+    assert "Um" not in summary_call
+    assert "ticket 39" in summary_call
+    assert "took 15 minutes" in duration_call
+    assert "ticket 39" not in duration_call
+
+    report = result["metrics"]["preprocessing"]
+    assert report["tokens_saved"] > 0
+    assert report["original_tokens"] - report["tokens"] == report["tokens_saved"]
+    assert set(report["fields"]) == {"duration"}
+    assert report["fields"]["duration"] > report["tokens"] / 2
+
+
+def test_relevant_fields_are_not_batched(engine_config, model):
+    engine = AITextStructor(engine_config, model, batch=True)
+
+    result = asyncio.run(engine.execute(TRANSCRIPT))
+
+    assert result["results"]["duration"] == 42.0
+    assert len(model.calls) == 2
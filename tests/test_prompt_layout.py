@@ -0,0 +1,37 @@
+import asyncio
+
+from ai_text_structor.ai_text_structor import AITextStructor
+from ai_text_structor.benchmark import SAMPLE_DOCUMENT, measure_prefix_sharing
+from ai_text_structor.prompt_layout import CACHE_CONTROL, SYSTEM_PREAMBLE
+
+
+def test_every_call_starts_with_preamble_and_content(engine_config, model):
+    engine = AITextStructor(engine_config, model)
+
+    asyncio.run(engine.execute("Some meeting"))
+
+    assert len(model.prompts) == 6
+    for messages in model.prompts:
+        assert messages[0].type == "system"
+        assert messages[0].content == SYSTEM_PREAMBLE
+        assert messages[1].content == "Some meeting"
+
+
+def test_cache_control_marks_the_content_message(engine_config, model):
+    engine = AITextStructor(engine_config, model, cache_control=True)
+
+    asyncio.run(engine.execute("Some meeting"))
+
+    for messages in model.prompts:
+        assert messages[1].content == [
+            {"type": "text", "text": "Some meeting", "cache_control": CACHE_CONTROL}
+        ]
+
+
+def test_calls_share_the_content_prefix(engine_config):
+    report = measure_prefix_sharing(engine_config)
+
+    shared_per_call = len(SYSTEM_PREAMBLE) + len(SAMPLE_DOCUMENT)
+    assert report["calls"] == 6
+    assert report["shared_prefix_bytes"] >= 5 * shared_per_call
+    assert 0 < report["shared_prefix_ratio"] < 1
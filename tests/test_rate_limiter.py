@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from ai_text_structor import AITextStructor, RateLimiter
+from ai_text_structor.rate_limiter import PRIORITY_CLASSIFY, PRIORITY_DATA
+
+
+@pytest.fixture
+def engine_config(meeting_config):
+    return meeting_config("summary", "topic")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += seconds
+        await asyncio.sleep(0)
+
+
+def build_limiter(**limits):
+    clock = FakeClock()
+    return RateLimiter(clock=clock, sleep=clock.sleep, **limits), clock
+
+
+def test_requests_per_minute_are_enforced():
+    limiter, clock = build_limiter(requests_per_minute=2)
+    granted_at = []
+
+    async def call():
+        await limiter.acquire()
+        granted_at.append(clock.now)
+
+    async def run():
+        await asyncio.gather(*(call() for _ in range(4)))
+
+    asyncio.run(run())
+
+    assert granted_at == [0.0, 0.0, 30.0, 60.0]
+
+
+def test_tokens_per_minute_are_enforced():
+    limiter, clock = build_limiter(tokens_per_minute=600)
+
+    async def run():
+        await limiter.acquire(tokens=600)
+        await limiter.acquire(tokens=300)
+
+    asyncio.run(run())
+
+    assert clock.now == 30.0
+
+
+def test_classification_and_fair_queuing_order():
+    limiter, _ = build_limiter(requests_per_minute=1)
+    order = []
+
+    async def call(name, priority, queue):
+        await limiter.acquire(priority=priority, queue=queue)
+        order.append(name)
+
+    async def run():
+        await asyncio.gather(
+            call("a1", PRIORITY_DATA, "a"),
+            call("a2", PRIORITY_DATA, "a"),
+            call("a3", PRIORITY_DATA, "a"),
+            call("b1", PRIORITY_DATA, "b"),
+            call("classify", PRIORITY_CLASSIFY, "b"),
+        )
+
+    asyncio.run(run())
+
+    assert order == ["classify", "a1", "b1", "a2", "a3"]
+
+
+def test_engine_calls_wait_on_rate_limiter(engine_config, model):
+    limiter, clock = build_limiter(requests_per_minute=60)
+    engine = AITextStructor(engine_config, model, rate_limiter=limiter)
+
+    results = asyncio.run(engine.execute_many(["One", "Two"] * 40))
+
+    assert len(results) == 80
+    assert len(model.calls) == 160
+    assert clock.now == 100.0
@@ -0,0 +1,96 @@
+import asyncio
+import copy
+
+import pytest
+
+from ai_text_structor import AITextStructor, ResponseCache
+
+
+@pytest.fixture
+def engine_config(meeting_config):
+    return meeting_config(classify=["summary"], explain={"status": ["next_steps"]})
+
+
+def test_responses_are_reused_across_engines(tmp_path, engine_config, fake_model):
+    cache = ResponseCache(str(tmp_path / "responses.db"))
+    first_model = fake_model()
+    second_model = fake_model()
+
+    first_engine = AITextStructor(engine_config, first_model, response_cache=cache)
+    second_engine = AITextStructor(engine_config, second_model, response_cache=cache)
+
+    first = asyncio.run(first_engine.execute("Meeting"))
+    second = asyncio.run(second_engine.execute("Meeting"))
+
+    assert first == second
+    assert len(first_model.calls) == 3
+    assert second_model.calls == []
+    assert cache.get_stats()["hits"] == 3
+
+
+def test_changing_a_field_prompt_only_invalidates_that_field(
+    tmp_path, engine_config, fake_model
+):
+    cache = ResponseCache(str(tmp_path / "responses.db"))
+    asyncio.run(
+        AITextStructor(engine_config, fake_model(), response_cache=cache).execute(
+            "Meeting"
+        )
+    )
+    changed_config = copy.deepcopy(engine_config)
+    changed_config["data"]["summary"]["prompt"] = "Outline the content"
+    model = fake_model(responses={"Outline": "An outline"})
+
+    result = asyncio.run(
+        AITextStructor(changed_config, model, response_cache=cache).execute("Meeting")
+    )
+
+    assert result["results"]["classification"]["summary"] == "An outline"
+    assert len(model.calls) == 1
+
+
+def test_invalid_classifications_are_not_cached(tmp_path, engine_config, fake_model):
+    cache = ResponseCache(str(tmp_path / "responses.db"))
+    model = fake_model(responses={"Task: Classify": "retrospective"})
+    engine = AITextStructor(
+        engine_config, model, response_cache=cache, partial_results=True
+    )
+
+    asyncio.run(engine.execute("Meeting"))
+
+    assert cache.get_stats()["entries"] == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.db"), max_entries=2)
+    now = iter(range(100))
+    cache.clock = lambda: next(now)
+
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_entries_expire_after_ttl(tmp_path):
+    clock = [0.0]
+    cache = ResponseCache(
+        str(tmp_path / "responses.db"), ttl=60, clock=lambda: clock[0]
+    )
+
+    cache.set("a", "1")
+    clock[0] = 61.0
+
+    assert cache.get("a") is None
+
+
+def test_cache_file_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "responses.db")
+    ResponseCache(path).set("a", "1")
+
+    assert ResponseCache(path).get("a") == "1"
@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from ai_text_structor.ai_text_structor import AITextStructor
+
+
+CONTENT = "Emma: The migration is late and the meeting took 15 minutes."
+
+
+@pytest.fixture
+def engine_config(meeting_config):
+    return meeting_config(
+        classify=["owner", "summary", "duration"],
+        explain={"risk_analysis": ["risks"]},
+        risks={"priority": -1},
+    )
+
+
+def call_order(model):
+    needles = {
+        "Classify the meeting": "classification",
+        "Who owns": "owner",
+        "Summarize": "summary",
+        "How long": "duration",
+        "List the risks": "risks",
+    }
+    return [
+        next(name for needle, name in needles.items() if needle in call)
+        for call in model.calls
+    ]
+
+
+def test_sequential_runs_classifier_first_then_cheapest_data(engine_config, model):
+    engine = AITextStructor(engine_config, model, parallel=False)
+
+    result = asyncio.run(engine.execute(CONTENT))
+
+    assert call_order(model) == [
+        "classification",
+        "risks",
+        "summary",
+        "duration",
+        "owner",
+    ]
+    assert list(result["results"]["classification"]) == [
+        "owner",
+        "summary",
+        "duration",
+        "risk_analysis",
+    ]
+
+
+def test_budget_skips_fields_that_do_not_fit(engine_config, model):
+    engine = AITextStructor(engine_config, model, parallel=False, token_budget=250)
+    events = []
+
+    async def collect():
+        async for event in engine.stream(CONTENT):
+            events.append(event)
+
+    asyncio.run(collect())
+    results = events[-1]["result"]["results"]["classification"]
+
+    assert results["summary"] == "Fake summary of the content"
+    assert results["owner"]["skipped"]["reason"] == "token_budget"
+    assert "Who owns" not in "".join(model.calls)
+    assert [event["data"] for event in events if event["type"] == "skipped"] == [
+        "owner"
+    ]
+
+
+def test_budget_is_reported_per_document(engine_config, model):
+    engine = AITextStructor(engine_config, model, token_budget=250)
+
+    first = asyncio.run(engine.execute(CONTENT, metrics=True))
+    second = asyncio.run(engine.execute(CONTENT.replace("15", "20"), metrics=True))
+
+    for result in (first, second):
+        budget = result["metrics"]["budget"]
+        assert budget["skipped"] == ["owner"]
+        assert 0 < budget["spent"] <= budget["tokens"]
+
+
+def test_data_only_engines_keep_result_order(engine_config, model):
+    config = {"data": engine_config["data"]}
+    engine = AITextStructor(config, model, parallel=False, token_budget=250)
+
+    result = asyncio.run(engine.execute(CONTENT))
+
+    assert list(result["results"]) == list(config["data"])
+    assert "skipped" in result["results"]["owner"]
+
+
+def test_priority_and_budget_are_validated(engine_config, meeting_config, model):
+    config = meeting_config(summary={"priority": "high"})
+
+    with pytest.raises(ValueError):
+        AITextStructor(config, model)
+    with pytest.raises(ValueError):
+        AITextStructor(engine_config, model, token_budget=0)
@@ -0,0 +1,92 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from ai_text_structor import AITextStructor, SemanticCache
+from ai_text_structor.benchmark import SAMPLE_DOCUMENT
+from ai_text_structor.semantic_cache import ANNIndex, HashingEmbedder
+
+
+SIMILAR_DOCUMENT = SAMPLE_DOCUMENT.replace("15 minutes", "20 minutes")
+
+
+@pytest.fixture
+def engine_config(meeting_config):
+    return meeting_config(
+        "summary", "duration", summary={"semantic_cache": {"threshold": 0.9}}
+    )
+
+
+def test_near_duplicates_are_similar():
+    cache = SemanticCache()
+
+    same = cache.embed(SAMPLE_DOCUMENT) @ cache.embed(SIMILAR_DOCUMENT)
+    other = cache.embed(SAMPLE_DOCUMENT) @ cache.embed("Pasta needs salted water")
+
+    assert same > 0.9
+    assert other < 0.2
+
+
+def test_index_finds_neighbors_and_evicts_oldest():
+    embedder = HashingEmbedder(dimensions=256)
+    vectors = [embedder(f"status report number {index}") for index in range(4)]
+    vectors = [vector / np.linalg.norm(vector) for vector in vectors]
+    index = ANNIndex(256, max_entries=3)
+
+    for number, vector in enumerate(vectors):
+        index.add(vector, number)
+
+    assert index.search(vectors[3]) == (pytest.approx(1.0), 3)
+    assert index.search(vectors[0])[1] != 0
+    assert len(index.entries) == 3
+
+
+def test_opted_in_fields_reuse_results_of_similar_content(engine_config, model):
+    cache = SemanticCache()
+    engine = AITextStructor(engine_config, model, semantic_cache=cache)
+
+    first = asyncio.run(engine.execute(SAMPLE_DOCUMENT))
+    second = asyncio.run(engine.execute(SIMILAR_DOCUMENT, metrics=True))
+
+    assert second["results"] == first["results"]
+    assert sum("Summarize" in call for call in model.calls) == 1
+    assert sum("How long" in call for call in model.calls) == 2
+    assert second["metrics"]["fields"]["summary"]["semantic_similarity"] > 0.9
+
+    stats = cache.get_stats()
+    assert (stats["lookups"], stats["hits"], stats["hit_rate"]) == (2, 1, 0.5)
+    assert stats["histogram"]["0.9-1.0"] == 1
+
+
+def test_dissimilar_content_and_other_fields_are_not_reused(
+    engine_config, meeting_config, model
+):
+    cache = SemanticCache()
+    engine = AITextStructor(engine_config, model, semantic_cache=cache)
+    other_config = meeting_config(
+        summary={"prompt": "Summarize the decisions", "semantic_cache": {}}
+    )
+    other_engine = AITextStructor(other_config, model, semantic_cache=cache)
+
+    asyncio.run(engine.execute(SAMPLE_DOCUMENT))
+    asyncio.run(engine.execute("Pasta needs salted water and ten minutes"))
+    asyncio.run(other_engine.execute(SAMPLE_DOCUMENT))
+
+    assert sum("Summarize" in call for call in model.calls) == 3
+    assert cache.get_stats()["hits"] == 0
+
+
+def test_threshold_is_validated(meeting_config, model):
+    config = meeting_config(summary={"semantic_cache": {"threshold": 1.5}})
+
+    with pytest.raises(ValueError):
+        AITextStructor(config, model)
+
+    config["data"]["summary"]["semantic_cache"] = {"min_similarity": 0.9}
+    with pytest.raises(ValueError, match="setting 'min_similarity' for key 'summary'"):
+        AITextStructor(config, model)
+
+    config["data"]["summary"]["semantic_cache"] = {"threshold": "0.9"}
+    with pytest.raises(ValueError, match="must be in"):
+        AITextStructor(config, model)
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from ai_text_structor.ai_text_structor import AITextStructor
+
+
+LATENCY = 0.1
+
+
+@pytest.fixture
+def engine_config(meeting_config):
+    return meeting_config(
+        classify=["summary"],
+        explain={"status": ["risks", "metrics"], "decision": ["risks", "decisions"]},
+        metrics={"type": "string", "prompt": "Describe the metrics"},
+        decisions={"type": "string", "prompt": "Describe the decisions"},
+    )
+
+
+@pytest.fixture
+def model(fake_model):
+    return fake_model(latency=LATENCY)
+
+
+def run_timed(engine):
+    async def run():
+        started_at = asyncio.get_running_loop().time()
+        result = await engine.execute("Some meeting")
+        return result, asyncio.get_running_loop().time() - started_at
+
+    return asyncio.run(run())
+
+
+def test_speculative_mode_returns_the_same_results(engine_config, fake_model):
+    engine = AITextStructor(engine_config, fake_model(latency=LATENCY))
+    expected = asyncio.run(engine.execute("Some meeting"))
+    engine = AITextStructor(
+        engine_config,
+        fake_model(latency=LATENCY),
+        speculative=True,
+        speculation_threshold=1.0,
+    )
+
+    result, _ = run_timed(engine)
+
+    assert result == expected
+
+
+def test_shared_explain_data_is_started_before_classification(engine_config, model):
+    engine = AITextStructor(
+        engine_config, model, speculative=True, speculation_threshold=1.0
+    )
+
+    _, elapsed = run_timed(engine)
+
+    assert elapsed < 2.5 * LATENCY
+    assert sum("List the risks" in call for call in model.calls) == 1
+    assert not any("Describe the decisions" in call for call in model.calls)
+
+
+def test_unneeded_speculation_is_cancelled(engine_config, fake_model):
+    model = fake_model(latency=LATENCY, slow_responses={"decisions": 1.0})
+    engine = AITextStructor(
+        engine_config, model, speculative=True, speculation_threshold=0.5
+    )
+
+    async def run():
+        result = await engine.execute("Some meeting")
+        await asyncio.sleep(LATENCY)
+        return result, dict(engine._inflight)
+
+    result, inflight = asyncio.run(run())
+
+    assert "decision" not in result["results"]["classification"]
+    assert inflight == {}
+    assert "decisions" not in {data_key for data_key, _ in engine.data_cache}
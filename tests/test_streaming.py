@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from ai_text_structor.ai_text_structor import AITextStructor
+
+
+@pytest.fixture
+def engine_config(meeting_config):
+    return meeting_config(
+        classify=["summary", "next_steps"], explain={"risk_analysis": ["risks"]}
+    )
+
+
+def collect(engine, content, **kwargs):
+    async def run():
+        return [event async for event in engine.stream(content, **kwargs)]
+
+    return asyncio.run(run())
+
+
+def test_stream_yields_events_as_they_happen(engine_config, fake_model):
+    model = fake_model(slow_responses={"Summarize": 0.05})
+    engine = AITextStructor(engine_config, model)
+
+    events = collect(engine, "Some meeting")
+
+    types = [event["type"] for event in events]
+    fields = [event["data"] for event in events if event["type"] == "field"]
+    assert fields.index("next_steps") < fields.index("summary")
+    assert types.index("classified") < types.index("branch")
+    assert types[-1] == "completed"
+    assert events[-1]["result"] == asyncio.run(engine.execute("Other meeting"))
+
+
+def test_stream_emits_errors(engine_config, fake_model):
+    model = fake_model(responses={"next steps": "not json"})
+
+    partial = collect(
+        AITextStructor(engine_config, model, partial_results=True), "Some meeting"
+    )
+    errors = [event for event in partial if event["type"] == "error"]
+    assert [event["data"] for event in errors] == ["next_steps"]
+    assert partial[-1]["type"] == "completed"
+
+    with pytest.raises(Exception):
+        collect(AITextStructor(engine_config, model), "Some meeting")
+
+
+def test_stream_emits_partial_list_values(engine_config, model):
+    engine = AITextStructor(engine_config, model)
+
+    events = collect(engine, "Some meeting", partial=True)
+
+    partials = [
+        event["result"]
+        for event in events
+        if event["type"] == "partial" and event["data"] == "next_steps"
+    ]
+    assert len(partials) > 1
+    assert partials[-1] == ["First item", "Second item"]
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from ai_text_structor.ai_text_structor import AITextStructor
+from ai_text_structor.worker_pool import WorkerPool
+
+
+EXPECTED = {
+    "duration": 42.0,
+    "next_steps": ["First item", "Second item"],
+    "owner": {"name": "Fake Name of the owner", "team": "Fake Team of the owner"},
+}
+
+
+@pytest.fixture
+def engine_config(meeting_config):
+    return meeting_config(overview=["duration", "next_steps", "owner"])
+
+
+@pytest.mark.parametrize("use_async", [True, False])
+def test_structured_output_drops_format_instructions(engine_config, model, use_async):
+    engine = AITextStructor(
+        engine_config, model, use_async=use_async, structured_output=True
+    )
+
+    result = asyncio.run(engine.execute("Some meeting"))
+
+    assert engine.structured_output
+    assert result["results"]["overview"] == EXPECTED
+    assert not any("Formatting Instructions" in call for call in model.calls)
+
+
+def test_structured_output_reduces_prompt_tokens(engine_config, model):
+    prompt_engine = AITextStructor(engine_config, model)
+    structured_engine = AITextStructor(engine_config, model, structured_output=True)
+
+    for key in ("next_steps", "owner"):
+        assert structured_engine.data_executor.estimate_tokens(
+            key, "Some meeting"
+        ) < prompt_engine.data_executor.estimate_tokens(key, "Some meeting")
+
+
+def test_structured_output_in_batches(engine_config, model):
+    engine = AITextStructor(engine_config, model, batch=True, structured_output=True)
+
+    result = asyncio.run(engine.execute("Some meeting"))
+
+    assert result["results"]["overview"] == EXPECTED
+    assert len(model.calls) == 1
+
+
+def test_models_without_tool_calling_fall_back_to_prompts(engine_config, fake_model):
+    model = fake_model(tool_calling=False)
+    engine = AITextStructor(engine_config, model, structured_output=True)
+
+    result = asyncio.run(engine.execute("Some meeting"))
+
+    assert result["results"]["overview"] == EXPECTED
+    assert any("Formatting Instructions" in call for call in model.calls)
+
+
+def test_structured_output_is_chosen_per_model(engine_config, model, fake_model):
+    engine_config["data"]["owner"]["model"] = "fast"
+    fast = fake_model(tool_calling=False)
+    engine = AITextStructor(
+        engine_config, model, structured_output=True, models={"fast": fast}
+    )
+
+    result = asyncio.run(engine.execute("Some meeting"))
+
+    assert result["results"]["overview"] == EXPECTED
+    assert len(model.calls) == 2
+    assert not any("Formatting Instructions" in call for call in model.calls)
+    assert ["Formatting Instructions" in call for call in fast.calls] == [True]
+
+
+def test_worker_pool_must_match_structured_output(engine_config, model):
+
+    with WorkerPool(engine_config, max_workers=1) as pool:
+        with pytest.raises(ValueError):
+            AITextStructor(
+                engine_config, model, structured_output=True, worker_pool=pool
+            )
+
+    with WorkerPool(engine_config, max_workers=1, structured_output=True) as pool:
+        engine = AITextStructor(
+            engine_config, model, structured_output=True, worker_pool=pool
+        )
+        result = asyncio.run(engine.execute("Some meeting"))
+
+    assert result["results"]["overview"] == EXPECTED
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from ai_text_structor import AITextStructor, CallPolicy, ResponseCache, Tracer
+
+
+@pytest.fixture
+def engine_config(meeting_config):
+    return meeting_config(classify=["summary"], explain={"status": ["next_steps"]})
+
+
+def test_metrics_are_returned_on_request(engine_config, fake_model):
+    engine = AITextStructor(engine_config, fake_model(latency=0.01))
+
+    result = asyncio.run(engine.execute("Some meeting", metrics=True))
+    plain = asyncio.run(engine.execute("Other meeting"))
+
+    metrics = result["metrics"]
+    assert "metrics" not in plain
+    assert set(metrics["workflows"]) == {"classification", "status"}
+    assert set(metrics["fields"]) == {"summary", "next_steps"}
+    assert set(metrics["classifiers"]) == {"classification"}
+    assert metrics["totals"]["calls"] == 3
+    assert metrics["fields"]["summary"]["model_time"] >= 0.01
+    assert metrics["fields"]["summary"]["prompt_tokens"] > 0
+    assert metrics["fields"]["summary"]["completion_tokens"] > 0
+    assert metrics["wall_time"] >= metrics["workflows"]["classification"]["wall_time"]
+
+
+def test_metrics_count_retries_and_cache_hits(tmp_path, engine_config, fake_model):
+    cache = ResponseCache(str(tmp_path / "responses.db"))
+    policy = CallPolicy(max_attempts=2, backoff_base=0)
+    asyncio.run(
+        AITextStructor(engine_config, fake_model(), response_cache=cache).execute(
+            "Some meeting"
+        )
+    )
+    engine = AITextStructor(
+        engine_config, fake_model(failures=1), call_policy=policy
+    )
+
+    retried = asyncio.run(engine.execute_data("Some meeting", ["summary"], True))
+    cached = asyncio.run(
+        AITextStructor(engine_config, fake_model(), response_cache=cache).execute(
+            "Some meeting", metrics=True
+        )
+    )
+
+    assert retried["metrics"]["fields"]["summary"]["retries"] == 1
+    assert cached["metrics"]["totals"]["cache_hits"] == 3
+
+
+def test_tracer_receives_nested_spans(engine_config, model):
+    spans = []
+    engine = AITextStructor(
+        engine_config, model, tracer=Tracer(callbacks=[spans.append])
+    )
+
+    asyncio.run(engine.execute("Some meeting"))
+
+    call = next(span for span in spans if span.kind == "call")
+    assert [span.kind for span in spans][-1] == "document"
+    assert call.parent.kind in ("field", "classify")
+    root = call
+    while root.parent is not None:
+        root = root.parent
+    assert root.kind == "document"
+    assert call.attributes["attempts"] == 1
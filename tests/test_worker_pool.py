@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from ai_text_structor.ai_text_structor import AITextStructor
+from ai_text_structor.response_cache import ResponseCache
+from ai_text_structor.sharded_runner import iter_sharded, run_sharded
+from ai_text_structor.worker_pool import WorkerPool
+
+
+@pytest.fixture(scope="module")
+def engine_config(meeting_config):
+    return meeting_config("metadata", "next_steps", "duration", "summary")
+
+
+@pytest.fixture(scope="module")
+def worker_pool(engine_config):
+    with WorkerPool(engine_config, max_workers=2) as pool:
+        yield pool
+
+
+@pytest.mark.parametrize("options", [{}, {"batch": True}, {"use_async": False}])
+def test_worker_pool_matches_local_parsing(
+    worker_pool, engine_config, fake_model, options
+):
+    local = AITextStructor(engine_config, fake_model(), **options)
+    pooled = AITextStructor(
+        engine_config, fake_model(), worker_pool=worker_pool, **options
+    )
+
+    expected = asyncio.run(local.execute("Some meeting"))
+
+    assert asyncio.run(pooled.execute("Some meeting")) == expected
+
+
+def test_worker_pool_reports_parse_errors(worker_pool, engine_config, fake_model):
+    model = fake_model(responses={"next steps": "not json"})
+    engine = AITextStructor(
+        engine_config, model, worker_pool=worker_pool, partial_results=True
+    )
+
+    result = asyncio.run(engine.execute("Some meeting"))
+
+    assert "error" in result["results"]["next_steps"]
+    assert result["results"]["duration"] == 42.0
+
+
+def test_worker_pool_requires_same_configuration(worker_pool, meeting_config, model):
+    config = meeting_config("summary")
+
+    with pytest.raises(ValueError):
+        AITextStructor(config, model, worker_pool=worker_pool)
+
+
+def test_sharded_runner_matches_execute_many(tmp_path, engine_config, fake_model):
+    documents = [f"Meeting {index}" for index in range(5)]
+    cache_path = str(tmp_path / "responses.db")
+    engine = AITextStructor(engine_config, fake_model())
+
+    results = run_sharded(
+        engine_config,
+        fake_model,
+        documents,
+        processes=2,
+        shard_size=2,
+        cache_path=cache_path,
+    )
+
+    assert results == asyncio.run(engine.execute_many(documents))
+    assert ResponseCache(cache_path).get_stats()["entries"] == 20
+
+    streamed = dict(
+        iter_sharded(
+            engine_config, fake_model, [("a", "Meeting 0")], processes=1
+        )
+    )
+    assert streamed == {"a": results[0]}
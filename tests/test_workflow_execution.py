@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from ai_text_structor.ai_text_structor import AITextStructor
+
+
+EXPECTED = {
+    "results": {
+        "classification": {
+            "summary": "Fake summary of the content",
+            "status": {"risks": ["First item", "Second item"]},
+        }
+    },
+    "titles": {
+        "classification": {
+            "workflow": "Classification",
+            "data": {"summary": "summary"},
+            "status": {"workflow": "Status", "data": {"risks": "risks"}},
+        }
+    },
+}
+
+
+@pytest.fixture
+def engine_config(meeting_config):
+    config = meeting_config(
+        classify=["summary"], explain={"status": ["risks"], "planning": ["duration"]}
+    )
+    for workflow_id, workflow in config["workflow"].items():
+        workflow["name"] = workflow_id.capitalize()
+    return config
+
+
+@pytest.mark.parametrize("use_async", [True, False])
+def test_execute_classifies_and_runs_explain_workflow(
+    engine_config, fake_model, use_async
+):
+    # Classifiers may answer with the workflow name instead of its ID
+    model = fake_model(responses={"Task: Classify": "Status"})
+    engine = AITextStructor(engine_config, model, use_async=use_async)
+
+    assert asyncio.run(engine.execute("Some meeting")) == EXPECTED
+
+
+def test_invalid_classification_raises(engine_config, fake_model):
+    model = fake_model(responses={"Task: Classify": "retrospective"})
+    engine = AITextStructor(engine_config, model)
+
+    with pytest.raises(ValueError, match="invalid workflow"):
+        asyncio.run(engine.execute("Some meeting"))